@@ -1,7 +1,8 @@
 from django.contrib import admin  # gives access to the Django admin site
 from django.utils.html import format_html  # safely renders HTML strings inside the admin panel
 from django.utils import timezone  # used to compare datetimes in an aware, timezone-safe way
-from .models import Student, Room, Message, Report  # the four models managed through this admin
+from .models import Student, Room, RoomImage, Message, Report, OutboundEmail, MediaBlob  # the models managed through this admin
+from . import presence  # live "last seen" times, kept in the cache
 
 
 @admin.register(Student)  # register the Student model so it appears in the admin panel
@@ -32,9 +33,10 @@ class StudentAdmin(admin.ModelAdmin):
     
     def online_status(self, obj):
         # renders a coloured presence badge in the student list — green, amber, or grey
-        if obj.is_online:  # the flag was set to True when the student last made a request
+        last_seen = presence.last_seen(obj.id)  # live heartbeat from the cache — None once it has expired
+        if last_seen or obj.is_online:  # recently seen, or logged in and not yet flushed as offline
             # treat the student as truly active only if they were seen in the last 5 minutes
-            if obj.last_activity and (timezone.now() - obj.last_activity).seconds < 300:
+            if last_seen and (timezone.now() - last_seen).total_seconds() < 300:
                 return format_html(  # green dot — actively browsing right now
                     '<span style="color: #2ecc71; font-weight: bold;">{} Online</span>',
                     '●'
@@ -51,12 +53,20 @@ class StudentAdmin(admin.ModelAdmin):
     online_status.short_description = 'Status'  # sets the column header text in the list view
 
 
+class RoomImageInline(admin.TabularInline):  # the room's photos, edited on the room's own admin page
+    model = RoomImage
+    extra = 1  # one empty row for adding a photo
+    fields = ['position', 'file', 'width', 'height', 'content_hash']  # gallery order, the upload, and what images.py measured
+    readonly_fields = ['width', 'height', 'content_hash']  # worked out from the file
+
+
 @admin.register(Room)  # register the Room model so admins can browse and edit listings
 class RoomAdmin(admin.ModelAdmin):
     list_display = ['title', 'owner', 'location', 'price', 'room_type', 'available_from', 'is_active', 'is_featured', 'created_at']  # columns shown in the room list view
     search_fields = ['title', 'location', 'owner__name', 'owner__email']  # searchable by title, location, or the landlord's details
     list_filter = ['is_active', 'is_featured', 'is_verified', 'room_type', 'furnished', 'bills', 'created_at']  # sidebar filters for quick narrowing
     readonly_fields = ['created_at', 'updated_at']  # auto-managed timestamps — no manual editing needed
+    inlines = [RoomImageInline]  # the photos, below the room's fields
     
     fieldsets = (  # groups the room detail page into logical sections
         ('Owner', {
@@ -71,9 +81,6 @@ class RoomAdmin(admin.ModelAdmin):
         ('Room Details', {
             'fields': ('room_type', 'furnished', 'available_from', 'min_stay_months', 'max_stay_months')  # physical and tenancy characteristics
         }),
-        ('Images', {
-            'fields': ('image_1', 'image_2', 'image_3', 'image_4', 'image_5')  # up to five uploaded room photos
-        }),
         ('Amenities', {
             'fields': ('wifi', 'washing_machine', 'dishwasher', 'parking', 'garden',
                       'gym', 'central_heating', 'double_glazing', 'security_system', 'bike_storage')  # boolean toggles for each amenity
@@ -224,3 +231,19 @@ class ReportAdmin(admin.ModelAdmin):
             updated += 1
         self.message_user(request, f'{updated} report(s) marked as dismissed.')
     mark_dismissed.short_description = '❌ Mark as Dismissed'  # label shown in the Actions dropdown
+
+
+@admin.register(OutboundEmail)  # the email outbox — shows what was sent, what is waiting and why something failed
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['id', 'to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']  # delivery state at a glance
+    search_fields = ['to_email', 'subject']  # find the emails sent to one address
+    list_filter = ['status', 'created_at']  # e.g. everything that failed
+    readonly_fields = ['to_email', 'subject', 'body', 'attempts', 'claimed_by', 'claimed_until', 'last_error', 'provider_message_id', 'created_at', 'sent_at']  # written by the worker
+
+
+@admin.register(MediaBlob)  # the stored photo files and how many photos use each — see media_store.py
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'ref_count', 'size', 'touched_at', 'created_at']  # shared files have ref_count > 1
+    search_fields = ['name', 'content_hash']  # find a file by its path or hash
+    list_filter = ['touched_at']
+    readonly_fields = ['name', 'content_hash', 'size', 'ref_count', 'touched_at', 'created_at']  # kept by the signals and collect_media
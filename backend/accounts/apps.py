@@ -9,3 +9,8 @@ class AccountsConfig(AppConfig):
     # sets the default primary key type for all models in this app to BigAutoField
     # BigAutoField is an auto-incrementing 64-bit integer (1, 2, 3, ...)
     name = 'accounts'
+
+    def ready(self):
+        # Django calls this once the app registry is loaded
+        from . import signals  # noqa: F401
+        # importing the module is enough — the @receiver decorators connect the handlers
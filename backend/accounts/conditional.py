@@ -0,0 +1,78 @@
+"""
+Conditional GET (ETag / Last-Modified) for the room endpoints.
+The home page and room page re-fetch the same rooms over and over. Before serializing
+anything, the view works out a validator from the rows it has just read — for a list page,
+the newest updated_at, the number of rooms and their ids; for one room, its updated_at —
+and if the browser already holds that version it gets an empty 304 Not Modified instead
+of the JSON.
+"""
+
+import hashlib
+# md5 turns the validator parts into a short, fixed-length ETag
+
+from django.utils.cache import get_conditional_response
+# Django's own If-None-Match / If-Modified-Since evaluation (the same code ConditionalGetMiddleware uses)
+
+from django.utils.http import http_date
+# formats a timestamp as "Fri, 17 Oct 2026 15:42:00 GMT" for the Last-Modified header
+
+from .room_cache import PAYLOAD_VERSION
+# part of every ETag, so a change to the room JSON shape also changes the ETags
+
+
+def _etag(*parts):
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+    # weak ETag — the same rooms may be sent gzipped or not, so the bytes are not guaranteed equal
+
+
+def room_list_validators(rooms, page_info, request):
+    """Return (etag, last_modified) for one page of a room list.
+
+    Built from the page the paginator already fetched — the newest updated_at, how many
+    rooms there are and which ones, plus the next/prev cursors — so it costs no extra
+    query. A MAX/COUNT over every matching room would read the whole filtered set on each
+    request, which on a large catalogue is slower than serving the page itself. The owners'
+    updated_at is included because owner_name/owner_email are part of each room, and the
+    full query string (filters, sort, cursor, view) keeps different pages apart.
+    """
+    stamps = [room.updated_at for room in rooms] + [room.owner.updated_at for room in rooms]
+    last_modified = max(stamps, default=None)
+    etag = _etag(
+        PAYLOAD_VERSION, request.get_full_path(), len(rooms),
+        ','.join(f'{room.pk}@{room.updated_at.timestamp()}@{room.owner.updated_at.timestamp()}' for room in rooms),
+        page_info,
+    )
+    return etag, last_modified
+
+
+def room_validators(room, request):
+    """Return (etag, last_modified) for a single room (its owner should be select_related)."""
+    last_modified = max(room.updated_at, room.owner.updated_at)
+    etag = _etag(PAYLOAD_VERSION, request.get_full_path(), room.pk, room.updated_at, room.owner.updated_at)
+    return etag, last_modified
+
+
+def not_modified(request, etag, last_modified):
+    """Return a 304 response if the browser's copy is still current, otherwise None."""
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+        # HTTP dates only have whole seconds
+    )
+    if response is not None:
+        add_validators(response, etag, last_modified)
+        # a 304 must repeat the validators the browser should keep using
+    return response
+
+
+def add_validators(response, etag, last_modified):
+    """Put the ETag / Last-Modified headers on a 200 response so the next request can be conditional."""
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = 'no-cache'
+    # no-cache = "keep it, but check with us before using it" — browsers always revalidate,
+    # so edits show up straight away and unchanged data costs only a 304
+    return response
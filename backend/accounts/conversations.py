@@ -0,0 +1,37 @@
+"""
+Rebuilding the Conversation summary table from the messages table.
+Used by migration 0015 (with the historical models) and by
+`python manage.py backfill_conversations` (with the real ones), so both take the model
+classes as arguments instead of importing them.
+"""
+
+
+def rebuild_conversations(Message, Conversation, batch_size=1000):
+    """Recompute every conversation's last message and unread counters from scratch.
+    Returns the number of conversations written."""
+    threads = {}
+    # (student_a, student_b, room_id) -> [last_message_id, last_message_at, unread_a, unread_b]
+
+    messages = Message.objects.order_by('created_at', 'id').values_list(
+        'id', 'sender_id', 'recipient_id', 'room_id', 'created_at', 'is_read'
+    )
+    for message_id, sender_id, recipient_id, room_id, created_at, is_read in messages.iterator(chunk_size=batch_size):
+        # oldest first, so the last message seen for each thread is its newest
+        student_a, student_b = sorted((sender_id, recipient_id))
+        thread = threads.setdefault((student_a, student_b, room_id), [None, None, 0, 0])
+        thread[0], thread[1] = message_id, created_at
+        if not is_read:
+            thread[2 if recipient_id == student_a else 3] += 1
+
+    Conversation.objects.all().delete()
+    Conversation.objects.bulk_create(
+        [
+            Conversation(
+                student_a_id=student_a, student_b_id=student_b, room_id=room_id,
+                last_message_id=last_id, last_message_at=last_at, unread_a=unread_a, unread_b=unread_b,
+            )
+            for (student_a, student_b, room_id), (last_id, last_at, unread_a, unread_b) in threads.items()
+        ],
+        batch_size=batch_size,
+    )
+    return len(threads)
@@ -0,0 +1,227 @@
+"""
+Server-side filtering and sorting for the room listings API.
+GET /api/rooms/ used to return every active room and leave all filtering to home.js —
+now the browser sends query parameters and the database does the work using the
+composite indexes declared on Room.Meta.
+"""
+
+from datetime import date
+# date.fromisoformat() parses "2026-09-01" style query parameters
+
+from decimal import Decimal, InvalidOperation
+# prices are DecimalFields, so we compare them against Decimals rather than floats
+
+from django.db.models import F, Q
+# Q objects let us OR two conditions together — used for the location search
+# F('amenities') refers to the column itself so the bitwise AND runs in SQL
+
+from .models import Room
+# the choices lists and amenity field names live on the model
+
+from .search import search_rooms
+# ?q= full-text search (FTS5 on SQLite, tsvector/GIN on Postgres)
+
+from . import geo
+# ?near=<postcode>&radius_km= — offline geocoding plus the grid-square index on Room
+
+
+class RoomFilterError(ValueError):
+    """Raised when a query parameter cannot be parsed — the view turns it into a 400."""
+
+
+AMENITY_FIELDS = Room.AMENITY_FIELDS
+# the ten amenity names — each one is a bit in Room.amenities
+
+SORT_OPTIONS = {
+    'newest': ('-created_at', '-id'),
+    'oldest': ('created_at', 'id'),
+    'price_asc': ('price', 'id'),
+    'price_desc': ('-price', '-id'),
+    'available': ('available_from', 'id'),
+    'relevance': ('search_rank', 'id'),
+    'distance': ('distance_sq', 'id'),
+}
+# ?sort=<key> picks one of these orderings — 'id' is always the last column
+# so rooms with the same price/date still come back in a stable order
+
+DEFAULT_SORT = 'newest'
+# matches Room.Meta.ordering (newest first)
+
+DEFAULT_SEARCH_SORT = 'relevance'
+# when ?q= is given the best matches come first unless another sort is asked for
+
+DEFAULT_NEAR_SORT = 'distance'
+# when ?near= is given the closest rooms come first (this wins over relevance)
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+# query strings are text — these are the spellings we accept as "ticked"
+
+
+def _get_list(params, name):
+    """Read a multi-select parameter — accepts both ?room_type=single,double and
+    ?room_type=single&room_type=double, and drops empty entries."""
+    values = []
+    for raw in params.getlist(name):
+        values.extend(part.strip() for part in raw.split(','))
+    return [v for v in values if v]
+
+
+def _get_decimal(params, name):
+    raw = params.get(name, '').strip()
+    if not raw:
+        return None
+    try:
+        value = Decimal(raw)
+    except InvalidOperation:
+        raise RoomFilterError(f'{name} must be a number.')
+    if not value.is_finite():
+        raise RoomFilterError(f'{name} must be a number.')
+        # Decimal() also reads "nan" and "Infinity", which the price lookup would reject with a 500
+    return value
+
+
+def _get_int(params, name):
+    raw = params.get(name, '').strip()
+    if not raw:
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        raise RoomFilterError(f'{name} must be a whole number.')
+
+
+def _get_date(params, name):
+    raw = params.get(name, '').strip()
+    if not raw:
+        return None
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        raise RoomFilterError(f'{name} must be a date in YYYY-MM-DD format.')
+
+
+def _check_choices(values, choices, name):
+    """Make sure every selected value is one of the model's choices."""
+    valid = [choice[0] for choice in choices]
+    # extracts ['single', 'double', ...] from the choices list
+    for value in values:
+        if value not in valid:
+            raise RoomFilterError(f'Invalid {name}. Must be one of: {", ".join(valid)}')
+    return values
+
+
+def filter_rooms(queryset, params):
+    """Apply the search filters from the query string to a Room queryset.
+
+    Supported parameters (all optional):
+      min_price / max_price       monthly rent range
+      room_type, furnished, bills comma-separated multi-select
+      amenities                   comma-separated list — a room must have ALL of them
+      wifi=true, parking=true ... individual amenity flags (same AND semantics)
+      move_in_from / move_in_to   window the room's available_from must fall in
+      min_stay / max_stay         requested tenancy length — matches rooms whose
+                                  min_stay_months..max_stay_months range overlaps it
+      location                    case-insensitive match on location or postcode
+      q                           full-text search over title, location/postcode and description
+      near / radius_km            rooms within radius_km (default 5, max 50) of a UK postcode
+    """
+    min_price = _get_decimal(params, 'min_price')
+    max_price = _get_decimal(params, 'max_price')
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+    # __gte / __lte are "greater/less than or equal" — both ends are inclusive
+
+    room_types = _check_choices(_get_list(params, 'room_type'), Room.ROOM_TYPE_CHOICES, 'room_type')
+    if room_types:
+        queryset = queryset.filter(room_type__in=room_types)
+        # __in becomes SQL "room_type IN ('single', 'double')"
+
+    furnished = _check_choices(_get_list(params, 'furnished'), Room.FURNISHED_CHOICES, 'furnished')
+    if furnished:
+        queryset = queryset.filter(furnished__in=furnished)
+
+    bills = _check_choices(_get_list(params, 'bills'), Room.BILLS_CHOICES, 'bills')
+    if bills:
+        queryset = queryset.filter(bills__in=bills)
+
+    amenities = set(_get_list(params, 'amenities'))
+    for field in AMENITY_FIELDS:
+        if params.get(field, '').strip().lower() in TRUE_VALUES:
+            amenities.add(field)
+    unknown = amenities.difference(AMENITY_FIELDS)
+    if unknown:
+        raise RoomFilterError(f'Unknown amenities: {", ".join(sorted(unknown))}')
+    if amenities:
+        mask = Room.amenity_mask(amenities)
+        queryset = queryset.alias(amenity_bits=F('amenities').bitand(mask)).filter(amenity_bits=mask)
+        # every selected amenity must be ticked — "wifi AND parking AND ..." is one
+        # predicate on the packed column: (amenities & mask) = mask
+
+    move_in_from = _get_date(params, 'move_in_from')
+    move_in_to = _get_date(params, 'move_in_to')
+    if move_in_from:
+        queryset = queryset.filter(available_from__gte=move_in_from)
+    if move_in_to:
+        queryset = queryset.filter(available_from__lte=move_in_to)
+
+    min_stay = _get_int(params, 'min_stay')
+    max_stay = _get_int(params, 'max_stay')
+    if min_stay is not None and max_stay is not None and min_stay > max_stay:
+        raise RoomFilterError('min_stay cannot be greater than max_stay.')
+    if min_stay is not None:
+        queryset = queryset.filter(max_stay_months__gte=min_stay)
+        # the room must allow a tenancy at least as long as the shortest one we want
+    if max_stay is not None:
+        queryset = queryset.filter(min_stay_months__lte=max_stay)
+        # and must not insist on a tenancy longer than the longest one we want
+
+    location = params.get('location', '').strip()
+    if location:
+        queryset = queryset.filter(Q(location__icontains=location) | Q(postcode__icontains=location))
+
+    near = params.get('near', '').strip()
+    if near:
+        point = geo.geocode(near)
+        if point is None:
+            raise RoomFilterError(f'Unknown postcode: {near}')
+        radius_km = _get_decimal(params, 'radius_km')
+        radius_km = geo.DEFAULT_RADIUS_KM if radius_km is None else float(radius_km)
+        if not 0 < radius_km <= geo.MAX_RADIUS_KM:
+            raise RoomFilterError(f'radius_km must be between 0 and {geo.MAX_RADIUS_KM}.')
+        queryset = geo.rooms_near(queryset, point[0], point[1], radius_km)
+        # keeps rooms inside the circle and adds a distance_sq column for ?sort=distance
+
+    q = params.get('q', '').strip()
+    if q:
+        ranked = _sort_name(params) == 'relevance'
+        queryset = search_rooms(queryset, q, ranked=ranked)
+        # keeps only matching rooms — and adds a search_rank column when sorting by relevance
+
+    return queryset
+
+
+def room_ordering(params):
+    """Return the order_by() columns for ?sort= — defaults to newest first.
+    The view hands these to the paginator, which both orders and pages by them."""
+    sort = _sort_name(params)
+    if sort not in SORT_OPTIONS:
+        raise RoomFilterError(f'Invalid sort. Must be one of: {", ".join(SORT_OPTIONS)}')
+    if sort == 'relevance' and not params.get('q', '').strip():
+        raise RoomFilterError('sort=relevance needs a search query (q).')
+    if sort == 'distance' and not params.get('near', '').strip():
+        raise RoomFilterError('sort=distance needs a postcode (near).')
+    return SORT_OPTIONS[sort]
+
+
+def _sort_name(params):
+    """The ?sort= value, or the default for the kind of search being run."""
+    sort = params.get('sort', '').strip()
+    if sort:
+        return sort
+    if params.get('near', '').strip():
+        return DEFAULT_NEAR_SORT
+    if params.get('q', '').strip():
+        return DEFAULT_SEARCH_SORT
+    return DEFAULT_SORT
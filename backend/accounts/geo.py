@@ -0,0 +1,149 @@
+"""
+Offline UK postcode geocoding and "rooms near a postcode" search.
+
+Postcodes are turned into coordinates using the PostcodeCentroid table, which is filled
+from a local CSV by `python manage.py import_postcodes` — no network calls are made.
+If a full postcode is unknown we fall back to the centroid of its outward code (the
+"E1" part of "E1 4NS"), which is still good enough for "near my campus".
+
+Rooms store their latitude/longitude plus a `geo_cell` — the number of the 0.1° x 0.1°
+grid square they sit in. A radius search first picks the handful of grid squares that
+overlap the circle (an indexed IN lookup), then measures the exact distance only for the
+rooms inside them.
+"""
+
+import math
+# floor() for grid squares, cos() to correct longitude distances, sqrt() for kilometres
+
+import re
+# postcode format checks
+
+from django.db.models import F, FloatField
+from django.db.models.expressions import ExpressionWrapper
+# ExpressionWrapper tells Django the arithmetic below produces a float
+
+
+KM_PER_DEGREE = 111.32
+# one degree of latitude is ~111km everywhere (longitude shrinks towards the poles)
+
+GRID_DEGREES = 0.1
+# size of one grid square — about 11km north-south and 7km east-west in the UK
+
+GRID_ROW = 10000
+# geo_cell = row * GRID_ROW + column — wide enough for every column the UK needs
+
+DEFAULT_RADIUS_KM = 5
+MAX_RADIUS_KM = 50
+# ?radius_km= defaults to 5km and is capped so a search never covers the whole country
+
+FULL_POSTCODE = re.compile(r'^([A-Z]{1,2}[0-9][A-Z0-9]?)([0-9][A-Z]{2})$')
+OUTWARD_CODE = re.compile(r'^[A-Z]{1,2}[0-9][A-Z0-9]?$')
+# "E14NS" -> ("E1", "4NS"); an outward code on its own looks like "E1", "SW1A" or "M60"
+
+
+def normalize_postcode(text):
+    """Tidy a postcode into the standard "E1 4NS" form — or the bare outward code "E1".
+    Returns None if it does not look like a UK postcode."""
+    compact = re.sub(r'\s+', '', (text or '').upper())
+    match = FULL_POSTCODE.match(compact)
+    if match:
+        return f'{match.group(1)} {match.group(2)}'
+    if OUTWARD_CODE.match(compact):
+        return compact
+    return None
+
+
+def outward_code(postcode):
+    """Return the outward code — 'E1 4NS' -> 'E1' (and 'E1' stays 'E1')."""
+    return postcode.split(' ')[0]
+
+
+def geocode(text):
+    """Return (latitude, longitude) for a UK postcode, or None if we do not know it."""
+    from .models import PostcodeCentroid
+    # imported here because models.py imports this module
+
+    postcode = normalize_postcode(text)
+    if not postcode:
+        return None
+
+    candidates = [postcode]
+    if ' ' in postcode:
+        candidates.append(outward_code(postcode))
+        # fall back to the district centroid when the exact postcode is not in the dataset
+
+    found = {
+        code: (latitude, longitude)
+        for code, latitude, longitude in PostcodeCentroid.objects.filter(
+            postcode__in=candidates
+        ).values_list('postcode', 'latitude', 'longitude')
+    }
+    # one query for both the full postcode and its outward code
+    for candidate in candidates:
+        if candidate in found:
+            return found[candidate]
+    return None
+
+
+def grid_cell(latitude, longitude):
+    """Number of the grid square containing this point."""
+    row = math.floor(latitude / GRID_DEGREES)
+    column = math.floor(longitude / GRID_DEGREES)
+    return row * GRID_ROW + column
+
+
+def cells_within(latitude, longitude, radius_km):
+    """Every grid square that overlaps the bounding box of a circle."""
+    lat_delta = radius_km / KM_PER_DEGREE
+    lon_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    # longitude degrees get shorter further from the equator, so widen the box to compensate
+
+    first_row = math.floor((latitude - lat_delta) / GRID_DEGREES)
+    last_row = math.floor((latitude + lat_delta) / GRID_DEGREES)
+    first_col = math.floor((longitude - lon_delta) / GRID_DEGREES)
+    last_col = math.floor((longitude + lon_delta) / GRID_DEGREES)
+    return [
+        row * GRID_ROW + column
+        for row in range(first_row, last_row + 1)
+        for column in range(first_col, last_col + 1)
+    ]
+
+
+def rooms_near(queryset, latitude, longitude, radius_km):
+    """Keep rooms within radius_km of the point and annotate them with `distance_sq`.
+
+    distance_sq is the squared distance in "degrees of latitude" using the equirectangular
+    approximation — plain arithmetic, so it works on SQLite and Postgres alike, and it
+    sorts in the same order as the real distance. distance_km() converts it back.
+    Over the distances students search (a few km) the error is far below 1%.
+    """
+    lon_scale = math.cos(math.radians(latitude))
+    # computed once here in Python, so the SQL needs no trigonometry
+
+    queryset = queryset.filter(geo_cell__in=cells_within(latitude, longitude, radius_km))
+    # the grid index narrows 100k rooms down to the few hundred in nearby squares
+
+    dy = F('latitude') - latitude
+    dx = (F('longitude') - longitude) * lon_scale
+    queryset = queryset.annotate(
+        distance_sq=ExpressionWrapper(dy * dy + dx * dx, output_field=FloatField())
+    )
+    limit = (radius_km / KM_PER_DEGREE) ** 2
+    return queryset.filter(distance_sq__lte=limit)
+    # the grid squares are a rough box — this trims the corners to an exact circle
+
+
+def distance_km(distance_sq):
+    """Convert the distance_sq annotation into kilometres (rounded to 10m)."""
+    return round(math.sqrt(distance_sq) * KM_PER_DEGREE, 2)
+
+
+def locate_room(room):
+    """Fill in a room's latitude, longitude and geo_cell from its postcode.
+    Called from Room.save() — unknown postcodes leave the room without coordinates."""
+    point = geocode(room.postcode) if room.postcode else None
+    if point:
+        room.latitude, room.longitude = point
+        room.geo_cell = grid_cell(*point)
+    else:
+        room.latitude = room.longitude = room.geo_cell = None
@@ -7,11 +7,19 @@ but it allows HTTPS requests to googleapis.com — so we use Gmail's API instead
 import base64
 # base64 encoding is required by the Gmail API — the email must be sent as a base64 string
 
+import json
 import logging
+import re
+import threading
+import time
+import uuid
 from email.mime.text import MIMEText
 # MIMEText builds a properly formatted email object (with headers like To, From, Subject)
+from email.parser import BytesParser
+# splits the multipart answer of a batch request into its parts
 
 import requests
+import requests.adapters
 # requests is an HTTP library — we use it to call the Gmail API over HTTPS
 
 from django.conf import settings as django_settings
@@ -20,19 +28,51 @@ from django.conf import settings as django_settings
 logger = logging.getLogger(__name__)
 # logger for this file — writes to the Django log
 
-TOKEN_URL = 'https://oauth2.googleapis.com/token'
+TOKEN_URL = django_settings.GMAIL_TOKEN_URL
 # Google's OAuth2 endpoint — we send our refresh token here to get a fresh access token
 
-SEND_URL = 'https://gmail.googleapis.com/gmail/v1/users/me/messages/send'
+SEND_URL = f'{django_settings.GMAIL_API_URL}/gmail/v1/users/me/messages/send'
 # Gmail API endpoint that actually sends the email
 
+BATCH_URL = django_settings.GMAIL_BATCH_URL
+# Gmail's batch endpoint — many sends in one multipart request (see send_bulk)
+# (all three come from settings so they can point at a local fake server during development)
 
-def _get_access_token():
+TOKEN_REFRESH_MARGIN = 120
+# an access token is replaced this many seconds before Google says it expires, so a send
+# never goes out with a token that runs out on the way
+
+_token = None
+# (access token, expires at — time.monotonic()) shared by every thread in this process
+_token_lock = threading.Lock()
+# only one thread asks Google for a new token at a time — the others wait and reuse it
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session():
+    """One requests.Session per process — keeps the HTTPS connections to Google open
+    between emails instead of a new TCP + TLS handshake for every request."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=10)
+                # two hosts (oauth2 and gmail), up to 10 open connections to each
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def _request_access_token():
     """Swap our stored refresh token for a short-lived access token.
     Refresh tokens last forever (unless revoked), but access tokens expire after ~1 hour.
-    So every time we want to send an email, we get a fresh access token first."""
+    Returns (access token, seconds until it expires)."""
 
-    resp = requests.post(TOKEN_URL, data={
+    resp = _get_session().post(TOKEN_URL, data={
         'client_id': django_settings.GMAIL_CLIENT_ID,
         # our Google Cloud OAuth client ID
 
@@ -50,16 +90,40 @@ def _get_access_token():
     resp.raise_for_status()
     # raises an exception if Google returned an error (like 401 Unauthorized)
 
-    return resp.json()['access_token']
+    data = resp.json()
     # the response JSON contains {"access_token": "ya29.a0AfH6SM...", "expires_in": 3599, ...}
+    return data['access_token'], int(data.get('expires_in', 3600))
 
 
-def send_email(to, subject, body):
-    """Send a plain-text email via the Gmail REST API.
-    Called from the password reset view to send the reset link."""
+def _get_access_token():
+    """A valid access token — the cached one, or a new one when it is close to expiring."""
+    global _token
+    token = _token
+    if token and token[1] - time.monotonic() > TOKEN_REFRESH_MARGIN:
+        return token[0]
+        # the usual case — no lock, no request to Google
+
+    with _token_lock:
+        token = _token
+        if token and token[1] - time.monotonic() > TOKEN_REFRESH_MARGIN:
+            return token[0]
+            # another thread refreshed it while we waited for the lock
+        requested_at = time.monotonic()
+        access_token, expires_in = _request_access_token()
+        _token = (access_token, requested_at + expires_in)
+        return access_token
+
 
-    access_token = _get_access_token()
-    # get a fresh access token (valid for ~1 hour)
+def _forget_access_token(access_token):
+    """Drop the cached token after Google rejected it (e.g. it was revoked)."""
+    global _token
+    with _token_lock:
+        if _token and _token[0] == access_token:
+            _token = None
+
+
+def _raw_message(to, subject, body):
+    """The email as the base64url string Gmail's API expects in {"raw": ...}."""
 
     # build the email using Python's built-in email library
     msg = MIMEText(body)
@@ -74,21 +138,43 @@ def send_email(to, subject, body):
     msg['subject'] = subject
     # the email subject line
 
-    raw = base64.urlsafe_b64encode(msg.as_bytes()).decode()
+    return base64.urlsafe_b64encode(msg.as_bytes()).decode()
     # Gmail API requires the entire email to be base64url-encoded
     # .as_bytes() converts the MIME message to raw bytes
     # base64.urlsafe_b64encode encodes it (uses - and _ instead of + and /)
     # .decode() converts bytes back to a string for JSON serialization
 
-    resp = requests.post(
-        SEND_URL,
-        headers={
-            'Authorization': f'Bearer {access_token}',
-            # Bearer token authentication — proves we are authorized to send as this Gmail account
 
-            'Content-Type': 'application/json',
-        },
-        json={'raw': raw},
+def _authorized_post(url, headers, **kwargs):
+    """POST with our access token — if Google says the cached token is no longer valid,
+    get a new one and try once more."""
+    for attempt in range(2):
+        access_token = _get_access_token()
+        # cached for about an hour — usually no extra round-trip to Google
+
+        resp = _get_session().post(
+            url,
+            headers={
+                'Authorization': f'Bearer {access_token}',
+                # Bearer token authentication — proves we are authorized to send as this Gmail account
+                **headers,
+            },
+            **kwargs,
+        )
+        if resp.status_code != 401 or attempt:
+            return resp
+        _forget_access_token(access_token)
+        # the cached token stopped working early — get a new one and try once more
+
+
+def send_email(to, subject, body):
+    """Send a plain-text email via the Gmail REST API.
+    Used by the outbox worker (outbox.GmailTransport) to send each queued email."""
+
+    resp = _authorized_post(
+        SEND_URL,
+        headers={'Content-Type': 'application/json'},
+        json={'raw': _raw_message(to, subject, body)},
         # the API expects {"raw": "<base64-encoded-email>"}
 
         timeout=15,
@@ -100,3 +186,150 @@ def send_email(to, subject, body):
     # log the success with the Gmail message ID for debugging
 
     return resp.json()
+
+
+# ============================================================
+# BATCH SENDING — many emails per HTTP request
+# ============================================================
+# Gmail's batch endpoint takes a multipart/mixed body where each part is one whole HTTP
+# request (here: POST .../messages/send) and answers with one HTTP response per part.
+# It saves the round-trips, not the quota: every send still costs its quota units, and
+# when we go over, individual parts come back 429 — send_bulk retries those more slowly.
+
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+# per-message answers worth another try — rate limited, or a hiccup on Google's side
+
+
+def _batch_body(raws, boundary):
+    parts = []
+    for i, raw in enumerate(raws):
+        parts.append(
+            f'--{boundary}\r\n'
+            'Content-Type: application/http\r\n'
+            f'Content-ID: <item{i}>\r\n'
+            '\r\n'
+            'POST /gmail/v1/users/me/messages/send\r\n'
+            'Content-Type: application/json\r\n'
+            '\r\n'
+            f'{json.dumps({"raw": raw})}\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n')
+    return ''.join(parts).encode()
+
+
+def _parse_batch_response(resp, count):
+    """Split a batch response into one (status code, JSON body) per request, in order."""
+    envelope = f'Content-Type: {resp.headers.get("Content-Type", "")}\r\n\r\n'.encode() + resp.content
+    message = BytesParser().parsebytes(envelope)
+    # the email package already knows how to split multipart/mixed
+
+    results = [(502, {'error': {'message': 'No response for this message in the batch.'}})] * count
+    for part in message.get_payload() if message.is_multipart() else []:
+        index = re.search(r'item(\d+)', part.get('Content-ID', ''))
+        if not index or int(index.group(1)) >= count:
+            continue
+        http_response = part.get_payload(decode=True) or b''
+        status_line, _, rest = http_response.partition(b'\r\n')
+        body = re.split(rb'\r?\n\r?\n', rest, maxsplit=1)[-1].strip()
+        # each part is "HTTP/1.1 200 OK", headers, blank line, JSON
+        try:
+            code = int(status_line.split()[1])
+            data = json.loads(body) if body else {}
+        except (IndexError, ValueError):
+            code, data = 502, {'error': {'message': 'Unreadable response in the batch.'}}
+        results[int(index.group(1))] = (code, data)
+    return results
+
+
+def send_batch(messages):
+    """Send up to GMAIL_BATCH_SIZE emails — (to, subject, body) tuples — in one request.
+    Returns (results, retry_after): one {'to', 'status', 'id', 'error'} per message, in
+    order, and Google's Retry-After in seconds (0 if none). A request that fails as a
+    whole (e.g. 429 for the entire batch) gives every message that status."""
+    messages = list(messages)
+    if len(messages) > django_settings.GMAIL_BATCH_SIZE:
+        raise ValueError(f'At most {django_settings.GMAIL_BATCH_SIZE} messages per batch.')
+    boundary = f'batch_{uuid.uuid4().hex}'
+
+    resp = _authorized_post(
+        BATCH_URL,
+        headers={'Content-Type': f'multipart/mixed; boundary={boundary}'},
+        data=_batch_body([_raw_message(*message) for message in messages], boundary),
+        timeout=60,
+    )
+    if resp.ok:
+        answers = _parse_batch_response(resp, len(messages))
+    else:
+        answers = [(resp.status_code, {'error': {'message': resp.text[:500]}})] * len(messages)
+
+    results = []
+    for (to, _subject, _body), (code, data) in zip(messages, answers):
+        results.append({
+            'to': to,
+            'status': code,
+            'id': data.get('id', '') if code < 300 else '',
+            'error': '' if code < 300 else str(data.get('error', {}).get('message', data))[:500],
+        })
+    return results, _retry_after(resp)
+
+
+def _retry_after(resp):
+    try:
+        return float(resp.headers.get('Retry-After', 0))
+    except ValueError:
+        return 0.0
+
+
+def send_bulk(messages, batch_size=None, max_attempts=5):
+    """Send any number of (to, subject, body) emails through the batch endpoint.
+
+    Messages answered with a retryable status (see RETRYABLE_STATUSES) are sent again in
+    a later round, up to max_attempts times. Backpressure: each throttled batch doubles a
+    pause between batches (from GMAIL_BATCH_BACKOFF up to GMAIL_BATCH_MAX_BACKOFF, or
+    longer if Google sends Retry-After); each clean batch halves it again.
+
+    Returns one result dict per message, in the order given."""
+    batch_size = min(batch_size or django_settings.GMAIL_BATCH_SIZE, django_settings.GMAIL_BATCH_SIZE)
+    messages = list(messages)
+    results = [None] * len(messages)
+    attempts = [0] * len(messages)
+    pending = list(range(len(messages)))
+    pause = 0.0
+
+    while pending:
+        retry = []
+        for start in range(0, len(pending), batch_size):
+            if pause:
+                time.sleep(pause)
+            chunk = pending[start:start + batch_size]
+            try:
+                batch_results, retry_after = send_batch([messages[i] for i in chunk])
+            except requests.RequestException as e:
+                batch_results, retry_after = [
+                    {'to': messages[i][0], 'status': 503, 'id': '', 'error': f'{type(e).__name__}: {e}'[:500]}
+                    for i in chunk
+                ], 0.0
+                # couldn't reach Google at all — treated like a 503 for every message
+
+            throttled = False
+            for i, result in zip(chunk, batch_results):
+                attempts[i] += 1
+                results[i] = result
+                if result['status'] in RETRYABLE_STATUSES:
+                    throttled = True
+                    if attempts[i] < max_attempts:
+                        retry.append(i)
+
+            if throttled:
+                pause = min(django_settings.GMAIL_BATCH_MAX_BACKOFF, max(pause * 2, django_settings.GMAIL_BATCH_BACKOFF))
+                pause = max(pause, retry_after)
+                logger.warning(f"[Gmail API] Batch throttled — pausing {pause:.1f}s between batches")
+            else:
+                pause /= 2
+                if pause < django_settings.GMAIL_BATCH_BACKOFF:
+                    pause = 0.0
+        pending = retry
+
+    sent = sum(1 for result in results if result['status'] < 300)
+    logger.info(f"[Gmail API] Bulk send: {sent} of {len(messages)} emails sent")
+    return results
@@ -0,0 +1,98 @@
+"""
+Password hashing off the request threads.
+PBKDF2 is slow on purpose — a few hundred milliseconds of CPU per hash — so a burst of
+logins at the start of term used to occupy every server thread and starve the rest of
+the site. Signup, login and password reset now hand their hashing to a small, bounded
+pool instead:
+
+    PASSWORD_HASHING_WORKERS         hashes computed at the same time (about one per CPU core)
+    PASSWORD_HASHING_MAX_QUEUE       hashes allowed to wait for a worker
+    PASSWORD_HASHING_QUEUE_TIMEOUT   longest a hash may wait before it is given up (seconds)
+
+When the queue is full, or a request waited too long for its hash, PasswordHashingBusy is raised and the
+view answers 503 so the browser can retry — other endpoints keep their share of the CPU.
+hashlib releases the GIL while it hashes, so the workers really do run in parallel.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing pool is saturated — the view turns it into a 503."""
+
+
+class HashingPool:
+    def __init__(self, workers, max_queue, queue_timeout):
+        self.queue_timeout = queue_timeout
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        # one slot per hash that is running or waiting — when none are free we refuse at once
+
+    def submit(self, fn, *args):
+        """Queue fn(*args) — returns a concurrent.futures.Future, or raises PasswordHashingBusy."""
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashingBusy()
+        queued_at = time.monotonic()
+
+        def job():
+            if time.monotonic() - queued_at > self.queue_timeout:
+                raise PasswordHashingBusy()
+                # the caller has waited long enough — skip the work and let them retry
+            return fn(*args)
+
+        try:
+            future = self._executor.submit(job)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        # runs once the job finishes or is cancelled before it starts — either way the slot is free
+        return future
+
+    def run(self, fn, *args):
+        """Run fn(*args) in the pool and wait for it (for sync code)."""
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=self.queue_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise PasswordHashingBusy()
+
+    async def arun(self, fn, *args):
+        """Run fn(*args) in the pool without blocking the event loop while it waits."""
+        future = self.submit(fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise PasswordHashingBusy()
+        # the wait itself is bounded: a login stuck behind a long queue gets its 503 after
+        # PASSWORD_HASHING_QUEUE_TIMEOUT, not when a worker finally reaches it — cancel() drops
+        # the job if it hasn't started (a hash already running just finishes unseen)
+
+
+@lru_cache(maxsize=None)
+def get_pool():
+    """The process-wide pool, sized from settings — created on first use."""
+    return HashingPool(
+        settings.PASSWORD_HASHING_WORKERS,
+        settings.PASSWORD_HASHING_MAX_QUEUE,
+        settings.PASSWORD_HASHING_QUEUE_TIMEOUT,
+    )
+
+
+async def amake_password(raw_password):
+    """Hash a new password (same output as Student.set_password)."""
+    return await get_pool().arun(hashers.make_password, raw_password)
+
+
+async def acheck_password(raw_password, encoded):
+    """Check a password against a stored hash (same result as Student.check_password)."""
+    return await get_pool().arun(hashers.check_password, raw_password, encoded)
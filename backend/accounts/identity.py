@@ -0,0 +1,75 @@
+"""
+Who is making this request — resolved once, into request.student.
+StudentMiddleware sets request.student to the logged-in Student (or None) the first
+time a view looks at it, so views no longer repeat the session lookup and
+Student.objects.get() themselves.
+
+Student rows are also kept in a small per-process cache for STUDENT_CACHE_TTL seconds,
+so most authenticated requests skip the primary-key query entirely. signals.py drops a
+student from this process's cache whenever their row is saved or deleted; other server
+processes see the change once their copy expires, which is why the TTL is short.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .models import Student
+
+
+_rows = OrderedDict()
+# student id -> (expires at, Student) — oldest first, so the least recently used is evicted
+_lock = threading.Lock()
+# requests run in several threads at once
+_invalidations = 0
+# bumped by forget() — a lookup that raced with a save doesn't cache what it read
+
+
+def get_student(student_id):
+    """The Student with this id, or None — from the cache when we have a fresh copy.
+    Each caller gets its own copy, so a view can change and save it safely."""
+    now = time.monotonic()
+    with _lock:
+        entry = _rows.get(student_id)
+        if entry and entry[0] > now:
+            _rows.move_to_end(student_id)
+            return copy.copy(entry[1])
+        seen_invalidations = _invalidations
+
+    student = Student.objects.filter(id=student_id).first()
+    if student is None:
+        return None
+
+    with _lock:
+        if seen_invalidations == _invalidations:
+            _rows[student_id] = (now + settings.STUDENT_CACHE_TTL, student)
+            _rows.move_to_end(student_id)
+            while len(_rows) > settings.STUDENT_CACHE_SIZE:
+                _rows.popitem(last=False)
+    return copy.copy(student)
+
+
+def forget(student_id):
+    """Drop a student from this process's cache — called when their row changes."""
+    global _invalidations
+    with _lock:
+        _rows.pop(student_id, None)
+        _invalidations += 1
+
+
+def clear():
+    global _invalidations
+    with _lock:
+        _rows.clear()
+        _invalidations += 1
+
+
+def student_for_request(request):
+    """The logged-in Student for this request's session, or None."""
+    student_id = request.session.get('student_id')
+    if not student_id:
+        return None
+    return get_student(student_id)
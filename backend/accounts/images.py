@@ -0,0 +1,171 @@
+"""
+Resized and re-encoded copies ("variants") of room photos.
+Landlords upload phone photos of several MB straight into room_images/, and every listing
+card used to download the original. After a room is saved, each new photo is decoded
+once and written at the ROOM_IMAGE_WIDTHS that are smaller than it:
+
+    room_images/variants/<photo name>/<width>-<hash>.jpg     always — the fallback every browser reads
+    room_images/variants/<photo name>/<width>-<hash>.webp    when Pillow was built with WebP
+    room_images/variants/<photo name>/<width>-<hash>.avif    when Pillow was built with AVIF
+
+<hash> is the start of the variant's own SHA-256, so a name never changes content and can
+be cached for good (media_store.serve). Photos are stored by content hash too, so the same
+photo on several rooms shares one set of variants — it is only resized once.
+
+The work runs in a small thread pool (ROOM_IMAGE_WORKERS) once the save has committed,
+so the upload request does not wait for it; Pillow releases the GIL while it resizes and
+encodes. What was written is recorded in RoomImage.variants (with the photo's width and
+height), and the serializers turn it into srcset strings. Until a photo's variants exist
+the API simply offers the original. `python manage.py backfill_image_variants` does the
+same for photos uploaded before this existed.
+"""
+
+import hashlib
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Room, RoomImage
+
+logger = logging.getLogger(__name__)
+
+
+FORMATS = {
+    # format: (Pillow encoder, file extension, MIME type)
+    'avif': ('AVIF', 'avif', 'image/avif'),
+    'webp': ('WEBP', 'webp', 'image/webp'),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+}
+EXIF_ORIENTATION = 0x0112
+
+SOURCE_ORDER = ['avif', 'webp']
+# <picture>/<source> order — the browser takes the first type it supports, smallest first
+
+
+@lru_cache(maxsize=None)
+def available_formats():
+    """The formats this Pillow build can write — JPEG always, WebP/AVIF when compiled in."""
+    Image.init()
+    # loads every format plugin, so Image.SAVE lists all the encoders there are
+    return [fmt for fmt in ('avif', 'webp') if FORMATS[fmt][0] in Image.SAVE] + ['jpeg']
+    # an encoder Pillow has registered, whichever plugin provides it
+
+
+def target_widths(width):
+    """The ROOM_IMAGE_WIDTHS worth making for a photo this wide — never an upscale. A photo
+    narrower than the largest width also gets a copy at its own width, re-encoded."""
+    widths = [w for w in settings.ROOM_IMAGE_WIDTHS if w < width]
+    if width <= max(settings.ROOM_IMAGE_WIDTHS):
+        widths.append(width)
+    return sorted(set(widths))
+
+
+def variant_name(name, width, fmt, data):
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    return f'room_images/variants/{stem}/{width}-{digest}.{FORMATS[fmt][1]}'
+
+
+def _save(name, data):
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(data))
+    # the name is derived from the bytes, so an existing file already holds exactly these
+
+
+def generate_variants(name):
+    """Write every variant of the stored photo `name`.
+    Returns (width, height, variants) — variants is {format: [[width, file name], ...]}."""
+    with default_storage.open(name, 'rb') as f:
+        image = Image.open(f)
+        turned = image.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8)
+        size = image.size[::-1] if turned else image.size
+        # the upright size of the original, read from the header before any decoding
+
+        widest = max(settings.ROOM_IMAGE_WIDTHS)
+        image.draft('RGB', (1, widest) if turned else (widest, 1))
+        # JPEG only: decode straight at 1/2, 1/4 or 1/8 scale when the result is still at least
+        # `widest` across (once rotated) — a full decode is most of the cost of a phone photo
+        image = ImageOps.exif_transpose(image)
+        # phones store the rotation in EXIF — apply it, since the variants drop the EXIF data
+        image = image.convert('RGB')
+
+    width, height = image.size
+    variants = {fmt: [] for fmt in available_formats()}
+    for target in sorted(target_widths(width), reverse=True):
+        if target != image.width:
+            image = image.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+            # each size is made from the previous, larger one — cheaper than from the original
+        for fmt in variants:
+            buffer = io.BytesIO()
+            image.save(buffer, FORMATS[fmt][0], quality=settings.ROOM_IMAGE_QUALITY[fmt], optimize=fmt == 'jpeg')
+            data = buffer.getvalue()
+            file_name = variant_name(name, target, fmt, data)
+            # hashes the encoded bytes — worked out once per variant
+            _save(file_name, data)
+            variants[fmt].append([target, file_name])
+
+    for entries in variants.values():
+        entries.sort()
+    return size[0], size[1], variants
+
+
+def update_image_variants(image_id, force=False):
+    """Make a photo's variants if it has none yet (always with force=True) and record them.
+    Returns True when variants were made."""
+    image = RoomImage.objects.filter(pk=image_id).only('id', 'room_id', 'file', 'variants').first()
+    if image is None or (image.variants is not None and not force):
+        return False
+
+    twin = None
+    if not force:
+        twin = (
+            RoomImage.objects.filter(file=image.file.name, variants__isnull=False)
+            .exclude(pk=image_id).values_list('width', 'height', 'variants').first()
+        )
+        # the same photo on another room (or listed again) — its variants are ours too
+    try:
+        width, height, variants = twin or generate_variants(image.file.name)
+    except Exception as e:
+        logger.error(f"[Images] Could not make variants of {image.file.name}: {type(e).__name__}: {e}")
+        return False
+        # a corrupt or missing file — the API keeps offering the original
+
+    RoomImage.objects.filter(pk=image_id, file=image.file.name).update(width=width, height=height, variants=variants)
+    # only if the photo wasn't replaced meanwhile — the replacement has its own job
+    Room.objects.filter(pk=image.room_id).update(updated_at=timezone.now())
+    # a plain UPDATE so the room's save() and signals don't run again; the new updated_at
+    # gives the room fresh payload-cache and ETag keys with the srcsets in
+    return True
+
+
+@lru_cache(maxsize=None)
+def get_pool():
+    """The process-wide pool for variant generation — created on first use."""
+    return ThreadPoolExecutor(max_workers=settings.ROOM_IMAGE_WORKERS, thread_name_prefix='room-images')
+
+
+def _run(image_id):
+    try:
+        update_image_variants(image_id)
+    except Exception:
+        logger.exception(f"[Images] Variant generation failed for photo {image_id}")
+    finally:
+        close_old_connections()
+        # each pool thread has its own database connection — don't let it go stale
+
+
+def schedule(image):
+    """Generate a new photo's variants in the background once the current transaction
+    commits (straight away outside a transaction)."""
+    if image.variants is None:
+        image_id = image.pk
+        transaction.on_commit(lambda: get_pool().submit(_run, image_id))
@@ -0,0 +1,27 @@
+"""
+python manage.py backfill_conversations
+
+Rebuilds the Conversation summary table (chat list previews and unread counters) from
+the messages table. Migration 0015 runs this once; run it again if messages are edited
+outside the views, e.g. deleted in the admin or loaded with raw SQL.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.conversations import rebuild_conversations
+from accounts.models import Conversation, Message
+
+
+class Command(BaseCommand):
+    help = 'Rebuild conversation summaries and unread counters from the messages table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # one transaction, so the chat list never sees a half-built table
+            total = rebuild_conversations(Message, Conversation, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} conversations.'))
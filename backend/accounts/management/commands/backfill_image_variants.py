@@ -0,0 +1,46 @@
+"""
+python manage.py backfill_image_variants [--workers 4] [--force]
+
+Makes the resized WebP/AVIF/JPEG copies (accounts/images.py) for room photos that don't
+have them yet — photos uploaded before variants existed, or ones whose background job
+failed. Photos are processed in parallel by --workers threads; Pillow releases the GIL
+while it decodes, resizes and encodes, so this scales with CPU cores. --force remakes
+every photo's variants, e.g. after changing ROOM_IMAGE_WIDTHS or ROOM_IMAGE_QUALITY.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from accounts import images
+from accounts.models import RoomImage
+
+
+def _process(image_id, force):
+    try:
+        return images.update_image_variants(image_id, force=force)
+    finally:
+        connection.close()
+        # each worker thread opened its own database connection
+
+
+class Command(BaseCommand):
+    help = 'Generate resized variants for room photos that are missing them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+        parser.add_argument('--force', action='store_true', help='remake variants that already exist')
+
+    def handle(self, *args, **options):
+        photos = RoomImage.objects.order_by('id')
+        if not options['force']:
+            photos = photos.filter(variants__isnull=True)
+        image_ids = list(photos.values_list('id', flat=True))
+        self.stdout.write(f'{len(image_ids)} photos to process with {options["workers"]} workers.')
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            made = sum(pool.map(_process, image_ids, [options['force']] * len(image_ids)))
+
+        self.stdout.write(self.style.SUCCESS(f'Made variants for {made} of {len(image_ids)} photos.'))
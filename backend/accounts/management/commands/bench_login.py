@@ -0,0 +1,146 @@
+"""
+python manage.py bench_login [--logins 200] [--concurrency 50]
+
+Login-throughput benchmark. Creates a throwaway student, fires a burst of concurrent
+POST /api/login/ requests at it through the project's ASGI application (the one
+studentnest/asgi.py serves), and meanwhile keeps asking GET /api/check-session/ — the cheap request every page makes — to show whether
+the burst starves the rest of the site. Prints logins per second, login latency, how
+many logins were turned away with 503 (see PASSWORD_HASHING_*) and the check-session
+latency during the burst. Login rate limits are switched off for the run, and the command
+fails if most logins do not succeed. The student is deleted again at the end.
+
+The requests are ASGI calls straight into get_asgi_application(), not Django's AsyncClient:
+the test client runs every request's sync code on one shared thread, so the probe would
+measure that queue instead of the server — the real handler gives each request its own.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from accounts.models import Student
+
+
+PASSWORD = 'Bench-login-password-1!'
+
+
+async def request(app, method, path, body=b''):
+    """Make one HTTP request to an ASGI application and return its status code."""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [
+            (b'host', b'testserver'),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.Event().wait()
+            # the client never hangs up — the handler stops listening once it has answered
+        received = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    status = None
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    return status
+
+
+def percentile(timings, fraction):
+    if not timings:
+        return 0.0
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+    # in milliseconds
+
+
+class Command(BaseCommand):
+    help = 'Measure login throughput and how a burst of logins affects other requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=50)
+
+    def handle(self, *args, **options):
+        email = f'bench-{uuid.uuid4().hex[:12]}@example.invalid'
+        student = Student(name='Login Benchmark', email=email, student_id='00000000', course='Benchmark')
+        student.set_password(PASSWORD)
+        student.save()
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], RATE_LIMITS={}):
+                # the requests' host, and no per-email login limit in the way of the burst
+                results = asyncio.run(self.burst(email, options['logins'], options['concurrency']))
+        finally:
+            student.delete()
+        self.report(*results)
+
+    async def burst(self, email, logins, concurrency):
+        app = get_asgi_application()
+        body = json.dumps({'email': email, 'password': PASSWORD}).encode()
+        login_times, statuses, probe_times = [], {}, []
+        remaining = iter(range(logins))
+        done = asyncio.Event()
+
+        async def log_in():
+            for _ in remaining:
+                started = time.perf_counter()
+                status = await request(app, 'POST', '/api/login/', body)
+                login_times.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await request(app, 'GET', '/api/check-session/')
+                probe_times.append(time.perf_counter() - started)
+                await asyncio.sleep(0.05)
+
+        await request(app, 'GET', '/api/check-session/')
+        # one request before timing, so loading the middleware and URLconf is not counted
+        started = time.perf_counter()
+        prober = asyncio.create_task(probe())
+        await asyncio.gather(*(log_in() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await prober
+        return elapsed, login_times, statuses, probe_times
+
+    def report(self, elapsed, login_times, statuses, probe_times):
+        succeeded = statuses.get(200, 0)
+        self.stdout.write(f'{len(login_times)} logins in {elapsed:.2f}s — {succeeded / elapsed:.1f} successful logins/s')
+        self.stdout.write(f'status codes: {dict(sorted(statuses.items()))}')
+        self.stdout.write(
+            f'login latency: p50 {percentile(login_times, 0.5):.0f}ms, '
+            f'p95 {percentile(login_times, 0.95):.0f}ms, max {percentile(login_times, 1):.0f}ms'
+        )
+        self.stdout.write(
+            f'check-session during the burst ({len(probe_times)} requests): '
+            f'p50 {percentile(probe_times, 0.5):.0f}ms, p95 {percentile(probe_times, 0.95):.0f}ms'
+        )
+        if succeeded * 2 < len(login_times):
+            raise CommandError(f'only {succeeded} of {len(login_times)} logins succeeded — the numbers above are not a login benchmark')
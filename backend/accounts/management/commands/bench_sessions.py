@@ -0,0 +1,114 @@
+"""
+python manage.py bench_sessions [--rounds 10] [--stores cached_db db cache cookie] [--save-every-request]
+
+Database-write benchmark for ordinary page loads. Logs a student in once per session store
+(see SESSION_ENGINES in settings.py), then makes --rounds passes over the read endpoints every
+page calls — check-session, rooms, conversations, messages, unread-count, favorites — and
+counts every INSERT/UPDATE/DELETE they run with CaptureQueriesContext: session saves, presence
+flushes to the students table, anything else. Prints writes per request for each store, by
+table, and the session SELECTs. --save-every-request turns SESSION_SAVE_EVERY_REQUEST back on,
+to measure how it used to be.
+
+It runs in a test database created for the run and dropped afterwards (like manage.py test),
+so it never writes to the configured one.
+"""
+
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import (
+    CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+from accounts.models import Student
+
+
+PASSWORD = 'Bench-session-password-1!'
+ENDPOINTS = [
+    '/api/check-session/',
+    '/api/rooms/',
+    '/api/conversations/',
+    '/api/messages/',
+    '/api/messages/unread-count/',
+    '/api/favorites/',
+]
+WRITE = re.compile(r'^\s*(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+["`]?(\w+)', re.IGNORECASE)
+# the table an INSERT/UPDATE/DELETE writes to
+
+
+def count_statements(queries):
+    """(writes per table, session SELECTs) among the captured statements."""
+    writes = Counter()
+    session_selects = 0
+    for query in queries:
+        match = WRITE.match(query['sql'])
+        if match:
+            writes[match.group(1)] += 1
+        elif query['sql'].lstrip().upper().startswith('SELECT') and 'django_session' in query['sql']:
+            session_selects += 1
+    return writes, session_selects
+
+
+class Command(BaseCommand):
+    help = 'Count the database writes and session reads each read request makes, per session store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=10)
+        parser.add_argument('--stores', nargs='+', default=list(settings.SESSION_ENGINES),
+                            choices=list(settings.SESSION_ENGINES))
+        parser.add_argument('--save-every-request', action='store_true',
+                            help='measure with SESSION_SAVE_EVERY_REQUEST = True (the old behaviour)')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        # also adds "testserver" to ALLOWED_HOSTS for the test client
+        databases = setup_databases(verbosity=0, interactive=False)
+        try:
+            self.run(options)
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+
+    def run(self, options):
+        email = 'bench-sessions@example.invalid'
+        student = Student(name='Session Benchmark', email=email, student_id='00000000', course='Benchmark')
+        student.set_password(PASSWORD)
+        student.save()
+        for store in options['stores']:
+            with override_settings(
+                SESSION_ENGINE=settings.SESSION_ENGINES[store],
+                SESSION_SAVE_EVERY_REQUEST=options['save_every_request'],
+                RATE_LIMITS={},
+                # no login limit in the way of the benchmark
+            ):
+                self.measure(store, email, options['rounds'])
+
+    def measure(self, store, email, rounds):
+        client = Client()
+        # a new client loads the middleware again, so it picks up the overridden SESSION_ENGINE
+        response = client.post('/api/login/', {'email': email, 'password': PASSWORD}, content_type='application/json')
+        if response.status_code != 200:
+            raise CommandError(f'[{store}] login failed with {response.status_code}: {response.content[:200]!r}')
+
+        requests = selects = 0
+        writes = Counter()
+        for _ in range(rounds):
+            for url in ENDPOINTS:
+                with CaptureQueriesContext(connection) as captured:
+                    response = client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f'[{store}] GET {url} answered {response.status_code}')
+                request_writes, request_selects = count_statements(captured.captured_queries)
+                writes.update(request_writes)
+                selects += request_selects
+                requests += 1
+
+        by_table = ', '.join(f'{table} {count / requests:.2f}' for table, count in writes.most_common()) or 'none'
+        self.stdout.write(
+            f'{store:<10} {requests} requests — writes/request {sum(writes.values()) / requests:.2f} '
+            f'({by_table}), session SELECTs/request {selects / requests:.2f}'
+        )
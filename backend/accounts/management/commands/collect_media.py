@@ -0,0 +1,143 @@
+"""
+python manage.py collect_media [--dry-run] [--grace-hours 24] [--inactive-days 90] [--dedupe]
+
+Deletes room photo files nothing uses any more. Photo files are shared between rooms
+(media_store.py), so deleting a photo row never deletes its file — this does, in steps:
+
+    1. rooms deactivated more than --inactive-days ago lose their photo rows
+    2. (--dedupe) photos uploaded before content addressing are moved to their hashed
+       name, so identical old uploads become one file
+    3. files in the index (MediaBlob) with no references for --grace-hours are deleted
+    4. any other file under room_images/ that no photo or variant refers to — left from
+       replaced photos, older variant sets, failed uploads — is deleted once it is older
+       than --grace-hours
+
+The grace period keeps files that were just uploaded but whose photo row isn't committed
+yet. Meant for a daily scheduled task; run with --dry-run first to see what would go.
+"""
+
+import posixpath
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts import media_store
+from accounts.models import MediaBlob, Room, RoomImage
+
+PHOTO_DIR = 'room_images'
+
+
+def walk(storage, directory):
+    """Every file name under `directory` in the storage, recursively."""
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for sub in directories:
+        yield from walk(storage, posixpath.join(directory, sub))
+
+
+class Command(BaseCommand):
+    help = 'Delete room photo files that no photo uses any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='report what would be deleted, delete nothing')
+        parser.add_argument('--grace-hours', type=float, default=settings.MEDIA_GC_GRACE_HOURS)
+        parser.add_argument('--inactive-days', type=int, default=settings.MEDIA_GC_INACTIVE_ROOM_DAYS,
+                            help='drop the photos of rooms deactivated this long ago (0 = keep them)')
+        parser.add_argument('--dedupe', action='store_true',
+                            help='move photos uploaded before content addressing to their hashed names')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.storage = media_store.room_image_storage()
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+
+        if options['inactive_days']:
+            self.release_inactive_rooms(timezone.now() - timedelta(days=options['inactive_days']))
+        if options['dedupe']:
+            self.dedupe_legacy_files()
+        self.collect_blobs(cutoff)
+        self.sweep_strays(cutoff)
+
+    def release_inactive_rooms(self, before):
+        photos = RoomImage.objects.filter(room__is_active=False, room__updated_at__lt=before)
+        if self.dry_run:
+            self.stdout.write(f'{photos.count()} photos of long-deactivated rooms would be dropped.')
+            return
+        deleted, _ = photos.delete()
+        # one post_delete per row, so each file's reference is released (signals.py)
+        self.stdout.write(f'Dropped {deleted} photos of long-deactivated rooms.')
+
+    def dedupe_legacy_files(self):
+        legacy = sorted(
+            name for name in RoomImage.objects.order_by().values_list('file', flat=True).distinct()
+            if name and not media_store.is_immutable(name)
+        )
+        if self.dry_run:
+            self.stdout.write(f'{len(legacy)} older photo files would be moved to hashed names.')
+            return
+
+        moved = 0
+        for name in legacy:
+            try:
+                with self.storage.open(name, 'rb') as f:
+                    new_name = self.storage.save(f'{PHOTO_DIR}/{posixpath.basename(name)}', File(f))
+            except OSError as e:
+                self.stderr.write(f'Skipping {name}: {e}')
+                continue
+            content_hash = posixpath.splitext(posixpath.basename(new_name))[0]
+            # the storage named it by its hash — identical old uploads all land on one file
+            with transaction.atomic():
+                room_ids = list(RoomImage.objects.filter(file=name).values_list('room_id', flat=True))
+                count = RoomImage.objects.filter(file=name).update(file=new_name, content_hash=content_hash)
+                media_store.retain(new_name, content_hash, count)
+                media_store.release(name, count)
+                Room.objects.filter(pk__in=room_ids).update(updated_at=timezone.now())
+                # new photo URLs — give the rooms fresh payload-cache and ETag keys
+            moved += 1
+            # the old file is now unreferenced and goes after the grace period
+        self.stdout.write(f'Moved {moved} older photo files to hashed names.')
+
+    def collect_blobs(self, cutoff):
+        orphans = MediaBlob.objects.filter(ref_count=0, touched_at__lt=cutoff)
+        if self.dry_run:
+            self.stdout.write(f'{orphans.count()} unreferenced photo files would be deleted.')
+            return
+
+        deleted = 0
+        for blob in orphans.iterator():
+            users = RoomImage.objects.filter(file=blob.name).count()
+            if users:
+                MediaBlob.objects.filter(pk=blob.pk).update(ref_count=users)
+                continue
+                # the count had drifted (e.g. rows changed with a queryset update) — repair it
+            removed, _ = MediaBlob.objects.filter(pk=blob.pk, ref_count=0, touched_at__lt=cutoff).delete()
+            if removed:
+                self.storage.delete(blob.name)
+                deleted += 1
+            # skipped when someone uploaded or used the file again since the query above
+        self.stdout.write(f'Deleted {deleted} unreferenced photo files.')
+
+    def sweep_strays(self, cutoff):
+        live = set(MediaBlob.objects.values_list('name', flat=True))
+        live.update(RoomImage.objects.values_list('file', flat=True))
+        for variants in RoomImage.objects.filter(variants__isnull=False).values_list('variants', flat=True).iterator():
+            live.update(name for entries in variants.values() for _, name in entries)
+            # the variants of the deleted photos are not in here, so they go too
+
+        if not self.storage.exists(PHOTO_DIR):
+            return
+        strays = [
+            name for name in walk(self.storage, PHOTO_DIR)
+            if name not in live and self.storage.get_modified_time(name) < cutoff
+        ]
+        if not self.dry_run:
+            for name in strays:
+                self.storage.delete(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Would delete" if self.dry_run else "Deleted"} {len(strays)} files no photo refers to.'
+        ))
@@ -0,0 +1,20 @@
+"""
+python manage.py flush_presence
+
+Copies the presence heartbeats from the cache into students.last_activity / is_online
+right away. Requests already do this at most once per PRESENCE_FLUSH_INTERVAL; run it
+from cron so the table also catches up (and expired students are marked offline) when
+the site is quiet. It needs the same shared cache backend as the web server.
+"""
+
+from django.core.management.base import BaseCommand
+
+from accounts import presence
+
+
+class Command(BaseCommand):
+    help = 'Write cached presence heartbeats to the students table'
+
+    def handle(self, *args, **options):
+        written = presence.flush()
+        self.stdout.write(self.style.SUCCESS(f'Updated presence for {written} students.'))
@@ -0,0 +1,138 @@
+"""
+python manage.py import_postcodes path/to/postcodes.csv
+
+Loads UK postcode centroids into the PostcodeCentroid table so rooms can be geocoded
+offline. Works with any CSV that has a header row with a postcode column and latitude /
+longitude columns, e.g. the ONS Postcode Directory (pcds, lat, long) or the common
+ukpostcodes.csv (postcode, latitude, longitude). Re-running it updates existing rows.
+"""
+
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts import geo
+from accounts.models import PostcodeCentroid, Room
+
+
+POSTCODE_COLUMNS = ['postcode', 'pcds', 'pcd', 'pcd7', 'pcd8']
+LATITUDE_COLUMNS = ['latitude', 'lat']
+LONGITUDE_COLUMNS = ['longitude', 'long', 'lon', 'lng']
+# header names we recognise, checked case-insensitively in this order
+
+
+def _find_column(header, names, label):
+    lowered = [name.strip().lower() for name in header]
+    for name in names:
+        if name in lowered:
+            return lowered.index(name)
+    raise CommandError(f'No {label} column found — expected one of: {", ".join(names)}')
+
+
+class Command(BaseCommand):
+    help = 'Import UK postcode centroids from a local CSV file for offline geocoding'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='CSV file with postcode, latitude and longitude columns')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--skip-rooms', action='store_true',
+                            help='do not re-geocode existing rooms after the import')
+
+    def _flush(self, batch):
+        PostcodeCentroid.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=['postcode'],
+            update_fields=['latitude', 'longitude'],
+        )
+        # INSERT ... ON CONFLICT (postcode) DO UPDATE — re-imports refresh coordinates in place
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        districts = {}
+        # outward code -> [sum of latitudes, sum of longitudes, count] for the district centroids
+        imported = skipped = 0
+
+        try:
+            handle = open(options['csv_path'], newline='', encoding='utf-8-sig')
+            # utf-8-sig quietly drops the byte-order mark some exports start with
+        except OSError as e:
+            raise CommandError(f'Could not open {options["csv_path"]}: {e}')
+
+        with handle, transaction.atomic():
+            reader = csv.reader(handle)
+            header = next(reader, None)
+            if not header:
+                raise CommandError('The CSV file is empty.')
+            pc_col = _find_column(header, POSTCODE_COLUMNS, 'postcode')
+            lat_col = _find_column(header, LATITUDE_COLUMNS, 'latitude')
+            lon_col = _find_column(header, LONGITUDE_COLUMNS, 'longitude')
+
+            batch = []
+            for row in reader:
+                try:
+                    postcode = geo.normalize_postcode(row[pc_col])
+                    latitude, longitude = float(row[lat_col]), float(row[lon_col])
+                except (IndexError, ValueError):
+                    skipped += 1
+                    continue
+                if not postcode or ' ' not in postcode or not (-90 <= latitude <= 90):
+                    skipped += 1
+                    continue
+                    # the ONS file marks postcodes without a location as latitude 99.999999
+
+                batch.append(PostcodeCentroid(postcode=postcode, latitude=latitude, longitude=longitude))
+                totals = districts.setdefault(geo.outward_code(postcode), [0.0, 0.0, 0])
+                totals[0] += latitude
+                totals[1] += longitude
+                totals[2] += 1
+
+                if len(batch) >= batch_size:
+                    self._flush(batch)
+                    imported += len(batch)
+                    batch = []
+            if batch:
+                self._flush(batch)
+                imported += len(batch)
+
+            district_rows = [
+                PostcodeCentroid(postcode=code, latitude=lat_sum / count, longitude=lon_sum / count)
+                for code, (lat_sum, lon_sum, count) in districts.items()
+            ]
+            for start in range(0, len(district_rows), batch_size):
+                self._flush(district_rows[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} postcodes and {len(districts)} district centroids ({skipped} rows skipped).'
+        ))
+
+        if not options['skip_rooms']:
+            located = self._relocate_rooms(batch_size)
+            self.stdout.write(self.style.SUCCESS(f'Geocoded {located} rooms.'))
+
+    def _relocate_rooms(self, batch_size):
+        """Re-run the postcode lookup for every room now that the dataset has changed."""
+        located = 0
+        batch = []
+        fields = ['latitude', 'longitude', 'geo_cell', 'updated_at']
+        rooms = Room.objects.exclude(postcode='').only('id', 'postcode', 'latitude', 'longitude', 'geo_cell', 'updated_at')
+        for room in rooms.iterator(chunk_size=batch_size):
+            before = (room.latitude, room.longitude, room.geo_cell)
+            geo.locate_room(room)
+            located += room.latitude is not None
+            if (room.latitude, room.longitude, room.geo_cell) == before:
+                continue
+                # unchanged rooms keep their updated_at, so their caches and ETags stay valid
+            room.updated_at = timezone.now()
+            batch.append(room)
+            if len(batch) >= batch_size:
+                Room.objects.bulk_update(batch, fields)
+                batch = []
+        if batch:
+            Room.objects.bulk_update(batch, fields)
+        # bulk_update skips save() and its signals, so the search index and amenity mask are
+        # left alone — and auto_now, so updated_at is set by hand: the ETags, the cached room
+        # JSON and the compressed bodies are all keyed on it and would keep the old position
+        return located
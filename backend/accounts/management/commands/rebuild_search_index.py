@@ -0,0 +1,31 @@
+"""
+python manage.py rebuild_search_index
+
+Rebuilds the room full-text index from scratch. Run it after bulk imports or raw SQL
+edits that bypass Room.save() (and therefore the signals that normally keep it in sync).
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for rooms'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='rooms inserted per batch (SQLite only)')
+
+    def handle(self, *args, **options):
+        backend = search.search_backend()
+        if backend is None:
+            self.stdout.write(self.style.WARNING('This database has no full-text index — nothing to do.'))
+            return
+
+        with transaction.atomic():
+            # one transaction, so searches never see a half-empty index
+            total = search.rebuild_index(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {backend} search index for {total} active rooms.'))
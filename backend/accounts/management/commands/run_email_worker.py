@@ -0,0 +1,46 @@
+"""
+python manage.py run_email_worker [--once] [--batch-size 20] [--interval 2]
+
+Sends the emails queued in the outbox (OutboundEmail, see accounts/outbox.py) through
+EMAIL_TRANSPORT, retrying failures with backoff. Runs until stopped, checking for new
+emails every --interval seconds when the outbox is empty; --once sends what is due now
+and exits, for running from cron (e.g. a PythonAnywhere scheduled task). Several
+workers can run at once — each claims its own rows.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts import outbox
+
+
+class Command(BaseCommand):
+    help = 'Send queued outbound emails'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='send what is due now, then exit')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--interval', type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        totals = {}
+        try:
+            while True:
+                counts = outbox.process_batch(options['batch_size'])
+                for outcome, count in counts.items():
+                    totals[outcome] = totals.get(outcome, 0) + count
+                if counts:
+                    self.stdout.write(f'Batch: {counts}')
+                    continue
+                    # there may be more waiting — go again straight away
+                if options['once']:
+                    break
+                close_old_connections()
+                # don't hold a database connection that may go stale while idle
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'Email worker done: {totals or "nothing to send"}.'))
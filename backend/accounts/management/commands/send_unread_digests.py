@@ -0,0 +1,84 @@
+"""
+python manage.py send_unread_digests [--since-hours 24] [--dry-run]
+
+Emails every student who has unread messages a short summary — how many, and from whom —
+with a link to the portal. Sent through Gmail's batch endpoint (gmail_api.send_bulk), up
+to GMAIL_BATCH_SIZE emails per request, slowing down by itself when Gmail starts
+throttling. Meant for a daily scheduled task: with --since-hours only students who
+received a new unread message in that window get one, so nobody is reminded twice
+about the same messages.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from accounts.gmail_api import send_bulk
+from accounts.models import Message, Student
+
+
+class Command(BaseCommand):
+    help = 'Email each student a summary of their unread messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since-hours', type=float, default=24,
+                            help='only students with an unread message this recent (0 = everyone with unread messages)')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='students summarised and sent per round')
+        parser.add_argument('--dry-run', action='store_true', help='count the digests without sending them')
+
+    def handle(self, *args, **options):
+        unread = Message.objects.filter(is_read=False)
+        recipients = unread
+        if options['since_hours']:
+            recipients = unread.filter(created_at__gte=timezone.now() - timedelta(hours=options['since_hours']))
+        recipient_ids = sorted(recipients.order_by().values_list('recipient_id', flat=True).distinct())
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(recipient_ids)} students would get a digest.')
+            return
+
+        sent = failed = 0
+        for start in range(0, len(recipient_ids), options['chunk_size']):
+            ids = recipient_ids[start:start + options['chunk_size']]
+            digests = self.build_digests(unread, ids)
+            for result in send_bulk(digests):
+                if result['status'] < 300:
+                    sent += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f"Digest to {result['to']} failed ({result['status']}): {result['error']}")
+
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} digests ({failed} failed).'))
+
+    def build_digests(self, unread, student_ids):
+        """(to, subject, body) for each of these students — two queries for the whole chunk."""
+        counts = {}
+        for row in (
+            unread.filter(recipient_id__in=student_ids)
+            .values('recipient_id', 'sender__name')
+            .annotate(count=Count('id'))
+            .order_by('recipient_id', '-count', 'sender__name')
+        ):
+            counts.setdefault(row['recipient_id'], []).append((row['sender__name'], row['count']))
+            # unread messages per (recipient, sender), busiest sender first
+
+        portal_url = f'https://{settings.SITE_DOMAIN}/portal'
+        digests = []
+        for student in Student.objects.filter(id__in=counts).only('id', 'name', 'email'):
+            senders = counts[student.id]
+            total = sum(count for _, count in senders)
+            lines = '\n'.join(f'  • {count} from {name}' for name, count in senders)
+            digests.append((
+                student.email,
+                f'StudentNest — You have {total} unread message{"s" if total != 1 else ""}',
+                f"Hi {student.name},\n\n"
+                f"You have {total} unread message{'s' if total != 1 else ''} on StudentNest:\n\n"
+                f"{lines}\n\n"
+                f"Read and reply here:\n{portal_url}\n\n"
+                f"— The StudentNest Team",
+            ))
+        return digests
@@ -0,0 +1,134 @@
+"""
+Content-addressed storage for room photos.
+Landlords upload the same photos to several listings (and again whenever they edit one),
+and every upload used to become another file in room_images/. Now a photo is stored
+under the SHA-256 of its contents:
+
+    room_images/<first 2 hex digits>/<sha256>.<ext>
+
+so an identical upload finds its file already there and nothing new is written. Each
+stored file has a MediaBlob row counting the RoomImage rows that use it — retain() when
+a photo row is created, release() when it is deleted or given another file (signals.py).
+A file whose count has been zero for MEDIA_GC_GRACE_HOURS is an orphan, and
+`python manage.py collect_media` deletes it along with its resized variants.
+
+Because a name can only ever hold one content, the URLs never go stale: serve() answers
+them (and the content-hashed variant names from images.py) with a year-long
+`Cache-Control: immutable`, so browsers and CDNs stop asking whether they changed.
+"""
+
+import hashlib
+import posixpath
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.views import static
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# a year — the longest browsers honour — and no revalidation, since the bytes can't change
+
+IMMUTABLE_PATHS = re.compile(
+    r'^room_images/(?:[0-9a-f]{2}/[0-9a-f]{64}|variants/[^/]+/\d+-[0-9a-f]{16})\.[a-z0-9]+$'
+)
+# originals named by content_path() and variants named by images.variant_name()
+
+
+def file_sha256(f):
+    """Hex SHA-256 of a file's contents, read in chunks — the file is left at the start."""
+    digest = hashlib.sha256()
+    f.seek(0)
+    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+        digest.update(chunk)
+    f.seek(0)
+    return digest.hexdigest()
+
+
+def content_path(directory, content_hash, extension):
+    return f'{directory}/{content_hash[:2]}/{content_hash}{extension}'
+    # e.g. "room_images/3f/3f9c...e1.jpg" — 256 subfolders, so no folder grows huge
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage (MEDIA_ROOT, MEDIA_URL) that ignores the uploaded file's name and
+    stores it under the hash of its contents — writing nothing when that file exists."""
+
+    def _save(self, name, content):
+        content_hash = file_sha256(content)
+        extension = posixpath.splitext(name)[1].lower()
+        hashed = content_path(posixpath.dirname(name), content_hash, extension)
+        touch(hashed, content_hash, content.size)
+        # recorded before the file is written, so collect_media never sees a new file as unindexed
+        if self.exists(hashed):
+            return hashed
+            # the same photo was uploaded before — share its file
+
+        saved = super()._save(hashed, content)
+        if saved != hashed:
+            self.delete(saved)
+            # a simultaneous upload of the same photo wrote `hashed` first and we were given
+            # "<hash>_abc123.jpg" — identical bytes, so keep theirs
+        return hashed
+
+
+@lru_cache(maxsize=None)
+def _get_storage():
+    return import_string(settings.ROOM_IMAGE_STORAGE)()
+
+
+def room_image_storage():
+    """The storage for RoomImage.file, named in settings.ROOM_IMAGE_STORAGE. A function
+    (not an instance) on the field, so migrations don't freeze in which storage is used."""
+    return _get_storage()
+
+
+def touch(name, content_hash='', size=None):
+    """Make sure `name` is in the index and mark it as just used, so collect_media leaves it
+    alone for the grace period even while nothing references it yet."""
+    from .models import MediaBlob
+    # imported here — models.py imports this module for the storage
+    now = timezone.now()
+    if not MediaBlob.objects.filter(name=name).update(touched_at=now):
+        MediaBlob.objects.get_or_create(
+            name=name, defaults={'content_hash': content_hash, 'size': size, 'touched_at': now}
+        )
+
+
+def retain(name, content_hash='', count=1):
+    """`count` more photos use the file `name`."""
+    from .models import MediaBlob
+    now = timezone.now()
+    if MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') + count, touched_at=now):
+        return
+    blob, created = MediaBlob.objects.get_or_create(
+        name=name, defaults={'content_hash': content_hash, 'ref_count': count, 'touched_at': now}
+    )
+    if not created:
+        MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + count, touched_at=now)
+        # another request indexed it between our UPDATE and INSERT
+
+
+def release(name, count=1):
+    """`count` fewer photos use the file `name` — at zero it becomes collectable."""
+    from .models import MediaBlob
+    MediaBlob.objects.filter(name=name, ref_count__gt=0).update(
+        ref_count=Greatest(F('ref_count') - count, 0), touched_at=timezone.now()
+    )
+    # a single UPDATE, so two photos released at once both count; touched_at starts the grace period
+
+
+def is_immutable(path):
+    return bool(IMMUTABLE_PATHS.match(path))
+
+
+def serve(request, path):
+    """Serve a file from MEDIA_ROOT (when SERVE_MEDIA is on) with caching headers —
+    immutable for content-addressed names, MEDIA_CACHE_SECONDS for anything else."""
+    response = static.serve(request, path, document_root=settings.MEDIA_ROOT)
+    response['Cache-Control'] = IMMUTABLE if is_immutable(path) else f'public, max-age={settings.MEDIA_CACHE_SECONDS}'
+    return response
@@ -0,0 +1,172 @@
+"""
+Custom middleware for the accounts app.
+Listed in settings.MIDDLEWARE — see the comments there for where each one sits.
+"""
+
+import gzip
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject
+
+from .identity import student_for_request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional, gzip is always available
+    brotli = None
+
+
+ACCEPT_ENCODING_ITEM = re.compile(r'\s*([a-z0-9*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?', re.IGNORECASE)
+# one entry of "Accept-Encoding: br;q=1.0, gzip;q=0.8, *;q=0.1"
+
+
+def _accepted_encodings(header):
+    """Parse Accept-Encoding into {encoding: q-value}."""
+    accepted = {}
+    for item in header.split(','):
+        match = ACCEPT_ENCODING_ITEM.match(item)
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+        accepted[match.group(1).lower()] = quality
+    return accepted
+
+
+def choose_encoding(header):
+    """Pick the best encoding we can produce — 'br', 'gzip' or None for uncompressed."""
+    accepted = _accepted_encodings(header or '')
+    available = (['br'] if brotli else []) + ['gzip']
+    # preference order when the browser rates them equally — brotli is ~15-20% smaller on JSON
+    best, best_quality = None, 0
+    for encoding in available:
+        quality = accepted.get(encoding, accepted.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=settings.API_COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.API_COMPRESSION_GZIP_LEVEL, mtime=0)
+    # mtime=0 keeps the output identical for identical input, so cached copies stay valid
+
+
+class CompressionMiddleware:
+    """Compress JSON API responses with brotli or gzip, whichever the browser prefers.
+
+    Only JSON bodies of at least API_COMPRESSION_MIN_BYTES are compressed — below that the
+    saving is smaller than the CPU cost. Responses that carry an ETag (the room endpoints)
+    have their compressed body cached under that ETag, so a list that many visitors load
+    is compressed once instead of on every request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if (
+            response.streaming
+            or response.status_code != 200
+            or response.has_header('Content-Encoding')
+            or not response.get('Content-Type', '').startswith('application/json')
+        ):
+            return response
+            # static files (WhiteNoise) stream and are pre-compressed; errors and 304s are tiny
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        # caches must keep compressed and uncompressed copies apart
+
+        if len(response.content) < settings.API_COMPRESSION_MIN_BYTES:
+            return response
+
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
+            return response
+
+        etag = response.get('ETag')
+        cache_key = None
+        if etag:
+            identity = f'{request.get_host()}|{request.get_full_path()}|{etag}'
+            cache_key = f'compressed:{encoding}:{hashlib.md5(identity.encode()).hexdigest()}'
+            # the ETag says "same content" only for one URL — the host is included because
+            # the room JSON contains absolute image URLs
+            compressed = caches['rooms'].get(cache_key)
+            # ETags are only sent by the room endpoints, so the bodies live in the 'rooms' cache
+        else:
+            compressed = None
+
+        if compressed is None:
+            compressed = compress(response.content, encoding)
+            if cache_key:
+                caches['rooms'].set(cache_key, compressed, settings.API_COMPRESSION_CACHE_TIMEOUT)
+
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        if etag and not etag.startswith('W/'):
+            response['ETag'] = f'W/{etag}'
+            # the bytes changed, so a strong ETag must become weak (same rule as Django's GZipMiddleware)
+        return response
+
+
+class SlidingSessionMiddleware:
+    """Keep active students logged in without saving the session on every request.
+
+    The session remembers when it was last saved. A request that used the session within
+    SESSION_REFRESH_WINDOW of its expiry marks it modified, so SessionMiddleware saves it
+    and sends a fresh cookie — another SESSION_COOKIE_AGE from now. Every other request
+    leaves it alone, which means no write at all. Must come after SessionMiddleware.
+    """
+
+    SAVED_AT_KEY = '_saved_at'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        session = getattr(request, 'session', None)
+        if session is None or not (session.accessed or session.modified) or session.is_empty():
+            return response
+            # untouched sessions (static files, anonymous visitors) are never loaded here;
+            # is_empty() is True after logout's flush(), which must not be saved again
+
+        now = int(time.time())
+        saved_at = session.get(self.SAVED_AT_KEY)
+        renew_after = settings.SESSION_COOKIE_AGE - settings.SESSION_REFRESH_WINDOW
+        if session.modified or saved_at is None or now - saved_at >= renew_after:
+            session[self.SAVED_AT_KEY] = now
+            # setting a key marks the session modified, so SessionMiddleware saves it and
+            # re-sends the cookie with a new expiry
+        return response
+
+
+class StudentMiddleware:
+    """Attach the logged-in student to every request as request.student (None when logged out).
+
+    Lazy, like Django's request.user: the session and the student are only looked up if a
+    view actually uses request.student, and then only once. Must come after SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.student = SimpleLazyObject(lambda: student_for_request(request))
+        return self.get_response(request)
+
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_passwordresettoken'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['is_active', '-created_at'], name='rooms_is_acti_e28c77_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['is_active', 'price'], name='rooms_is_acti_9efc63_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['is_active', 'room_type', 'price'], name='rooms_is_acti_7a7fbd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['is_active', 'available_from'], name='rooms_is_acti_0ec233_idx'),
+        ),
+    ]
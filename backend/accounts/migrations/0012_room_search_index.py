@@ -0,0 +1,51 @@
+# Full-text search index for rooms — see accounts/search.py
+
+from django.db import migrations
+
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS rooms_fts USING fts5("
+    "title, location, postcode, description, tokenize='porter unicode61')"
+)
+SQLITE_FILL = (
+    "INSERT INTO rooms_fts (rowid, title, location, postcode, description) "
+    "SELECT id, title, location, coalesce(postcode, ''), description FROM rooms WHERE is_active"
+)
+SQLITE_DROP = "DROP TABLE IF EXISTS rooms_fts"
+
+PG_CREATE = (
+    "CREATE INDEX IF NOT EXISTS rooms_search_idx ON rooms USING GIN (("
+    "setweight(to_tsvector('english', coalesce(\"rooms\".\"title\", '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(\"rooms\".\"location\", '') || ' ' || coalesce(\"rooms\".\"postcode\", '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(\"rooms\".\"description\", '')), 'C')"
+    "))"
+)
+PG_DROP = "DROP INDEX IF EXISTS rooms_search_idx"
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CREATE)
+        schema_editor.execute(SQLITE_FILL)
+    elif vendor == 'postgresql':
+        schema_editor.execute(PG_CREATE)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_DROP)
+    elif vendor == 'postgresql':
+        schema_editor.execute(PG_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-17 15:41
+
+from django.db import migrations, models
+from django.db.models import Case, IntegerField, Value, When
+
+
+AMENITY_FIELDS = [
+    'wifi', 'washing_machine', 'dishwasher', 'parking', 'garden',
+    'gym', 'central_heating', 'double_glazing', 'security_system', 'bike_storage',
+]
+# copied from Room.AMENITY_FIELDS at the time of this migration — bit i = field i
+
+
+def backfill_amenities(apps, schema_editor):
+    """Pack the existing amenity booleans into the new column with one UPDATE statement."""
+    Room = apps.get_model('accounts', 'Room')
+    mask = Value(0)
+    for i, field in enumerate(AMENITY_FIELDS):
+        mask = mask + Case(When(**{field: True}, then=Value(1 << i)), default=Value(0), output_field=IntegerField())
+    Room.objects.update(amenities=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_room_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='amenities',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_amenities, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['is_active', 'amenities'], name='rooms_is_acti_a2de5d_idx'),
+        ),
+    ]
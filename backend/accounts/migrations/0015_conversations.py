@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-17 15:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from accounts.conversations import rebuild_conversations
+
+
+def backfill_conversations(apps, schema_editor):
+    """Build a Conversation row for every existing thread from the messages table."""
+    rebuild_conversations(apps.get_model('accounts', 'Message'), apps.get_model('accounts', 'Conversation'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_room_geocoding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('unread_a', models.PositiveIntegerField(default=0)),
+                ('unread_b', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.message')),
+                ('room', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='conversations', to='accounts.room')),
+                ('student_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.student')),
+                ('student_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.student')),
+            ],
+            options={
+                'db_table': 'conversations',
+                'ordering': ['-last_message_at'],
+                'indexes': [models.Index(fields=['student_a', '-last_message_at'], name='conversatio_student_85ca99_idx'), models.Index(fields=['student_b', '-last_message_at'], name='conversatio_student_2e8cf8_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(condition=models.Q(('room__isnull', False)), fields=('student_a', 'student_b', 'room'), name='conversation_unique_room_thread'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(condition=models.Q(('room__isnull', True)), fields=('student_a', 'student_b'), name='conversation_unique_general_thread'),
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+    ]
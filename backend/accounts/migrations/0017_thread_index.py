@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_message_changes_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', 'recipient', 'room', '-created_at'], name='messages_sender__6fe485_idx'),
+        ),
+    ]
@@ -0,0 +1,120 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:50
+
+import hashlib
+
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+import django.db.models.deletion
+
+IMAGE_FIELDS = ['image_1', 'image_2', 'image_3', 'image_4', 'image_5']
+BATCH_SIZE = 500
+
+
+def _sha256(name):
+    """The hash RoomImage.save() would have stored — '' when the file is missing."""
+    digest = hashlib.sha256()
+    try:
+        with default_storage.open(name, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    except OSError:
+        return ''
+    return digest.hexdigest()
+    # written out here rather than imported, so the migration keeps working whatever
+    # happens to the app's own hashing helper later
+
+
+def copy_images_to_table(apps, schema_editor):
+    """One RoomImage row per filled image_N column, rooms taken BATCH_SIZE at a time so
+    neither the rooms nor the new rows are ever all in memory at once."""
+    Room = apps.get_model('accounts', 'Room')
+    RoomImage = apps.get_model('accounts', 'RoomImage')
+
+    last_id = 0
+    while True:
+        rooms = list(
+            Room.objects.filter(id__gt=last_id).order_by('id')
+            .values('id', 'image_variants', *IMAGE_FIELDS)[:BATCH_SIZE]
+        )
+        if not rooms:
+            break
+        last_id = rooms[-1]['id']
+
+        rows = []
+        for room in rooms:
+            names = [room[field] for field in IMAGE_FIELDS if room[field]]
+            for position, name in enumerate(names):
+                entry = (room['image_variants'] or {}).get(name) or {}
+                rows.append(RoomImage(
+                    room_id=room['id'], position=position, file=name,
+                    width=entry.get('width'), height=entry.get('height'),
+                    variants=entry.get('variants'),
+                    # variants already made for the old columns carry over
+                    content_hash=_sha256(name),
+                ))
+        RoomImage.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+        # bulk_create skips RoomImage.save(), so the hashes are worked out above
+
+
+def copy_images_to_columns(apps, schema_editor):
+    """Reverse: the first five photos of each room go back into image_1..image_5."""
+    Room = apps.get_model('accounts', 'Room')
+    RoomImage = apps.get_model('accounts', 'RoomImage')
+
+    last_id = 0
+    while True:
+        room_ids = list(Room.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:BATCH_SIZE])
+        if not room_ids:
+            break
+        last_id = room_ids[-1]
+
+        photos = {}
+        for image in RoomImage.objects.filter(room_id__in=room_ids).order_by('room_id', 'position', 'id'):
+            photos.setdefault(image.room_id, []).append(image)
+        rooms = []
+        for room_id, images in photos.items():
+            room = Room(id=room_id)
+            for field, image in zip(IMAGE_FIELDS, images):
+                setattr(room, field, image.file.name)
+            room.image_variants = {
+                image.file.name: {'width': image.width, 'height': image.height, 'variants': image.variants}
+                for image in images[:len(IMAGE_FIELDS)] if image.variants
+            }
+            rooms.append(room)
+        Room.objects.bulk_update(rooms, IMAGE_FIELDS + ['image_variants'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_room_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='room',
+            name='image_1',
+            field=models.ImageField(blank=True, max_length=500, null=True, upload_to='room_images/'),
+        ),
+        # nullable first, so this migration can be reversed for rooms without photos
+        migrations.CreateModel(
+            name='RoomImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('file', models.ImageField(max_length=500, upload_to='room_images/')),
+                ('width', models.PositiveIntegerField(blank=True, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, null=True)),
+                ('content_hash', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('variants', models.JSONField(blank=True, editable=False, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='accounts.room')),
+            ],
+            options={
+                'db_table': 'room_images',
+                'ordering': ['position', 'id'],
+                'indexes': [models.Index(fields=['room', 'position'], name='room_images_room_id_be8124_idx')],
+            },
+        ),
+        migrations.RunPython(copy_images_to_table, copy_images_to_columns),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-17 16:50
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_roomimage'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='room',
+            name='image_1',
+        ),
+        migrations.RemoveField(
+            model_name='room',
+            name='image_2',
+        ),
+        migrations.RemoveField(
+            model_name='room',
+            name='image_3',
+        ),
+        migrations.RemoveField(
+            model_name='room',
+            name='image_4',
+        ),
+        migrations.RemoveField(
+            model_name='room',
+            name='image_5',
+        ),
+        migrations.RemoveField(
+            model_name='room',
+            name='image_variants',
+        ),
+    ]
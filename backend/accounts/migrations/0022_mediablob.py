@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:30
+
+import accounts.media_store
+from django.db import migrations, models
+from django.db.models import Count, Max
+import django.utils.timezone
+
+BATCH_SIZE = 500
+
+
+def index_existing_files(apps, schema_editor):
+    """A MediaBlob for every file the photos use now, counted — they keep their old names;
+    only new uploads are stored by content hash (collect_media --dedupe moves the rest)."""
+    MediaBlob = apps.get_model('accounts', 'MediaBlob')
+    RoomImage = apps.get_model('accounts', 'RoomImage')
+    files = (
+        RoomImage.objects.exclude(file='').order_by('file').values('file')
+        .annotate(ref_count=Count('id'), content_hash=Max('content_hash'))
+    )
+    MediaBlob.objects.bulk_create(
+        (
+            MediaBlob(name=row['file'], content_hash=row['content_hash'], ref_count=row['ref_count'])
+            for row in files.iterator(chunk_size=BATCH_SIZE)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0021_remove_room_image_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=500, unique=True)),
+                ('content_hash', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('touched_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'media_blobs',
+                'indexes': [models.Index(fields=['ref_count', 'touched_at'], name='media_blobs_ref_cou_5d661b_idx')],
+            },
+        ),
+        migrations.AlterField(
+            model_name='roomimage',
+            name='file',
+            field=models.ImageField(max_length=500, storage=accounts.media_store.room_image_storage, upload_to='room_images/'),
+        ),
+        migrations.RunPython(index_existing_files, migrations.RunPython.noop),
+    ]
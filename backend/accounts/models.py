@@ -1,5 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 # models is Django's ORM — lets us define database tables as Python classes
+# transaction.atomic() groups several writes so they succeed or fail together
+
+from django.db.models.functions import Greatest
+# Greatest(a, b) — the larger of two values, computed in SQL
 
 from django.contrib.auth.hashers import make_password, check_password
 # make_password hashes a raw password string using PBKDF2 + SHA256
@@ -11,6 +15,18 @@ from django.utils import timezone
 import uuid
 # uuid generates unique random identifiers — used for password reset tokens
 
+from collections import Counter
+# counts how many messages were read in each conversation
+
+from . import geo
+# offline postcode -> latitude/longitude lookups for rooms
+
+from . import hashing
+# runs PBKDF2 in a bounded thread pool, off the request threads
+
+from .media_store import file_sha256, room_image_storage
+# room photos are stored under the SHA-256 of their contents, so identical uploads share a file
+
 
 class Student(models.Model):
     """Student user model for StudentNest — this is our custom user table,
@@ -74,22 +90,35 @@ class Student(models.Model):
         return check_password(raw_password, self.password_hash)
         # hashes the input and compares it to the stored hash — returns True or False
 
+    async def aset_password(self, raw_password):
+        """set_password for async views — the hash is computed in the password-hashing pool"""
+        self.password_hash = await hashing.amake_password(raw_password)
+        # raises hashing.PasswordHashingBusy when the pool is full
+
+    async def acheck_password(self, raw_password):
+        """check_password for async views — the hash is computed in the password-hashing pool"""
+        return await hashing.acheck_password(raw_password, self.password_hash)
+
     def is_active_now(self):
         """Check if user was active in the last 5 minutes"""
-        if not self.last_activity:
+        from . import presence
+        last_seen = presence.last_seen(self.id) or self.last_activity
+        # the cache has the live value — last_activity can be up to a flush interval behind
+        if not last_seen:
             return False
-        return (timezone.now() - self.last_activity).seconds < 300
+        return (timezone.now() - last_seen).total_seconds() < 300
         # 300 seconds = 5 minutes
 
     def mark_online(self):
-        """Mark student as online and update activity timestamp"""
-        self.is_online = True
-        self.last_activity = timezone.now()
-        self.save(update_fields=['is_online', 'last_activity'])
-        # update_fields tells Django to only update these two columns, not the whole row
+        """Record a heartbeat — written to is_online/last_activity by the next presence flush"""
+        from . import presence
+        # imported here because presence.py imports this module
+        presence.heartbeat(self.id)
 
     def mark_offline(self):
         """Mark student as offline"""
+        from . import presence
+        presence.forget(self.id)
         self.is_online = False
         self.save(update_fields=['is_online'])
 
@@ -118,6 +147,13 @@ class Room(models.Model):
         ('partial', 'Partially Included'),
     ]
 
+    AMENITY_FIELDS = [
+        'wifi', 'washing_machine', 'dishwasher', 'parking', 'garden',
+        'gym', 'central_heating', 'double_glazing', 'security_system', 'bike_storage',
+    ]
+    # the ten amenity checkboxes below — a field's position in this list is its bit in `amenities`
+    # (wifi = 1, washing_machine = 2, dishwasher = 4, ...) so only ever append to the end
+
     # --- Owner ---
     owner = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='rooms')
     # ForeignKey links this room to a Student — CASCADE means if the student is deleted, their rooms go too
@@ -136,6 +172,13 @@ class Room(models.Model):
     postcode = models.CharField(max_length=20, blank=True)
     # UK postcode — optional (blank=True means the form can leave it empty)
 
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
+    # filled in by save() from the postcode using the PostcodeCentroid table — null if unknown
+
+    geo_cell = models.IntegerField(null=True, blank=True, editable=False)
+    # which 0.1° grid square the room is in — lets "near a postcode" searches use an index
+
     distance_to_transport = models.CharField(max_length=100)
     # e.g. "5 min walk to Mile End station"
 
@@ -166,15 +209,7 @@ class Room(models.Model):
     # maximum contract length in months
 
     # --- Images ---
-    image_1 = models.ImageField(upload_to='room_images/', max_length=500)
-    # the main image — required — uploaded files go to MEDIA_ROOT/room_images/
-
-    image_2 = models.ImageField(upload_to='room_images/', max_length=500, blank=True, null=True)
-    # additional images 2-5 are all optional
-
-    image_3 = models.ImageField(upload_to='room_images/', max_length=500, blank=True, null=True)
-    image_4 = models.ImageField(upload_to='room_images/', max_length=500, blank=True, null=True)
-    image_5 = models.ImageField(upload_to='room_images/', max_length=500, blank=True, null=True)
+    # photos live in the room_images table (RoomImage below) — as many as the landlord uploads
 
     # --- Features (amenity checkboxes) ---
     wifi = models.BooleanField(default=False)
@@ -189,6 +224,10 @@ class Room(models.Model):
     bike_storage = models.BooleanField(default=False)
     # all default to False — the frontend sends True for each ticked checkbox
 
+    amenities = models.PositiveIntegerField(default=0, editable=False)
+    # the ten booleans above packed into one integer — recomputed by save() so it never drifts
+    # "wifi AND parking AND bike_storage" becomes one check: amenities & mask == mask
+
     # --- Status flags ---
     is_active = models.BooleanField(default=True)
     # False means the listing has been deactivated (hidden from search)
@@ -207,17 +246,42 @@ class Room(models.Model):
         return f"{self.title} - £{self.price}/month"
         # displayed in the admin panel, e.g. "Spacious Double Room - £650.00/month"
 
+    @classmethod
+    def amenity_mask(cls, fields):
+        """Turn a list of amenity field names into their combined bitmask"""
+        mask = 0
+        for field in fields:
+            mask |= 1 << cls.AMENITY_FIELDS.index(field)
+            # << shifts 1 left by the field's position, | switches that bit on
+        return mask
+
+    def compute_amenities(self):
+        """Build the bitmask from this room's amenity booleans"""
+        return self.amenity_mask([field for field in self.AMENITY_FIELDS if getattr(self, field)])
+
+    def save(self, *args, **kwargs):
+        self.amenities = self.compute_amenities()
+        # keep the packed column in step with the checkboxes on every save
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'updated_at'}
+            # always write updated_at — room_cache.py keys each room's cached JSON on it
+        if update_fields is not None and set(update_fields) & set(self.AMENITY_FIELDS):
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'amenities'}
+            # save(update_fields=['wifi']) must also write the recomputed mask
+
+        if update_fields is None or 'postcode' in update_fields:
+            geo.locate_room(self)
+            # look the postcode up again whenever it might have changed
+            if update_fields is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'latitude', 'longitude', 'geo_cell'}
+        super().save(*args, **kwargs)
+
     def get_images(self):
-        """Return a list of image URLs for all non-empty image fields"""
-        images = []
-        for i in range(1, 6):
-            # loop through image_1 to image_5
-            img = getattr(self, f'image_{i}')
-            # getattr dynamically gets self.image_1, self.image_2, etc.
-            if img:
-                images.append(img.url if hasattr(img, 'url') else str(img))
-                # .url gives the web-accessible path like /media/room_images/photo.jpg
-        return images
+        """Return a list of image URLs, in gallery order"""
+        return [image.file.url for image in self.images.all()]
+        # .url gives the web-accessible path like /media/room_images/photo.jpg
 
     class Meta:
         db_table = 'rooms'
@@ -226,6 +290,130 @@ class Room(models.Model):
         ordering = ['-created_at']
         # newest rooms first by default
 
+        indexes = [
+            models.Index(fields=['is_active', '-created_at']),
+            # speeds up the default listing — active rooms, newest first
+
+            models.Index(fields=['is_active', 'price']),
+            # speeds up min_price/max_price filters and the price sorts
+
+            models.Index(fields=['is_active', 'room_type', 'price']),
+            # speeds up "single or double rooms under £700"
+
+            models.Index(fields=['is_active', 'available_from']),
+            # speeds up move-in date windows and the "available soonest" sort
+
+            models.Index(fields=['owner', 'is_active', '-created_at']),
+            # speeds up paging through "my rooms"
+
+            models.Index(fields=['is_active', 'amenities']),
+            # the amenity filter reads only this index instead of ten columns per row
+
+            models.Index(fields=['is_active', 'geo_cell']),
+            # speeds up ?near=<postcode> — only the grid squares around the point are read
+        ]
+
+
+class PostcodeCentroid(models.Model):
+    """Latitude/longitude of a UK postcode — imported from a local CSV with
+    `python manage.py import_postcodes`, so geocoding never needs the network.
+    Rows are full postcodes ("E1 4NS") plus one averaged row per outward code ("E1")
+    that is used when the exact postcode is missing."""
+
+    postcode = models.CharField(max_length=8, unique=True)
+    # normalised with geo.normalize_postcode() — upper case, single space before the last 3 characters
+
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+
+    class Meta:
+        db_table = 'postcode_centroids'
+
+    def __str__(self):
+        return f"{self.postcode} ({self.latitude:.5f}, {self.longitude:.5f})"
+
+
+class RoomImage(models.Model):
+    """One photo of a room. position orders the gallery — 0 is the cover photo that
+    listing cards show, and the views keep positions numbered 0, 1, 2... with no gaps."""
+
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='images')
+    position = models.PositiveSmallIntegerField(default=0)
+
+    file = models.ImageField(upload_to='room_images/', storage=room_image_storage, max_length=500)
+    # uploaded files go to MEDIA_ROOT/room_images/<ab>/<sha256>.<ext> — see media_store.py
+
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    # the photo's size once upright — filled in by images.py along with the variants
+
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # SHA-256 of the file — the same photo uploaded twice has the same hash
+
+    variants = models.JSONField(null=True, blank=True, editable=False)
+    # resized WebP/AVIF/JPEG copies, {format: [[width, file name], ...]} — null until images.py has made them
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'room_images'
+        ordering = ['position', 'id']
+        indexes = [
+            models.Index(fields=['room', 'position']),
+            # "this room's photos in order" and "the cover photo of each room on this page"
+        ]
+
+    def __str__(self):
+        return f"Photo {self.position + 1} of room {self.room_id}"
+
+    def save(self, *args, **kwargs):
+        self._replaced_file = None
+        if self.file and (not self.content_hash or not self.file._committed):
+            # _committed is False while a new upload is waiting to be stored
+            if self.pk and not self.file._committed:
+                self._replaced_file = RoomImage.objects.filter(pk=self.pk).values_list('file', flat=True).first()
+                self.width = self.height = self.variants = None
+                # a different file picked for an existing photo (the admin does this) — the
+                # signals move its reference count over, and the variants are made afresh
+            self.content_hash = file_sha256(self.file)
+        super().save(*args, **kwargs)
+
+
+class MessageQuerySet(models.QuerySet):
+    def mark_read(self, reader_id):
+        """Mark every unread message in this queryset that was sent to `reader_id` as read,
+        and take them off the reader's conversation counters — all in one transaction.
+
+        Returns the messages that actually changed as a list of (id, sender_id, room_id);
+        messages that were already read (or belong to someone else) are left alone.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            changed = list(
+                self.filter(recipient_id=reader_id, is_read=False)
+                .select_for_update()
+                .order_by()
+                .values_list('id', 'sender_id', 'room_id')
+            )
+            # FOR UPDATE locks the rows until we commit, so two tabs marking the same
+            # messages at once can't both count them — the second one finds them read
+            if not changed:
+                return []
+
+            Message.objects.filter(id__in=[message_id for message_id, _, _ in changed], is_read=False).update(
+                is_read=True, read_at=now, updated_at=now
+            )
+            # one UPDATE for the whole batch instead of loading and saving each message
+
+            per_conversation = Counter((sender_id, room_id) for _, sender_id, room_id in changed)
+            for (sender_id, room_id), count in per_conversation.items():
+                student_a, student_b = Conversation.pair(sender_id, reader_id)
+                Conversation.objects.filter(
+                    student_a_id=student_a, student_b_id=student_b, room_id=room_id
+                ).mark_read(reader_id, count)
+                # one UPDATE per conversation touched — just one when a whole thread is read
+        return changed
+
 
 class Message(models.Model):
     """Message model — lets students send messages to room owners and vice versa."""
@@ -261,22 +449,174 @@ class Message(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     # when the record was last modified
 
+    objects = MessageQuerySet.as_manager()
+
     class Meta:
         db_table = 'messages'
         ordering = ['-created_at']
         # newest messages first
 
+        indexes = [
+            models.Index(fields=['recipient', '-created_at']),
+            # speeds up paging through the inbox
+
+            models.Index(fields=['sender', '-created_at']),
+            # speeds up paging through sent messages
+
+            models.Index(fields=['recipient', 'updated_at']),
+            models.Index(fields=['sender', 'updated_at']),
+            # the /api/messages/changes/ feed — "my messages changed since <time>", one index per side
+
+            models.Index(fields=['sender', 'recipient', 'room', '-created_at']),
+            # one direction of a chat thread, newest first — get_conversation_messages reads
+            # the latest page of each direction straight off this index
+        ]
+
     def __str__(self):
         return f"From {self.sender.name} to {self.recipient.name}: {self.subject}"
 
     def mark_as_read(self):
-        """Mark this message as read and record the time"""
-        if not self.is_read:
+        """Mark this message as read and record the time — and take it off the
+        recipient's unread counter for the conversation. Returns True if it was unread."""
+        if self.is_read:
+            return False
             # only update if it hasn't been read yet
-            self.is_read = True
-            self.read_at = timezone.now()
-            self.save(update_fields=['is_read', 'read_at'])
-            # only update these two columns in the database, not the whole row
+
+        self.is_read = True
+        self.read_at = timezone.now()
+        with transaction.atomic():
+            changed = Message.objects.filter(pk=self.pk, is_read=False).update(
+                is_read=True, read_at=self.read_at, updated_at=self.read_at
+            )
+            # conditional UPDATE — if two tabs mark it read at once only one of them "wins",
+            # so the unread counter is decremented exactly once
+            if changed:
+                Conversation.objects.for_message(self).mark_read(self.recipient_id, 1)
+        return bool(changed)
+
+
+class ConversationQuerySet(models.QuerySet):
+    def for_message(self, message):
+        """The conversation a message belongs to (as a queryset, so it can be updated in SQL)."""
+        student_a, student_b = Conversation.pair(message.sender_id, message.recipient_id)
+        return self.filter(student_a_id=student_a, student_b_id=student_b, room_id=message.room_id)
+        # room_id=None becomes "room_id IS NULL"
+
+    def involving(self, student_id):
+        """Every conversation the student takes part in."""
+        return self.filter(models.Q(student_a_id=student_id) | models.Q(student_b_id=student_id))
+
+    def unread_total(self, student_id):
+        """Total unread messages for the student across all conversations — the inbox badge."""
+        total = self.involving(student_id).aggregate(total=models.Sum(models.Case(
+            models.When(student_a_id=student_id, then=models.F('unread_a')),
+            default=models.F('unread_b'),
+        )))['total']
+        return total or 0
+        # Sum() of no rows is None
+
+    def mark_read(self, reader_id, count=None):
+        """Take `count` messages off the reader's unread counter — or reset it to 0 when
+        count is None (the whole thread was just read)."""
+        changes = {}
+        for field, side in (('unread_a', 'student_a_id'), ('unread_b', 'student_b_id')):
+            new_value = 0 if count is None else Greatest(models.F(field) - count, 0)
+            # Greatest(..., 0) — never below zero, even if the counter had drifted
+            changes[field] = models.Case(
+                models.When(**{side: reader_id}, then=new_value),
+                default=models.F(field),
+                output_field=models.PositiveIntegerField(),
+            )
+            # only the reader's own counter changes — the other side keeps its value
+        return self.update(**changes)
+        # one UPDATE whichever side of the conversation the reader is on
+
+
+class Conversation(models.Model):
+    """One chat thread — two students talking about one room (or about no room).
+
+    Kept up to date as messages are sent and read, so the chat list is a single query on
+    this table instead of a scan over every message the student ever sent or received.
+    The two students are stored in id order (student_a has the lower id), which gives
+    each pair exactly one row per room whichever of them sent the first message.
+    """
+
+    student_a = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='+')
+    student_b = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='+')
+    # related_name='+' — no reverse accessor, use Conversation.objects.involving(student_id)
+
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='conversations', null=True, blank=True)
+    # null for messages that are not about a particular room, same as Message.room
+
+    last_message = models.ForeignKey(Message, on_delete=models.SET_NULL, related_name='+', null=True, blank=True)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    # the newest message in the thread — shown as the preview in the chat list
+
+    unread_a = models.PositiveIntegerField(default=0)
+    unread_b = models.PositiveIntegerField(default=0)
+    # how many messages student_a / student_b have not read yet
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ConversationQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'conversations'
+        ordering = ['-last_message_at']
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student_a', 'student_b', 'room'],
+                condition=models.Q(room__isnull=False),
+                name='conversation_unique_room_thread',
+            ),
+            models.UniqueConstraint(
+                fields=['student_a', 'student_b'],
+                condition=models.Q(room__isnull=True),
+                name='conversation_unique_general_thread',
+            ),
+            # two constraints because NULLs never count as equal in a UNIQUE index —
+            # a single one would allow duplicate "no room" threads
+        ]
+
+        indexes = [
+            models.Index(fields=['student_a', '-last_message_at']),
+            models.Index(fields=['student_b', '-last_message_at']),
+            # the chat list reads one of these per side, already in newest-first order
+        ]
+
+    def __str__(self):
+        return f"Conversation {self.student_a_id} <-> {self.student_b_id} (room {self.room_id})"
+
+    @staticmethod
+    def pair(first_id, second_id):
+        """Put two student ids in (student_a, student_b) order."""
+        return (first_id, second_id) if first_id < second_id else (second_id, first_id)
+
+    @classmethod
+    def record_message(cls, message):
+        """Make `message` the latest in its conversation and add it to the recipient's
+        unread counter. Call inside the same transaction that created the message."""
+        student_a, student_b = cls.pair(message.sender_id, message.recipient_id)
+        conversation, _ = cls.objects.get_or_create(
+            student_a_id=student_a, student_b_id=student_b, room_id=message.room_id,
+        )
+        unread_field = 'unread_a' if message.recipient_id == student_a else 'unread_b'
+        cls.objects.filter(pk=conversation.pk).update(**{
+            'last_message': message,
+            'last_message_at': message.created_at,
+            unread_field: models.F(unread_field) + 1,
+            # F() + 1 is done by the database, so two messages arriving at once both count
+            'updated_at': timezone.now(),
+        })
+        return conversation
+
+    def other_student(self, student_id):
+        return self.student_b if student_id == self.student_a_id else self.student_a
+
+    def unread_for(self, student_id):
+        return self.unread_a if student_id == self.student_a_id else self.unread_b
 
 
 class Favorite(models.Model):
@@ -299,6 +639,11 @@ class Favorite(models.Model):
         # this constraint means a student can only favorite a room once
         # trying to add the same room twice would raise an IntegrityError
 
+        indexes = [
+            models.Index(fields=['student', '-created_at']),
+            # speeds up paging through a student's saved rooms
+        ]
+
 
     def __str__(self):
         return f"{self.student.name} favorited {self.room.title}"
@@ -419,3 +764,88 @@ class PasswordResetToken(models.Model):
     def is_expired(self):
         """Token expires after 1 hour"""
         return (timezone.now() - self.created_at).total_seconds() > 3600
+
+
+class OutboundEmail(models.Model):
+    """An email waiting to be sent — the outbox.
+    Views only add a row here (in the same transaction as whatever the email is about);
+    the `run_email_worker` command sends them, retrying with backoff (see outbox.py)."""
+
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        # waiting for the worker — new, or failed and due for another try at next_attempt_at
+        (SENDING, 'Sending'),
+        # claimed by a worker — if it dies, the row is picked up again after claimed_until
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+        # gave up — rejected outright, or out of attempts
+    ]
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # how many times sending has been tried
+
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # a pending email is not sent before this — pushed back after each failure
+
+    claimed_by = models.CharField(max_length=32, blank=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    # which worker batch is sending it, and until when that claim holds
+
+    last_error = models.TextField(blank=True)
+    provider_message_id = models.CharField(max_length=255, blank=True)
+    # e.g. the Gmail message id, once sent
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'outbound_emails'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            # the worker's "what is due?" query
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.status})"
+
+
+class MediaBlob(models.Model):
+    """One stored media file and how many RoomImage rows use it — the index behind the
+    content-addressed storage (media_store.py). A file nothing has used for the grace
+    period is deleted by `python manage.py collect_media`."""
+
+    name = models.CharField(max_length=500, unique=True)
+    # the storage name, e.g. room_images/3f/3f9c...e1.jpg (older uploads keep their own names)
+
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    size = models.PositiveBigIntegerField(null=True, blank=True)
+    # bytes — null for files indexed from before this table existed
+
+    ref_count = models.PositiveIntegerField(default=0)
+    # RoomImage rows whose file this is — kept by signals.py with single UPDATEs
+
+    touched_at = models.DateTimeField(default=timezone.now)
+    # last upload of this content or change of ref_count — orphans are only collected
+    # after MEDIA_GC_GRACE_HOURS, so an upload whose row isn't committed yet is safe
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'media_blobs'
+        indexes = [
+            models.Index(fields=['ref_count', 'touched_at']),
+            # collect_media's "unused since before the grace period" query
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
@@ -0,0 +1,173 @@
+"""
+The outbound email outbox.
+Views used to call the Gmail API inline, so a password-reset request waited on two
+Google round-trips (with 15-second timeouts) and answered 500 whenever Gmail was slow.
+Now a view only calls enqueue(), which adds an OutboundEmail row in the view's own
+transaction — the email exists exactly when the thing it is about (e.g. the reset
+token) does. `python manage.py run_email_worker` sends them:
+
+    claim_batch()   marks up to N due rows as ours (claimed_by/claimed_until)
+    deliver()       sends one through EMAIL_TRANSPORT and records the outcome
+
+A failed send is retried after EMAIL_RETRY_BACKOFF * 2^(attempts-1) seconds (capped at
+EMAIL_RETRY_MAX_BACKOFF) until EMAIL_MAX_ATTEMPTS; a rejection that retrying cannot fix
+(PermanentEmailError) fails straight away. A worker that dies mid-batch loses its claim
+after EMAIL_CLAIM_SECONDS and the rows are picked up again.
+
+EMAIL_TRANSPORT is a dotted path to a class with send(email) -> provider message id:
+GmailTransport in production, ConsoleTransport or FileTransport for local development.
+"""
+
+import logging
+import random
+import sys
+import uuid
+from datetime import timedelta
+from email.mime.text import MIMEText
+from functools import lru_cache
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentEmailError(Exception):
+    """The provider rejected the email in a way another attempt won't fix."""
+
+
+class GmailTransport:
+    """Sends through the Gmail REST API (gmail_api.py)."""
+
+    def send(self, email):
+        from .gmail_api import send_email
+        # imported here so the console/file transports work without Gmail settings
+        try:
+            return send_email(to=email.to_email, subject=email.subject, body=email.body).get('id', '')
+        except requests.HTTPError as e:
+            code = e.response.status_code if e.response is not None else None
+            if code and 400 <= code < 500 and code not in (401, 408, 429):
+                raise PermanentEmailError(f'Gmail rejected the email ({code})') from e
+                # a malformed message or bad address — 401/408/429 are worth another try
+            raise
+
+
+class ConsoleTransport:
+    """Prints each email to stdout instead of sending it."""
+
+    def send(self, email):
+        sys.stdout.write(
+            f"To: {email.to_email}\nSubject: {email.subject}\n\n{email.body}\n{'-' * 72}\n"
+        )
+        sys.stdout.flush()
+        return f'console-{email.id}'
+
+
+class FileTransport:
+    """Writes each email as an .eml file in EMAIL_FILE_PATH — open them in any mail client."""
+
+    def send(self, email):
+        directory = Path(settings.EMAIL_FILE_PATH)
+        directory.mkdir(parents=True, exist_ok=True)
+        message = MIMEText(email.body)
+        message['to'] = email.to_email
+        message['from'] = settings.DEFAULT_FROM_EMAIL
+        message['subject'] = email.subject
+        path = directory / f'{email.id}-{timezone.now():%Y%m%d-%H%M%S}.eml'
+        path.write_bytes(message.as_bytes())
+        return str(path)
+
+
+@lru_cache(maxsize=None)
+def get_transport():
+    """The transport named in settings.EMAIL_TRANSPORT — created once per process."""
+    return import_string(settings.EMAIL_TRANSPORT)()
+
+
+def enqueue(to, subject, body):
+    """Add an email to the outbox — call it inside the transaction it belongs to."""
+    return OutboundEmail.objects.create(to_email=to, subject=subject, body=body)
+
+
+def _due(now):
+    return (
+        Q(status=OutboundEmail.PENDING, next_attempt_at__lte=now)
+        | Q(status=OutboundEmail.SENDING, claimed_until__lt=now)
+        # a claim that ran out — its worker died before recording the outcome
+    )
+
+
+def claim_batch(batch_size):
+    """Claim up to batch_size due emails for this worker, oldest first, and return them.
+    The claim is a single conditional UPDATE keyed on a fresh id, so two workers running at
+    once never get the same row — on any database, without SELECT ... FOR UPDATE."""
+    now = timezone.now()
+    ids = list(
+        OutboundEmail.objects.filter(_due(now)).order_by('next_attempt_at', 'id').values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+    claim = uuid.uuid4().hex
+    OutboundEmail.objects.filter(_due(now), id__in=ids).update(
+        status=OutboundEmail.SENDING,
+        claimed_by=claim,
+        claimed_until=now + timedelta(seconds=settings.EMAIL_CLAIM_SECONDS),
+    )
+    # rows another worker claimed in between no longer match _due, so they are skipped
+    return list(OutboundEmail.objects.filter(claimed_by=claim, status=OutboundEmail.SENDING).order_by('id'))
+
+
+def retry_delay(attempts):
+    """Seconds to wait after the attempts-th failure — exponential, capped, with jitter."""
+    delay = min(settings.EMAIL_RETRY_MAX_BACKOFF, settings.EMAIL_RETRY_BACKOFF * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+    # jitter spreads a batch that failed together, so they don't all retry in the same second
+
+
+def deliver(email, transport=None):
+    """Send one claimed email and record the outcome. Returns its new status."""
+    transport = transport or get_transport()
+    email.attempts += 1
+    try:
+        email.provider_message_id = transport.send(email) or ''
+    except Exception as e:
+        email.last_error = f'{type(e).__name__}: {e}'[:2000]
+        if isinstance(e, PermanentEmailError) or email.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+            email.status = OutboundEmail.FAILED
+            logger.error(f"[Outbox] Giving up on email {email.id} to {email.to_email}: {email.last_error}")
+        else:
+            email.status = OutboundEmail.PENDING
+            email.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(email.attempts))
+            logger.warning(f"[Outbox] Email {email.id} failed (attempt {email.attempts}), retrying: {email.last_error}")
+    else:
+        email.status = OutboundEmail.SENT
+        email.sent_at = timezone.now()
+        email.last_error = ''
+
+    OutboundEmail.objects.filter(id=email.id, claimed_by=email.claimed_by).update(
+        status=email.status,
+        attempts=email.attempts,
+        next_attempt_at=email.next_attempt_at,
+        last_error=email.last_error,
+        provider_message_id=email.provider_message_id,
+        sent_at=email.sent_at,
+        claimed_until=None,
+    )
+    # only while our claim holds — if it ran out and another worker took the row over, that
+    # worker records the outcome instead
+    return email.status
+
+
+def process_batch(batch_size=None, transport=None):
+    """Claim and send one batch. Returns {status: count} for the emails it handled."""
+    counts = {}
+    for email in claim_batch(batch_size or settings.EMAIL_BATCH_SIZE):
+        outcome = deliver(email, transport)
+        counts[outcome] = counts.get(outcome, 0) + 1
+    return counts
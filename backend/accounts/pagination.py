@@ -0,0 +1,212 @@
+"""
+Keyset (cursor) pagination for the list endpoints.
+Instead of OFFSET/LIMIT (which gets slower the further you page) or returning the whole
+table, each page remembers the sort values of its last row and the next query asks for
+"rows after these values". With an index on the sort columns every page costs the same,
+no matter how big a student's inbox or the room catalogue gets.
+"""
+
+import base64
+# cursors are base64url-encoded JSON so they are opaque and safe to put in a query string
+
+import json
+# json.dumps / json.loads turn the cursor payload into text and back
+
+from datetime import date, datetime
+from decimal import Decimal
+# the sort columns we page over are datetimes, dates, decimals (price) and integer ids
+
+from django.db.models import Q
+# Q objects let us build the "(a < x) OR (a = x AND b < y)" keyset condition
+
+
+class PaginationError(ValueError):
+    """Raised for a malformed cursor or limit — the view turns it into a 400."""
+
+
+DEFAULT_ORDERING = ('-created_at', '-id')
+# every model is ordered by -created_at — id breaks ties between rows created in the same instant
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# ?limit= can ask for a different page size, but never more than MAX_PAGE_SIZE rows
+
+TOTAL_CAP = 1000
+# ?include_total=true counts at most this many rows — beyond that the total is reported
+# as an estimate, so the count never turns into a full table scan
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+
+
+def _to_json(value):
+    """Convert a sort value into something json.dumps can handle."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+        # Django parses ISO strings back into datetimes/dates when we filter on them
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values, direction, ordering):
+    """Pack the sort values of a boundary row into an opaque cursor string."""
+    payload = {
+        'v': [_to_json(v) for v in values],
+        'd': direction,
+        # 'n' = rows after the boundary (next page), 'p' = rows before it (previous page)
+        'o': ','.join(ordering),
+        # remember which ordering the cursor belongs to so it can't be replayed against another sort
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+    # strip the '=' padding — it would need escaping in a URL and is easy to put back
+
+
+def decode_cursor(cursor, ordering):
+    """Unpack a cursor string — returns (values, direction)."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, direction, cursor_ordering = payload['v'], payload['d'], payload['o']
+    except (ValueError, TypeError, KeyError):
+        # ValueError covers bad base64 and bad JSON (json.JSONDecodeError is a subclass)
+        raise PaginationError('Invalid cursor.')
+
+    if cursor_ordering != ','.join(ordering) or direction not in ('n', 'p') or len(values) != len(ordering):
+        raise PaginationError('Cursor does not match this list or sort order.')
+    return values, direction
+
+
+def _boundary_values(obj, ordering):
+    """Read the values of the ordering columns from a model instance."""
+    values = []
+    for field in ordering:
+        value = obj
+        for part in field.lstrip('-').split('__'):
+            value = getattr(value, part)
+            # follows related fields too, e.g. 'room__created_at'
+        values.append(value)
+    return values
+
+
+def _keyset_filter(ordering, values, backwards=False):
+    """Build the WHERE clause for "rows that come after `values` in this ordering".
+
+    For ordering (-created_at, -id) and values (t, 42) this is:
+        created_at < t OR (created_at = t AND id < 42)
+    backwards=True flips every comparison to get the rows that come before instead.
+    """
+    condition = Q()
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        descending = field.startswith('-') != backwards
+        step = Q(**{f'{name}__{"lt" if descending else "gt"}': values[i]})
+        for earlier_field, earlier_value in zip(ordering[:i], values[:i]):
+            step &= Q(**{earlier_field.lstrip('-'): earlier_value})
+            # all the earlier columns must be equal for this column to decide the order
+        condition |= step
+    return condition
+
+
+def _reverse(ordering):
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
+def rows_after(queryset, values, ordering):
+    """Filter `queryset` to the rows that come after the boundary `values` in this ordering."""
+    ordering = tuple(ordering)
+    first = ordering[0]
+    bound = Q(**{f'{first.lstrip("-")}__{"lte" if first.startswith("-") else "gte"}': values[0]})
+    # repeats the first column's condition on its own — the OR in the keyset filter hides it
+    # from some query planners, and this lets them range-scan the index from the cursor on
+    return queryset.filter(bound & _keyset_filter(ordering, values))
+
+
+def after_cursor(queryset, cursor, ordering):
+    """Filter `queryset` to the rows that come after a 'next' cursor — for feeds that only
+    ever move forward, like the message changes feed."""
+    ordering = tuple(ordering)
+    values, direction = decode_cursor(cursor, ordering)
+    if direction != 'n':
+        raise PaginationError('Cursor does not match this list or sort order.')
+    return rows_after(queryset, values, ordering)
+
+
+def cursor_for(obj, ordering):
+    """A 'next' cursor pointing just after `obj`."""
+    ordering = tuple(ordering)
+    return encode_cursor(_boundary_values(obj, ordering), 'n', ordering)
+
+
+def get_page_size(params, default=DEFAULT_PAGE_SIZE):
+    raw = params.get('limit', '').strip()
+    if not raw:
+        return default
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise PaginationError('limit must be a whole number.')
+    if limit < 1:
+        raise PaginationError('limit must be at least 1.')
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def approximate_total(queryset):
+    """Count the rows in the list, but stop counting at TOTAL_CAP.
+    Returns (total, is_estimate) — is_estimate is True when there are more than TOTAL_CAP rows."""
+    total = queryset.order_by()[:TOTAL_CAP + 1].count()
+    # order_by() drops the ORDER BY, the slice becomes "SELECT COUNT(*) FROM (... LIMIT 1001)"
+    if total > TOTAL_CAP:
+        return TOTAL_CAP, True
+    return total, False
+
+
+def paginate(queryset, params, ordering=DEFAULT_ORDERING):
+    """Return one page of `queryset` as (items, page_info).
+
+    Query parameters:
+      ?limit=N               page size (default 20, max 100)
+      ?cursor=...            the `next` or `prev` cursor from a previous response
+      ?include_total=true    also return a capped `total` row count
+
+    page_info is merged into the JSON response:
+      {'next': cursor or None, 'prev': cursor or None, 'has_more': bool}
+    plus 'total' and 'total_is_estimate' when include_total was asked for.
+    """
+    ordering = tuple(ordering)
+    limit = get_page_size(params)
+    cursor = params.get('cursor', '').strip()
+
+    page_info = {}
+    if params.get('include_total', '').strip().lower() in TRUE_VALUES:
+        page_info['total'], page_info['total_is_estimate'] = approximate_total(queryset)
+        # counted before the cursor filter so the total covers the whole list
+
+    direction = 'n'
+    if cursor:
+        values, direction = decode_cursor(cursor, ordering)
+        queryset = queryset.filter(_keyset_filter(ordering, values, backwards=(direction == 'p')))
+
+    if direction == 'p':
+        # walking backwards — read the rows just before the cursor in reverse order, then flip them
+        rows = list(queryset.order_by(*_reverse(ordering))[:limit + 1])
+        has_extra = len(rows) > limit
+        items = list(reversed(rows[:limit]))
+        has_prev, has_next = has_extra, True
+    else:
+        rows = list(queryset.order_by(*ordering)[:limit + 1])
+        # fetch one extra row — if it exists we know there is another page, without a COUNT query
+        has_extra = len(rows) > limit
+        items = rows[:limit]
+        has_prev, has_next = bool(cursor), has_extra
+
+    page_info['next'] = (
+        encode_cursor(_boundary_values(items[-1], ordering), 'n', ordering)
+        if items and has_next else None
+    )
+    page_info['prev'] = (
+        encode_cursor(_boundary_values(items[0], ordering), 'p', ordering)
+        if items and has_prev else None
+    )
+    page_info['has_more'] = page_info['next'] is not None
+    return items, page_info
@@ -0,0 +1,132 @@
+"""
+Who is online, kept in the cache instead of the students table.
+The frontend calls /api/check-session/ on every page load, and each call used to write
+last_activity/is_online to the student's row — the busiest write in the app, and on
+SQLite every one of them takes the database write lock. Now a page load only records a
+heartbeat in Django's cache (see settings.CACHES):
+
+    presence:seen:<id>    when the student was last seen — expires after PRESENCE_TIMEOUT
+    presence:online       the ids that may still be online, so they can be listed
+
+and the students table catches up in bulk: at most once every PRESENCE_FLUSH_INTERVAL
+seconds one request copies the heartbeats into last_activity/is_online with a single
+bulk_update (the `flush_presence` command does the same from cron). The cache has the
+freshest heartbeats, but it is not the only record: with the default in-process cache
+each server process sees only its own heartbeats, and a full cache can evict them. So
+online_students() also reads last_activity for students the cache doesn't know about, and
+flush() only marks a student offline when last_activity — which every process's flush
+keeps up to date — has expired too. A shared cache backend (file or Redis) still gives
+the most up-to-the-second answer.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Student
+
+
+ONLINE_KEY = 'presence:online'
+FLUSH_LOCK_KEY = 'presence:flush-lock'
+
+
+def _seen_key(student_id):
+    return f'presence:seen:{student_id}'
+
+
+def heartbeat(student_id, when=None):
+    """Record that the student is active right now (or at `when`)."""
+    when = when or timezone.now()
+    cache.set(_seen_key(student_id), when, settings.PRESENCE_TIMEOUT)
+
+    online = cache.get(ONLINE_KEY) or set()
+    if student_id not in online:
+        cache.set(ONLINE_KEY, online | {student_id}, None)
+        # only written when someone comes online, not on every heartbeat — if two
+        # processes race and one id is lost, that student's next heartbeat adds it back
+
+    flush_if_due()
+
+
+def forget(student_id):
+    """The student logged out — drop their heartbeat so they stop showing as online."""
+    cache.delete(_seen_key(student_id))
+
+
+def last_seen(student_id):
+    """When the student was last active, or None if not within PRESENCE_TIMEOUT."""
+    return cache.get(_seen_key(student_id))
+
+
+def _cached_online(cutoff):
+    """{student id: last seen} from this cache's heartbeats newer than `cutoff`."""
+    ids = cache.get(ONLINE_KEY) or set()
+    if not ids:
+        return {}
+    seen = cache.get_many([_seen_key(student_id) for student_id in ids])
+    # one round trip for everyone
+    online = {}
+    for student_id in ids:
+        stamp = seen.get(_seen_key(student_id))
+        if stamp and stamp >= cutoff:
+            online[student_id] = stamp
+    return online
+
+
+def online_students(within_seconds=None):
+    """{student id: last seen} for everyone active in the last `within_seconds`
+    (default PRESENCE_TIMEOUT) — the cached heartbeats, plus the flushed last_activity of
+    students this process's cache has no heartbeat for (seen by another process, or evicted)."""
+    cutoff = timezone.now() - timedelta(seconds=within_seconds or settings.PRESENCE_TIMEOUT)
+    online = dict(
+        Student.objects.filter(is_online=True, last_activity__gte=cutoff).values_list('id', 'last_activity')
+    )
+    for student_id, stamp in _cached_online(cutoff).items():
+        if stamp > online.get(student_id, cutoff):
+            online[student_id] = stamp
+        # the heartbeat is newer than the last flush
+    return online
+
+
+def flush_if_due():
+    """Run flush() if nobody has in the last PRESENCE_FLUSH_INTERVAL seconds."""
+    if cache.add(FLUSH_LOCK_KEY, True, settings.PRESENCE_FLUSH_INTERVAL):
+        # add() only succeeds if the key is missing — so across all processes sharing the
+        # cache, one request per interval gets to do the flush
+        flush()
+
+
+def flush():
+    """Copy the heartbeats into students.last_activity / is_online.
+    Returns how many student rows were written."""
+    ids = cache.get(ONLINE_KEY) or set()
+    cutoff = timezone.now() - timedelta(seconds=settings.PRESENCE_TIMEOUT)
+    seen = _cached_online(cutoff)
+
+    changed = []
+    for student in Student.objects.filter(Q(id__in=ids) | Q(is_online=True)).only('id', 'is_online', 'last_activity'):
+        # also everyone the table still has as online, so a student whose heartbeat was
+        # lost (evicted, or kept by another process) is not online forever
+        stamp = seen.get(student.id)
+        if stamp:
+            if not student.is_online or student.last_activity is None or stamp > student.last_activity:
+                student.last_activity = max(stamp, student.last_activity or stamp)
+                student.is_online = True
+                changed.append(student)
+            # last_activity never moves backwards — another process may have flushed a newer heartbeat
+        elif student.is_online and (student.last_activity is None or student.last_activity < cutoff):
+            student.is_online = False
+            changed.append(student)
+            # no heartbeat here and none flushed from anywhere else either — they left
+            # without logging out
+    Student.objects.bulk_update(changed, ['last_activity', 'is_online'], batch_size=500)
+    # one UPDATE for the whole batch, and no post_save signals / updated_at bumps
+
+    gone = ids - seen.keys()
+    if gone:
+        cache.set(ONLINE_KEY, (cache.get(ONLINE_KEY) or set()) - gone, None)
+        # re-read so ids added since the start of the flush are kept
+    return len(changed)
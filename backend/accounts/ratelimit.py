@@ -0,0 +1,120 @@
+"""
+Token-bucket rate limiting for login and password reset.
+Every login costs a PBKDF2 hash and every reset request a Gmail API call, so both are
+throttled per client IP and per email address before any of that work — or any
+database query — happens. Each (scope, ip) and (scope, email) pair has a bucket:
+
+    RATE_LIMITS[scope][kind] = (capacity, per_seconds)
+
+holds up to `capacity` tokens, refilled at capacity/per_seconds tokens a second. An
+attempt takes one token from each of its buckets; when one is empty the view answers 429
+with Retry-After, which costs a dictionary lookup instead of a hash.
+
+Buckets live in RATE_LIMIT_BACKEND — InProcessBuckets (default) keeps them in this server
+process; CacheBuckets keeps them in Django's cache so several worker processes share them
+(it needs a shared CACHE_BACKEND, like presence.py). Neither touches the students table.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+
+def _refill(tokens, updated, now, capacity, per):
+    return min(capacity, tokens + (now - updated) * capacity / per)
+
+
+def _wait_for_token(tokens, capacity, per):
+    """Seconds until a bucket holding `tokens` has a whole token again."""
+    return (1 - tokens) * per / capacity
+
+
+class InProcessBuckets:
+    """Buckets in a dict in this process — each server process counts on its own."""
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        # key -> (tokens, updated) — least recently used first, so a flood of made-up
+        # emails can't grow it without limit
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, per):
+        """Take a token — returns 0 on success, else the seconds until one is free."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated, now, capacity, per)
+            if tokens < 1:
+                return _wait_for_token(tokens, capacity, per)
+            self._buckets[key] = (tokens - 1, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > settings.RATE_LIMIT_MAX_KEYS:
+                self._buckets.popitem(last=False)
+                # a forgotten bucket starts full again, the same as one that refilled
+        return 0
+
+
+class CacheBuckets:
+    """Buckets in Django's cache, shared by every process that uses the same cache.
+    The read and write are not atomic, so two processes racing on one bucket may both get
+    its last token — close enough for throttling, and it needs no locks."""
+
+    def take(self, key, capacity, per):
+        now = time.time()
+        tokens, updated = cache.get(key) or (capacity, now)
+        tokens = _refill(tokens, updated, now, capacity, per)
+        if tokens < 1:
+            return _wait_for_token(tokens, capacity, per)
+        cache.set(key, (tokens - 1, now), math.ceil(per))
+        # a bucket left alone for `per` seconds is full again, so the entry can expire
+        return 0
+
+
+@lru_cache(maxsize=None)
+def get_buckets():
+    """The backend named in settings.RATE_LIMIT_BACKEND — created once per process."""
+    return import_string(settings.RATE_LIMIT_BACKEND)()
+
+
+def client_ip(request):
+    """The client's address, from RATE_LIMIT_IP_META (REMOTE_ADDR unless behind a proxy)."""
+    value = request.META.get(settings.RATE_LIMIT_IP_META) or request.META.get('REMOTE_ADDR', '')
+    addresses = [address.strip() for address in value.split(',') if address.strip()]
+    if not addresses:
+        return ''
+    hops = max(1, settings.RATE_LIMIT_TRUSTED_PROXIES)
+    return addresses[-min(hops, len(addresses))]
+    # X-Forwarded-For is a list each proxy appends to, so only the right-hand end is written
+    # by our own proxies — anything further left came from the client and could be made up
+
+
+def _key(scope, kind, value):
+    digest = hashlib.blake2b(str(value).lower().encode(), digest_size=12).hexdigest()
+    return f'ratelimit:{scope}:{kind}:{digest}'
+    # hashed, so emails never end up in cache keys (and every key is cache-safe)
+
+
+def check(scope, **values):
+    """Take a token from each of this scope's buckets, e.g. check('login', ip=..., email=...).
+    Returns 0 when the attempt may go ahead, or the seconds to wait before trying again."""
+    limits = settings.RATE_LIMITS.get(scope, {})
+    buckets = get_buckets()
+    for kind, value in values.items():
+        if not value or kind not in limits:
+            continue
+        capacity, per = limits[kind]
+        retry_after = buckets.take(_key(scope, kind, value), capacity, per)
+        if retry_after:
+            return retry_after
+    return 0
+
+
+def retry_after_header(retry_after):
+    return str(max(1, math.ceil(retry_after)))
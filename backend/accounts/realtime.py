@@ -0,0 +1,116 @@
+"""
+Live updates for the messages page.
+Instead of re-fetching /api/conversations/ to find out whether anything changed, the
+portal keeps one Server-Sent Events connection open (/api/events/, served by the ASGI
+app). When a message is sent or read, the views publish a small event on the
+"student:<id>" channel of everyone involved, and each open tab gets it straight away.
+
+Publishing goes through a broker chosen by settings.REALTIME_BROKER. The default,
+InProcessBroker, keeps subscribers in memory — right for a single server process and for
+tests. Running several ASGI workers needs a shared broker instead (for example one
+built on Redis pub/sub); it only has to provide the same two methods:
+
+    publish(channel, event)     called from ordinary sync views, may be called from any thread
+    subscribe(channel)          returns an object with `async get(timeout)` and `close()`
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+# import_string('accounts.realtime.InProcessBroker') -> the class
+
+
+class Subscription:
+    """One open connection listening on one channel."""
+
+    def __init__(self, broker, channel, max_pending):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        # the event loop of the connection — publish() hands events over to it thread-safely
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+    def deliver(self, event):
+        """Called by the broker, from whichever thread published the event."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass
+            # the connection's loop has already shut down
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+            # a tab that stopped reading — drop the event rather than buffer without limit;
+            # the page reloads its data whenever it reconnects anyway
+
+    async def get(self, timeout):
+        """Wait for the next event — returns None if nothing arrived within `timeout` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Pub/sub inside this Python process — every subscriber lives in this server's memory."""
+
+    MAX_PENDING = 100
+    # events buffered per connection before new ones are dropped
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        # sync views publish from worker threads while connections subscribe on the event loop
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.MAX_PENDING)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    """The broker named in settings.REALTIME_BROKER — created once per process."""
+    return import_string(settings.REALTIME_BROKER)()
+
+
+def student_channel(student_id):
+    return f'student:{student_id}'
+
+
+def notify_students(student_ids, event):
+    """Send `event` (a JSON-able dict with a 'type') to every open tab of these students.
+    Sent once the current transaction commits, so a tab that reacts by re-fetching is
+    guaranteed to see the new data."""
+    def publish():
+        broker = get_broker()
+        for student_id in set(student_ids):
+            broker.publish(student_channel(student_id), event)
+    transaction.on_commit(publish)
+    # outside a transaction on_commit runs immediately
@@ -0,0 +1,95 @@
+"""
+Cache of each room's serialized JSON.
+RoomSerializer is the most expensive part of every room listing — the photo URLs, the
+feature list and the owner's details per room — yet rooms are edited far less often than
+they are read. So the serialized dict for each room is stored in Django's cache framework
+(the 'rooms' cache — LocMem by default, or file/Redis via the CACHES setting) and list responses are put
+together with one get_many() call.
+
+Keys are versioned by (room id, updated_at): any save bumps updated_at, so an edited room
+is looked up under a new key and can never be served stale. signals.py also deletes the
+entry when a room is deleted, or when its owner's name/email changes (those are copied
+into the payload but do not touch the room's updated_at).
+
+Payloads are stored with relative /media/ URLs and made absolute per request, so one
+cached copy serves every hostname the site is reached on.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+cache = ConnectionProxy(caches, 'rooms')
+# the 'rooms' cache from settings.CACHES, kept apart from sessions and presence — a proxy
+# like django.core.cache.cache, so each thread uses its own connection
+
+from django.db.models import prefetch_related_objects
+
+from . import geo
+from .serializers import RoomSerializer, absolute_image_set, absolute_media_url, request_base_url
+
+
+PAYLOAD_VERSION = 3
+# bump this whenever RoomSerializer's fields change, so old cached payloads are ignored
+
+IMAGE_FIELDS = ['image_1', 'image_2', 'image_3', 'image_4', 'image_5']
+URL_FIELDS = IMAGE_FIELDS + [f'{field}_url' for field in IMAGE_FIELDS]
+# payload fields that hold a media URL and need the request's host in front of them
+
+
+def payload_key(room_id, updated_at):
+    return f'room-payload:v{PAYLOAD_VERSION}:{room_id}:{updated_at.timestamp():.6f}'
+    # e.g. "room-payload:v1:42:1760712000.123456"
+
+
+def _key(room):
+    return payload_key(room.pk, room.updated_at)
+
+
+def _for_request(payload, room, base):
+    """Copy a cached payload and fill in the per-request parts."""
+    data = dict(payload)
+    for field in URL_FIELDS:
+        data[field] = absolute_media_url(data[field], base)
+    data['images'] = [absolute_media_url(url, base) for url in data['images']]
+    data['image_sets'] = [absolute_image_set(image_set, base) for image_set in data['image_sets']]
+
+    distance_sq = getattr(room, 'distance_sq', None)
+    data['distance_km'] = geo.distance_km(distance_sq) if distance_sq is not None else None
+    # distance depends on the ?near= postcode of this search, so it is never cached
+    return data
+
+
+def serialize_rooms(rooms, request):
+    """Return the RoomSerializer output for `rooms` (a list or queryset), reading from the
+    cache where possible and serializing (then caching) only the rooms that are missing."""
+    rooms = list(rooms)
+    keys = [_key(room) for room in rooms]
+
+    payloads = cache.get_many(keys)
+    # one round trip to the cache for the whole page
+
+    missing = [(key, room) for key, room in zip(keys, rooms) if key not in payloads]
+    if missing:
+        missing_rooms = [room for _, room in missing]
+        prefetch_related_objects(missing_rooms, 'images')
+        # the photos of every room that needs serializing, in one query — cached rooms skip it
+        serialized = RoomSerializer(missing_rooms, many=True).data
+        # no request in the context, so image URLs come out relative (/media/...)
+        fresh = {key: dict(data) for (key, _), data in zip(missing, serialized)}
+        cache.set_many(fresh, settings.ROOM_PAYLOAD_CACHE_TIMEOUT)
+        payloads.update(fresh)
+
+    base = request_base_url(request)
+    # worked out once for the whole response
+    return [_for_request(payloads[key], room, base) for key, room in zip(keys, rooms)]
+
+
+def serialize_room(room, request):
+    """Cached RoomSerializer output for a single room."""
+    return serialize_rooms([room], request)[0]
+
+
+def forget(rooms):
+    """Drop the cached payloads for these rooms — anything with .pk and .updated_at."""
+    cache.delete_many([_key(room) for room in rooms])
@@ -0,0 +1,189 @@
+"""
+Full-text search over Room title, location/postcode and description.
+`icontains` on a TextField is a full table scan, so ?q= on GET /api/rooms/ goes through
+a real text index instead:
+
+  - SQLite (local db.sqlite3): an FTS5 virtual table called rooms_fts, whose rowid is the
+    room id. It is a separate table, so signals.py keeps it in sync whenever a room is
+    saved, deactivated or deleted.
+  - PostgreSQL (DATABASE_URL on production): a GIN index over a weighted tsvector
+    expression on the rooms table itself. Postgres updates the index on every write,
+    so there is nothing to keep in sync by hand.
+
+Both indexes are created by migration 0012 and can be rebuilt with
+`python manage.py rebuild_search_index`.
+"""
+
+import re
+# used to split the search box text into plain words
+
+from django.db import connection
+# the active database connection — tells us whether we are on SQLite or Postgres
+
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+# RawSQL lets us drop a hand-written SQL fragment into a normal Django queryset
+
+
+FTS_TABLE = 'rooms_fts'
+# name of the SQLite FTS5 table
+
+PG_INDEX = 'rooms_search_idx'
+# name of the Postgres GIN index
+
+PG_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(\"rooms\".\"title\", '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(\"rooms\".\"location\", '') || ' ' || coalesce(\"rooms\".\"postcode\", '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(\"rooms\".\"description\", '')), 'C')"
+)
+# the tsvector the GIN index is built on — queries must use exactly this expression for
+# Postgres to pick the index. Weights rank title matches above location above description.
+
+SQLITE_WEIGHTS = '10.0, 5.0, 5.0, 1.0'
+# bm25() column weights for (title, location, postcode, description) — same idea as above
+
+
+def search_backend():
+    """Return 'sqlite', 'postgresql', or None if this database has no text index."""
+    if connection.vendor in ('sqlite', 'postgresql'):
+        return connection.vendor
+    return None
+
+
+def search_terms(text):
+    """Split the search box text into words — punctuation is dropped, so user input can
+    never break the MATCH / to_tsquery syntax."""
+    return re.findall(r'\w+', text.lower())[:10]
+    # cap at 10 words — longer queries only slow the index down
+
+
+def _sqlite_match(terms):
+    return ' '.join(f'"{term}"*' for term in terms)
+    # "mile"* "end"* — every word must match, and the last letters can still be typed
+
+
+def _pg_tsquery(terms):
+    return ' & '.join(f'{term}:*' for term in terms)
+    # mile:* & end:* — same AND + prefix behaviour as the SQLite version
+
+
+def search_rooms(queryset, text, ranked=True):
+    """Narrow a Room queryset to rooms matching `text`.
+
+    ranked=True also annotates each room with `search_rank` for ?sort=relevance —
+    lower search_rank = better match on both backends, so it sorts ascending.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+        # nothing searchable was typed (only punctuation) — no matches, but keep the
+        # search_rank column so ?sort=relevance still works
+
+    backend = search_backend()
+    if backend == 'sqlite':
+        match = _sqlite_match(terms)
+        if not ranked:
+            return queryset.filter(
+                id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (match,))
+            )
+            # one uncorrelated subquery — SQLite runs the MATCH once and probes the id list
+
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = "rooms"."id"', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+        ).annotate(
+            search_rank=RawSQL(f'bm25({FTS_TABLE}, {SQLITE_WEIGHTS})', (), output_field=FloatField())
+        )
+        # the FTS table joined to the (already filtered) rooms: SQLite drives the join from
+        # the MATCH and ranks every room that passes the price/type/amenity/near filters, so
+        # no match is cut off before filtering. bm25() is only allowed in a query that reads
+        # the FTS table itself — a correlated subquery per room would be far slower — and
+        # it works in WHERE too, which the relevance cursor needs.
+
+    if backend == 'postgresql':
+        tsquery = _pg_tsquery(terms)
+        queryset = queryset.filter(
+            RawSQL(f"({PG_VECTOR}) @@ to_tsquery('english', %s)", (tsquery,), output_field=BooleanField())
+            # a boolean expression used directly as the WHERE clause, so the GIN index applies
+        )
+        if not ranked:
+            return queryset
+        return queryset.annotate(
+            search_rank=RawSQL(
+                f"-ts_rank({PG_VECTOR}, to_tsquery('english', %s))",
+                (tsquery,),
+                output_field=FloatField(),
+            )
+            # ts_rank() is "higher is better", so negate it to match SQLite's ordering
+        )
+
+    # any other database — fall back to a (slow) substring search so ?q= still works
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term) | Q(location__icontains=term) | Q(description__icontains=term)
+    return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def index_room(room):
+    """Add or refresh one room in the SQLite index — inactive rooms are removed instead.
+    Called from the Room post_save signal."""
+    if search_backend() != 'sqlite':
+        return
+        # Postgres keeps its GIN index up to date by itself
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [room.pk])
+        if room.is_active:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, location, postcode, description) VALUES (%s, %s, %s, %s, %s)',
+                [room.pk, room.title, room.location, room.postcode or '', room.description],
+            )
+
+
+def unindex_room(room_id):
+    """Remove one room from the SQLite index — called from the Room post_delete signal."""
+    if search_backend() != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [room_id])
+
+
+def rebuild_index(batch_size=500):
+    """Rebuild the whole index from the rooms table. Returns the number of rooms indexed."""
+    from .models import Room
+    # imported here to avoid a circular import (models -> signals -> search -> models)
+
+    backend = search_backend()
+    if backend == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'REINDEX INDEX {PG_INDEX}')
+        return Room.objects.filter(is_active=True).count()
+
+    if backend != 'sqlite':
+        return 0
+
+    total = 0
+    rooms = Room.objects.filter(is_active=True).values_list('id', 'title', 'location', 'postcode', 'description')
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        batch = []
+        for row in rooms.iterator(chunk_size=batch_size):
+            # .iterator() streams rows instead of loading every room into memory
+            batch.append((row[0], row[1], row[2], row[3] or '', row[4]))
+            if len(batch) >= batch_size:
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, title, location, postcode, description) VALUES (%s, %s, %s, %s, %s)',
+                    batch,
+                )
+                total += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, location, postcode, description) VALUES (%s, %s, %s, %s, %s)',
+                batch,
+            )
+            total += len(batch)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        # merges the FTS5 b-trees into one so the first searches after a rebuild are fast
+    return total
@@ -2,13 +2,126 @@ from rest_framework import serializers
 # serializers convert Python objects to JSON and validate incoming JSON data
 # they sit between the API views and the database models
 
-from .models import Student, Room, Message
+from .models import Student, Room, RoomImage, Message
 # import our custom models from models.py in the same directory
 
+from . import geo
+# converts the distance annotation from ?near= searches into kilometres
+
+from . import images
+# formats of the resized photo copies — see _image_set()
+
+from django.core.files.storage import default_storage
+# turns a stored file name into its /media/ URL
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+# loads just the cover photo of each room on a card page
+
 import re
 # regular expressions — used here to validate that student IDs are exactly 8 digits
 
 
+FEATURE_DISPLAY = {
+    'wifi': {'icon': '📶', 'name': 'WiFi'},
+    'washing_machine': {'icon': '🧺', 'name': 'Washing Machine'},
+    'dishwasher': {'icon': '🍽️', 'name': 'Dishwasher'},
+    'parking': {'icon': '🚗', 'name': 'Parking'},
+    'garden': {'icon': '🌳', 'name': 'Garden'},
+    'gym': {'icon': '🏋️', 'name': 'Gym'},
+    'central_heating': {'icon': '🔥', 'name': 'Central Heating'},
+    'double_glazing': {'icon': '🪟', 'name': 'Double Glazing'},
+    'security_system': {'icon': '🔒', 'name': 'Security System'},
+    'bike_storage': {'icon': '🚴', 'name': 'Bike Storage'},
+}
+# maps each amenity field name to a display-friendly dict
+
+FEATURES_BY_MASK = [
+    tuple(FEATURE_DISPLAY[field] for i, field in enumerate(Room.AMENITY_FIELDS) if mask & (1 << i))
+    for mask in range(1 << len(Room.AMENITY_FIELDS))
+]
+# every possible Room.amenities value (0-1023) decoded once at import time —
+# FEATURES_BY_MASK[room.amenities] is the room's feature list, no per-row loop needed
+
+
+def request_base_url(request):
+    """"https://arwin001.pythonanywhere.com" for this request — or '' without one.
+    Worked out once per response so each image URL is a string join, not a full
+    build_absolute_uri() call."""
+    return request.build_absolute_uri('/')[:-1] if request else ''
+
+
+def absolute_media_url(url, base):
+    """Put the site address in front of a /media/... path."""
+    if url and base and url.startswith('/'):
+        return base + url
+    return url
+    # None, relative when there is no request, or already absolute (e.g. MEDIA_URL on another host)
+
+
+def absolute_image_set(image_set, base):
+    """absolute_media_url for every URL in an image set (see MediaURLMixin._image_set)."""
+    if not image_set or not base:
+        return image_set
+    return {
+        **image_set,
+        'src': absolute_media_url(image_set['src'], base),
+        'srcset': _absolute_srcset(image_set['srcset'], base),
+        'sources': [
+            {**source, 'srcset': _absolute_srcset(source['srcset'], base)} for source in image_set['sources']
+        ],
+    }
+
+
+def _absolute_srcset(srcset, base):
+    return ', '.join(absolute_media_url(item, base) for item in srcset.split(', ')) if srcset else srcset
+    # each item is "/media/... 640w" — only the URL at the front changes
+
+
+class MediaURLMixin:
+    """Shared by the room serializers — turns a room's photos into absolute URLs."""
+
+    def _base_url(self):
+        if not hasattr(self, '_request_base_url'):
+            self._request_base_url = request_base_url(self.context.get('request'))
+            # with many=True one serializer instance handles every row, so this runs once per response
+        return self._request_base_url
+
+    def _media_url(self, image_field):
+        """Full absolute URL for an uploaded image — or just the /media/ path when there is
+        no request in the context (room_cache.py stores it that way and adds the host later)"""
+        if not image_field:
+            return None
+        return absolute_media_url(image_field.url, self._base_url())
+        # turns "/media/room_images/photo.jpg" into "https://arwin001.pythonanywhere.com/media/room_images/photo.jpg"
+
+    def _image_set(self, image):
+        """A RoomImage with its resized copies, ready for <picture>/<img srcset>:
+        {'src', 'width', 'height', 'srcset' (JPEG), 'sources': [{'type', 'srcset'}, ...]}.
+        Until images.py has made the copies, srcset is empty and sources is [] — use src."""
+        if image is None:
+            return None
+        variants = image.variants or {}
+        base = self._base_url()
+
+        def srcset(fmt):
+            return ', '.join(
+                f'{absolute_media_url(default_storage.url(name), base)} {width}w' for width, name in variants.get(fmt, [])
+            )
+
+        return {
+            'src': self._media_url(image.file),
+            'width': image.width,
+            'height': image.height,
+            'srcset': srcset('jpeg'),
+            'sources': [
+                {'type': images.FORMATS[fmt][2], 'srcset': srcset(fmt)}
+                for fmt in images.SOURCE_ORDER if variants.get(fmt)
+            ],
+        }
+
+
 # ============================================================
 # SIGNUP SERIALIZER — validates and creates a new student account
 # ============================================================
@@ -69,11 +182,17 @@ class StudentSignupSerializer(serializers.ModelSerializer):
         password = validated_data.pop('password')
         # take the raw password out of the data
 
+        password_hash = validated_data.pop('password_hash', None)
+        # the signup view hashes the password in the hashing pool and passes it to save()
+
         student = Student(**validated_data)
         # create a Student instance with the remaining fields (name, email, student_id, course, etc.)
 
-        student.set_password(password)
-        # hash the password — never store raw passwords
+        if password_hash:
+            student.password_hash = password_hash
+        else:
+            student.set_password(password)
+            # hash the password — never store raw passwords
 
         student.save()
         # insert the new row into the students table
@@ -104,7 +223,7 @@ class StudentSerializer(serializers.ModelSerializer):
 # ============================================================
 # ROOM SERIALIZER — for reading room data (GET requests)
 # ============================================================
-class RoomSerializer(serializers.ModelSerializer):
+class RoomSerializer(MediaURLMixin, serializers.ModelSerializer):
     # these are extra read-only fields that pull data from related models
     owner_name = serializers.CharField(source='owner.name', read_only=True)
     # source='owner.name' means: follow the ForeignKey to Student and grab the name field
@@ -114,9 +233,23 @@ class RoomSerializer(serializers.ModelSerializer):
     images = serializers.SerializerMethodField()
     # SerializerMethodField calls get_images() to compute its value
 
+    image_sets = serializers.SerializerMethodField()
+    # the same photos with their resized WebP/AVIF/JPEG srcsets (see images.py)
+
     features = serializers.SerializerMethodField()
     # calls get_features() to build a list of amenities
 
+    distance_km = serializers.SerializerMethodField()
+    # only set on ?near=<postcode> searches — how far the room is from that postcode
+
+    image_1 = serializers.SerializerMethodField(method_name='get_image_1_url')
+    image_2 = serializers.SerializerMethodField(method_name='get_image_2_url')
+    image_3 = serializers.SerializerMethodField(method_name='get_image_3_url')
+    image_4 = serializers.SerializerMethodField(method_name='get_image_4_url')
+    image_5 = serializers.SerializerMethodField(method_name='get_image_5_url')
+    # this serializer is output-only, so the image fields reuse the URL methods below instead
+    # of DRF's ImageField (which would call build_absolute_uri again for every image)
+
     # individual image URL fields — each calls its own get_image_X_url method
     image_1_url = serializers.SerializerMethodField()
     image_2_url = serializers.SerializerMethodField()
@@ -129,113 +262,208 @@ class RoomSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'owner', 'owner_name', 'owner_email',
             'title', 'description', 'location', 'postcode', 'distance_to_transport',
+            'latitude', 'longitude', 'distance_km',
             'price', 'deposit', 'bills',
             'room_type', 'furnished', 'available_from', 'min_stay_months', 'max_stay_months',
             'image_1', 'image_2', 'image_3', 'image_4', 'image_5',
             'image_1_url', 'image_2_url', 'image_3_url', 'image_4_url', 'image_5_url',
-            'images', 'features',
+            'images', 'image_sets', 'features',
             'wifi', 'washing_machine', 'dishwasher', 'parking', 'garden',
             'gym', 'central_heating', 'double_glazing', 'security_system', 'bike_storage',
             'is_active', 'is_featured', 'is_verified',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['owner', 'is_featured', 'is_verified', 'created_at', 'updated_at']
+        read_only_fields = ['owner', 'latitude', 'longitude', 'is_featured', 'is_verified', 'created_at', 'updated_at']
         # these fields cannot be changed by the user through the API
 
+    # image_1..image_5 (and the _url copies) are the first five photos, for older frontend code
+
+    def _photos(self, obj):
+        """The room's RoomImages in gallery order — read once per room, from the
+        prefetch_related('images') cache when the caller set one up (room_cache.py does)."""
+        photos = getattr(obj, '_serializer_photos', None)
+        if photos is None:
+            photos = obj._serializer_photos = list(obj.images.all())
+        return photos
+
+    def _photo_url(self, obj, index):
+        photos = self._photos(obj)
+        return self._media_url(photos[index].file) if index < len(photos) else None
+
     def get_image_1_url(self, obj):
-        """Build the full absolute URL for image_1"""
-        if obj.image_1:
-            request = self.context.get('request')
-            # self.context['request'] is the current HTTP request, passed by the view
-            if request:
-                return request.build_absolute_uri(obj.image_1.url)
-                # turns "/media/room_images/photo.jpg" into "https://arwin001.pythonanywhere.com/media/room_images/photo.jpg"
-        return None
+        """Build the full absolute URL for the first photo"""
+        return self._photo_url(obj, 0)
 
     def get_image_2_url(self, obj):
-        if obj.image_2:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image_2.url)
-        return None
+        return self._photo_url(obj, 1)
 
     def get_image_3_url(self, obj):
-        if obj.image_3:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image_3.url)
-        return None
+        return self._photo_url(obj, 2)
 
     def get_image_4_url(self, obj):
-        if obj.image_4:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image_4.url)
-        return None
+        return self._photo_url(obj, 3)
 
     def get_image_5_url(self, obj):
-        if obj.image_5:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image_5.url)
-        return None
+        return self._photo_url(obj, 4)
 
     def get_images(self, obj):
-        """Return a list of all non-empty image URLs as absolute paths"""
-        request = self.context.get('request')
-        images = []
-        for i in range(1, 6):
-            image_field = getattr(obj, f'image_{i}')
-            # dynamically access image_1, image_2, etc.
-            if image_field:
-                if request:
-                    images.append(request.build_absolute_uri(image_field.url))
-                else:
-                    images.append(image_field.url)
-        return images
+        """Return a list of all the room's image URLs as absolute paths, in gallery order"""
+        return [self._media_url(photo.file) for photo in self._photos(obj)]
 
-    def get_features(self, obj):
-        """Build a list of active amenities with their icons and display names"""
-        features = []
-        feature_mapping = {
-            'wifi': {'icon': '📶', 'name': 'WiFi'},
-            'washing_machine': {'icon': '🧺', 'name': 'Washing Machine'},
-            'dishwasher': {'icon': '🍽️', 'name': 'Dishwasher'},
-            'parking': {'icon': '🚗', 'name': 'Parking'},
-            'garden': {'icon': '🌳', 'name': 'Garden'},
-            'gym': {'icon': '🏋️', 'name': 'Gym'},
-            'central_heating': {'icon': '🔥', 'name': 'Central Heating'},
-            'double_glazing': {'icon': '🪟', 'name': 'Double Glazing'},
-            'security_system': {'icon': '🔒', 'name': 'Security System'},
-            'bike_storage': {'icon': '🚴', 'name': 'Bike Storage'},
-        }
-        # maps each boolean field name to a display-friendly dict
+    def get_image_sets(self, obj):
+        """One image set per photo, in the same order as `images`"""
+        return [self._image_set(photo) for photo in self._photos(obj)]
 
-        for field, display in feature_mapping.items():
-            if getattr(obj, field, False):
-                # check if that boolean field is True on this room
-                features.append(display)
+    def get_distance_km(self, obj):
+        distance_sq = getattr(obj, 'distance_sq', None)
+        # the annotation only exists when the queryset came from geo.rooms_near()
+        return geo.distance_km(distance_sq) if distance_sq is not None else None
 
-        return features
+    def get_features(self, obj):
+        """Return the active amenities with their icons and display names"""
+        return list(FEATURES_BY_MASK[obj.amenities])
         # the frontend uses this to show amenity badges on the room card
 
 
+# ============================================================
+# ROOM CARD SERIALIZER — the compact shape used by ?view=card on room lists
+# ============================================================
+class RoomCardSerializer(MediaURLMixin, serializers.ModelSerializer):
+    """Just what a listing card shows: title, price, location, first photo and badges.
+    About a tenth of the size of RoomSerializer's output."""
+
+    COLUMNS = [
+        'id', 'owner', 'owner__name', 'title', 'location', 'postcode', 'distance_to_transport',
+        'price', 'bills', 'room_type', 'furnished', 'available_from', 'amenities',
+        'is_featured', 'is_verified', 'created_at', 'updated_at', 'owner__updated_at',
+    ]
+    # the only columns the view loads (the updated_at pair feeds the ETag in conditional.py) — use with .select_related('owner').only(*COLUMNS)
+    # so the owner's name comes from the same SQL query (a join) instead of one query per room
+
+    @staticmethod
+    def cover_prefetch():
+        """prefetch_related() argument that loads just each room's cover photo (position 0)
+        into room.cover_images — one query for the whole page."""
+        return Prefetch('images', queryset=RoomImage.objects.filter(position=0), to_attr='cover_images')
+
+    owner_name = serializers.CharField(source='owner.name', read_only=True)
+
+    image = serializers.SerializerMethodField()
+    # the first photo only — cards never show the others
+
+    image_set = serializers.SerializerMethodField()
+    # that photo's resized copies — a card only needs the 320/640px ones, not the original
+
+    features = serializers.SerializerMethodField()
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Room
+        fields = [
+            'id', 'owner', 'owner_name', 'title', 'location', 'postcode', 'distance_to_transport',
+            'price', 'bills', 'room_type', 'furnished', 'available_from', 'image', 'image_set', 'features',
+            'is_featured', 'is_verified', 'created_at', 'distance_km',
+        ]
+        read_only_fields = fields
+
+    def _cover(self, obj):
+        covers = getattr(obj, 'cover_images', None)
+        if covers is None:
+            covers = obj.images.filter(position=0)[:1]
+            # not prefetched with cover_prefetch() — one query for this room
+        return covers[0] if covers else None
+
+    def get_image(self, obj):
+        cover = self._cover(obj)
+        return self._media_url(cover.file) if cover else None
+
+    def get_image_set(self, obj):
+        return self._image_set(self._cover(obj))
+
+    def get_features(self, obj):
+        return list(FEATURES_BY_MASK[obj.amenities])
+
+    def get_distance_km(self, obj):
+        distance_sq = getattr(obj, 'distance_sq', None)
+        return geo.distance_km(distance_sq) if distance_sq is not None else None
+
+
 # ============================================================
 # ROOM CREATE SERIALIZER — for creating/updating rooms (POST/PUT)
 # ============================================================
 class RoomCreateSerializer(serializers.ModelSerializer):
     # simpler than RoomSerializer — only includes writable fields
+    image_1 = serializers.ImageField(write_only=True, required=False)
+    image_2 = serializers.ImageField(write_only=True, required=False)
+    image_3 = serializers.ImageField(write_only=True, required=False)
+    image_4 = serializers.ImageField(write_only=True, required=False)
+    image_5 = serializers.ImageField(write_only=True, required=False)
+    # the post-room form's five upload slots — image_N sets (or replaces) photo N
+
+    images = serializers.ListField(child=serializers.ImageField(), write_only=True, required=False)
+    # any number of extra photos, added after the existing ones
+
+    SLOT_FIELDS = ['image_1', 'image_2', 'image_3', 'image_4', 'image_5']
+
     class Meta:
         model = Room
         fields = [
             'title', 'description', 'location', 'postcode', 'distance_to_transport',
             'price', 'deposit', 'bills',
             'room_type', 'furnished', 'available_from', 'min_stay_months', 'max_stay_months',
-            'image_1', 'image_2', 'image_3', 'image_4', 'image_5',
+            'image_1', 'image_2', 'image_3', 'image_4', 'image_5', 'images',
             'wifi', 'washing_machine', 'dishwasher', 'parking', 'garden',
             'gym', 'central_heating', 'double_glazing', 'security_system', 'bike_storage',
         ]
 
+    def validate(self, data):
+        slots = {field: data[field] for field in self.SLOT_FIELDS if data.get(field)}
+        extra = data.get('images') or []
+        if self.instance is None and not slots and not extra:
+            raise serializers.ValidationError({"image_1": "At least one photo is required."})
+            # the first photo used to be a required column — every listing still needs a cover
+        existing = self.instance.images.count() if self.instance else 0
+        added = len([field for field in slots if self.SLOT_FIELDS.index(field) >= existing])
+        # a slot the room already has a photo in replaces it, any other slot adds one
+        if existing + added + len(extra) > settings.ROOM_MAX_IMAGES:
+            raise serializers.ValidationError({"images": f"A room can have at most {settings.ROOM_MAX_IMAGES} photos."})
+        return data
+
+    def _pop_photos(self, validated_data):
+        slots = [(i, validated_data.pop(field, None)) for i, field in enumerate(self.SLOT_FIELDS)]
+        return [(i, f) for i, f in slots if f], validated_data.pop('images', None) or []
+
+    def _save_photos(self, room, slots, extra):
+        """Put the uploaded photos in place — image_N replaces photo N (or is added at the
+        end when the room has fewer), `images` are added at the end. Positions stay 0..n-1."""
+        photos = list(room.images.all())
+        for index, upload in slots:
+            if index < len(photos):
+                photos[index].delete()
+                photos[index] = RoomImage(room=room, position=index, file=upload)
+                # a new row rather than a new file on the old one, so its variants start afresh
+            else:
+                photos.append(RoomImage(room=room, position=len(photos), file=upload))
+        for upload in extra:
+            photos.append(RoomImage(room=room, position=len(photos), file=upload))
+        for photo in photos:
+            if photo.pk is None:
+                photo.save()
+
+    def create(self, validated_data):
+        slots, extra = self._pop_photos(validated_data)
+        with transaction.atomic():
+            room = super().create(validated_data)
+            self._save_photos(room, slots, extra)
+        return room
+
+    def update(self, instance, validated_data):
+        slots, extra = self._pop_photos(validated_data)
+        with transaction.atomic():
+            room = super().update(instance, validated_data)
+            self._save_photos(room, slots, extra)
+        return room
+
     def validate_price(self, value):
         if value <= 0:
             raise serializers.ValidationError("Price must be greater than 0.")
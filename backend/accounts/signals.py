@@ -0,0 +1,89 @@
+"""
+Model signal handlers — code that runs automatically after rows are saved or deleted.
+Connected in AccountsConfig.ready() (apps.py) so they are active as soon as Django starts.
+"""
+
+from django.db.models.signals import post_delete, post_save
+# post_save fires after Model.save(), post_delete after Model.delete()
+
+from django.dispatch import receiver
+# @receiver(signal, sender=Model) registers a function to be called for that signal
+
+from django.utils import timezone
+
+from . import identity, images, media_store, room_cache, search
+from .models import Room, RoomImage, Student
+
+
+@receiver(post_save, sender=Room)
+def update_room_search_index(sender, instance, **kwargs):
+    """Keep the full-text index in step with the room — deactivated rooms drop out of it."""
+    search.index_room(instance)
+
+
+@receiver(post_delete, sender=Room)
+def remove_room_from_search_index(sender, instance, **kwargs):
+    search.unindex_room(instance.pk)
+
+
+@receiver(post_save, sender=Room)
+def expire_room_payload(sender, instance, **kwargs):
+    """The new updated_at already gives the room a fresh cache key — this also clears the
+    current key in case two saves land in the same clock tick."""
+    room_cache.forget([instance])
+
+
+@receiver(post_delete, sender=Room)
+def remove_room_payload(sender, instance, **kwargs):
+    room_cache.forget([instance])
+
+
+@receiver(post_save, sender=RoomImage)
+@receiver(post_delete, sender=RoomImage)
+def touch_room_for_photo(sender, instance, **kwargs):
+    """Photos are part of the room's JSON and ETag, which are keyed on the room's
+    updated_at — so adding, replacing or removing one counts as changing the room."""
+    Room.objects.filter(pk=instance.room_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=RoomImage)
+def count_photo_file(sender, instance, created, **kwargs):
+    """Keep the stored file's reference count (media_store.py) — a new photo uses its file,
+    a photo given another file moves its reference from the old one to the new one."""
+    replaced = getattr(instance, '_replaced_file', None)
+    if created or replaced:
+        media_store.retain(instance.file.name, instance.content_hash)
+    if replaced:
+        media_store.release(replaced)
+
+
+@receiver(post_delete, sender=RoomImage)
+def release_photo_file(sender, instance, **kwargs):
+    """The file stays on disk (another room may share it) — collect_media deletes it once
+    nothing has used it for the grace period."""
+    media_store.release(instance.file.name)
+
+
+@receiver(post_save, sender=RoomImage)
+def make_photo_variants(sender, instance, created, **kwargs):
+    """Resize a new or replaced photo in the background once the save commits (images.py)."""
+    if created or getattr(instance, '_replaced_file', None):
+        images.schedule(instance)
+
+
+@receiver(post_save, sender=Student)
+def expire_owner_room_payloads(sender, instance, update_fields=None, **kwargs):
+    """Room payloads include owner_name and owner_email, so drop the cached copies of a
+    student's rooms when either may have changed. Saves that only touch other columns
+    (is_online, last_activity on every request) are skipped."""
+    if update_fields is not None and not {'name', 'email'} & set(update_fields):
+        return
+    room_cache.forget(Room.objects.filter(owner=instance).only('id', 'updated_at'))
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+def forget_cached_student(sender, instance, **kwargs):
+    """request.student is served from a short-lived cache — drop this process's copy."""
+    identity.forget(instance.pk)
+
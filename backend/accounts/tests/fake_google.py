@@ -0,0 +1,178 @@
+"""
+A local stand-in for Google's OAuth2 token endpoint and the Gmail send and batch endpoints,
+for the gmail_api tests. It runs in a thread on 127.0.0.1 and records what it was asked, so a
+test can check how many tokens were requested, which token each send carried and over
+which connection it arrived.
+"""
+
+import base64
+import json
+import re
+import secrets
+import threading
+import time
+from email.parser import BytesParser
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOKEN_PATH = '/token'
+SEND_PATH = '/gmail/v1/users/me/messages/send'
+BATCH_PATH = '/batch/gmail/v1'
+
+
+class FakeGoogle:
+    def __init__(self):
+        self.expires_in = 3600
+        # what the token endpoint says about every token it hands out
+        self.token_delay = 0.0
+        # seconds the token endpoint takes to answer — widens the window for racing threads
+        self.reject_all = False
+        # answer every send with 401, even with a token we issued
+        self.part_statuses = {}
+        # recipient -> statuses its batch part is answered with, one per attempt (then 200)
+        self.dropped = set()
+        # recipients whose part is left out of the batch answer altogether
+        self.batch_failures = []
+        # (status, Retry-After) for the next whole batch requests, one per request
+
+        self.token_requests = 0
+        self.sends = []
+        # one (token, connection) per send request, in order — connection is the client's port
+        self.batches = []
+        # the recipients of each batch request, in the order of its parts
+        self.connections = set()
+        self._valid_tokens = set()
+        self.lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _handler(self))
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        # a short poll interval, so stop() does not hold up every test for half a second
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server.server_address[1]}'
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def revoke_tokens(self):
+        """Every token handed out so far stops working, as if revoked at Google."""
+        with self.lock:
+            self._valid_tokens.clear()
+
+    def issue_token(self):
+        if self.token_delay:
+            time.sleep(self.token_delay)
+        token = f'ya29.{secrets.token_hex(8)}'
+        with self.lock:
+            self.token_requests += 1
+            self._valid_tokens.add(token)
+        return 200, {'access_token': token, 'expires_in': self.expires_in, 'token_type': 'Bearer'}
+
+    def authorized(self, headers):
+        """The bearer token of a request, and whether we would accept it."""
+        token = headers.get('Authorization', '').removeprefix('Bearer ')
+        with self.lock:
+            return token, token in self._valid_tokens and not self.reject_all
+
+    def send(self, headers, body, connection):
+        token, ok = self.authorized(headers)
+        with self.lock:
+            self.sends.append((token, connection))
+        if not ok:
+            return 401, {'error': {'code': 401, 'message': 'Invalid Credentials'}}
+        if 'raw' not in json.loads(body):
+            return 400, {'error': {'code': 400, 'message': "'raw' RFC822 payload message string is required."}}
+        return 200, {'id': f'msg-{len(self.sends)}', 'labelIds': ['SENT']}
+
+    def batch(self, headers, body):
+        """Answer a multipart/mixed batch the way Google does: one application/http part per
+        request, matched up by Content-ID ("<item3>" -> "<response-item3>")."""
+        if not self.authorized(headers)[1]:
+            return 401, {'error': {'code': 401, 'message': 'Invalid Credentials'}}
+        envelope = f'Content-Type: {headers.get("Content-Type", "")}\r\n\r\n'.encode() + body
+        items = []
+        for part in BytesParser().parsebytes(envelope).get_payload():
+            request_line, _, rest = part.get_payload(decode=True).partition(b'\r\n')
+            raw = json.loads(re.split(rb'\r\n\r\n', rest, maxsplit=1)[1])['raw']
+            email = BytesParser().parsebytes(base64.urlsafe_b64decode(raw))
+            items.append((part['Content-ID'].strip('<>'), request_line.decode(), email['to']))
+
+        with self.lock:
+            self.batches.append([to for _, _, to in items])
+            failure = self.batch_failures.pop(0) if self.batch_failures else None
+            if failure:
+                code, retry_after = failure
+                return code, {'error': {'code': code, 'message': 'Rate Limit Exceeded'}}, [('Retry-After', str(retry_after))]
+            answers = []
+            for content_id, request_line, to in items:
+                statuses = self.part_statuses.get(to)
+                code = statuses.pop(0) if statuses else 200
+                if to not in self.dropped:
+                    answers.append((content_id, request_line, to, code))
+
+        boundary = f'batch_{secrets.token_hex(8)}'
+        parts = []
+        for content_id, request_line, to, code in reversed(answers):
+            # in reverse, so only the Content-IDs put them back in order
+            if request_line != f'POST {SEND_PATH}':
+                code = 404
+            data = {'id': f'msg-{to}', 'threadId': f'thread-{to}'} if code == 200 else {
+                'error': {'code': code, 'message': f'{HTTPStatus(code).phrase} for {to}'},
+            }
+            payload = json.dumps(data)
+            parts.append(
+                f'--{boundary}\r\n'
+                'Content-Type: application/http\r\n'
+                f'Content-ID: <response-{content_id}>\r\n'
+                '\r\n'
+                f'HTTP/1.1 {code} {HTTPStatus(code).phrase}\r\n'
+                'Content-Type: application/json; charset=UTF-8\r\n'
+                f'Content-Length: {len(payload)}\r\n'
+                '\r\n'
+                f'{payload}\r\n'
+            )
+        parts.append(f'--{boundary}--\r\n')
+        return 200, ''.join(parts).encode(), (), f'multipart/mixed; boundary={boundary}'
+
+
+def _handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # keep-alive, so a reused client connection shows up as one client port
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            with fake.lock:
+                fake.connections.add(self.client_address[1])
+            if self.path == TOKEN_PATH:
+                answer = fake.issue_token()
+            elif self.path == SEND_PATH:
+                answer = fake.send(self.headers, body, self.client_address[1])
+            elif self.path == BATCH_PATH:
+                answer = fake.batch(self.headers, body)
+            else:
+                answer = 404, {'error': {'code': 404, 'message': 'Not Found'}}
+            self.reply(*answer)
+
+        def reply(self, code, data, headers=(), content_type='application/json; charset=UTF-8'):
+            payload = data if isinstance(data, bytes) else json.dumps(data).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(payload)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+            # keep the test output clean
+
+    return Handler
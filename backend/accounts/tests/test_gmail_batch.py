@@ -0,0 +1,176 @@
+from email.parser import BytesParser
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase, override_settings
+
+from accounts import gmail_api
+
+from .test_gmail_token import GmailTestCase
+
+
+GOOGLE_REPLY = (
+    # a batch answer as Google sends it: parts in any order, matched by Content-ID
+    '--batch_foobarbaz\r\n'
+    'Content-Type: application/http\r\n'
+    'Content-ID: <response-item1>\r\n'
+    '\r\n'
+    'HTTP/1.1 429 Too Many Requests\r\n'
+    'Content-Type: application/json; charset=UTF-8\r\n'
+    '\r\n'
+    '{"error": {"code": 429, "message": "User-rate limit exceeded."}}\r\n'
+    '--batch_foobarbaz\r\n'
+    'Content-Type: application/http\r\n'
+    'Content-ID: <response-item0>\r\n'
+    '\r\n'
+    'HTTP/1.1 200 OK\r\n'
+    'Content-Type: application/json; charset=UTF-8\r\n'
+    'Content-Length: 44\r\n'
+    '\r\n'
+    '{"id": "18c5f1aa", "threadId": "18c5f1aa"}\r\n'
+    '--batch_foobarbaz\r\n'
+    'Content-Type: application/http\r\n'
+    'Content-ID: <response-item3>\r\n'
+    '\r\n'
+    'HTTP/1.1 400 Bad Request\r\n'
+    'Content-Type: application/json; charset=UTF-8\r\n'
+    '\r\n'
+    '{"error": {"code": 400, "message": "Invalid To header"}}\r\n'
+    '--batch_foobarbaz--\r\n'
+).encode()
+
+
+def recipients(*names):
+    return [f'{name}@example.com' for name in names]
+
+
+def messages(*names):
+    return [(to, 'Subject', 'Body') for to in recipients(*names)]
+
+
+class BatchFormatTests(SimpleTestCase):
+    def test_batch_body_is_one_http_request_per_part(self):
+        body = gmail_api._batch_body(['cmF3MA', 'cmF3MQ'], 'batch_b0undary')
+        message = BytesParser().parsebytes(b'Content-Type: multipart/mixed; boundary=batch_b0undary\r\n\r\n' + body)
+
+        parts = message.get_payload()
+        self.assertEqual([part['Content-ID'] for part in parts], ['<item0>', '<item1>'])
+        self.assertEqual({part.get_content_type() for part in parts}, {'application/http'})
+        request = parts[1].get_payload(decode=True)
+        self.assertEqual(
+            request,
+            b'POST /gmail/v1/users/me/messages/send\r\nContent-Type: application/json\r\n\r\n{"raw": "cmF3MQ"}',
+            # the CRLF after the JSON belongs to the next boundary line
+        )
+
+    def test_parse_batch_response_matches_parts_by_content_id(self):
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.headers['Content-Type'] = 'multipart/mixed; boundary=batch_foobarbaz'
+        resp._content = GOOGLE_REPLY
+
+        results = gmail_api._parse_batch_response(resp, 4)
+
+        self.assertEqual([code for code, _ in results], [200, 429, 502, 400])
+        self.assertEqual(results[0][1]['id'], '18c5f1aa')
+        self.assertEqual(results[1][1]['error']['message'], 'User-rate limit exceeded.')
+        self.assertIn('No response', results[2][1]['error']['message'])
+        # item2 is missing from the answer
+
+
+class SendBatchTests(GmailTestCase):
+    def test_each_part_gets_its_own_status(self):
+        self.google.part_statuses = {'b@example.com': [429], 'c@example.com': [400]}
+
+        results, retry_after = gmail_api.send_batch(messages('a', 'b', 'c'))
+
+        self.assertEqual(self.google.batches, [recipients('a', 'b', 'c')])
+        self.assertEqual([result['status'] for result in results], [200, 429, 400])
+        self.assertEqual(results[0]['id'], 'msg-a@example.com')
+        self.assertEqual(results[0]['error'], '')
+        self.assertEqual(results[1]['id'], '')
+        self.assertIn('Too Many Requests', results[1]['error'])
+        self.assertIn('Bad Request', results[2]['error'])
+        self.assertEqual(retry_after, 0)
+
+    def test_missing_part_is_a_502(self):
+        self.google.dropped = {'b@example.com'}
+
+        results, _ = gmail_api.send_batch(messages('a', 'b', 'c'))
+
+        self.assertEqual([result['status'] for result in results], [200, 502, 200])
+        self.assertIn('No response', results[1]['error'])
+
+    def test_whole_batch_429_applies_to_every_message(self):
+        self.google.batch_failures = [(429, 7)]
+
+        results, retry_after = gmail_api.send_batch(messages('a', 'b'))
+
+        self.assertEqual([result['status'] for result in results], [429, 429])
+        self.assertEqual(retry_after, 7)
+
+    @override_settings(GMAIL_BATCH_SIZE=2)
+    def test_more_than_a_batch_is_refused(self):
+        with self.assertRaises(ValueError):
+            gmail_api.send_batch(messages('a', 'b', 'c'))
+        self.assertEqual(self.google.batches, [])
+
+
+@override_settings(GMAIL_BATCH_BACKOFF=1, GMAIL_BATCH_MAX_BACKOFF=3)
+class SendBulkTests(GmailTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(gmail_api.time, 'sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(gmail_api, 'logger')
+        # keeps the "Batch throttled" warnings out of the test output
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pauses(self):
+        return [call.args[0] for call in self.sleep.call_args_list]
+
+    def test_splits_into_batches(self):
+        results = gmail_api.send_bulk(messages('a', 'b', 'c', 'd', 'e'), batch_size=2)
+
+        self.assertEqual([len(batch) for batch in self.google.batches], [2, 2, 1])
+        self.assertEqual([result['to'] for result in results], recipients('a', 'b', 'c', 'd', 'e'))
+        self.assertEqual(self.pauses(), [])
+
+    def test_only_retryable_statuses_are_sent_again(self):
+        self.google.part_statuses = {'a@example.com': [429, 503], 'b@example.com': [400]}
+
+        results = gmail_api.send_bulk(messages('a', 'b', 'c'))
+
+        self.assertEqual(self.google.batches, [recipients('a', 'b', 'c'), recipients('a'), recipients('a')])
+        self.assertEqual([result['status'] for result in results], [200, 400, 200])
+
+    def test_gives_up_after_max_attempts(self):
+        self.google.part_statuses = {'a@example.com': [429] * 10}
+
+        results = gmail_api.send_bulk(messages('a', 'b'), max_attempts=3)
+
+        self.assertEqual(self.google.batches, [recipients('a', 'b'), recipients('a'), recipients('a')])
+        self.assertEqual([result['status'] for result in results], [429, 200])
+
+    def test_backoff_doubles_when_throttled_and_halves_when_clean(self):
+        self.google.part_statuses = {to: [429] for to in recipients('a', 'b', 'c')}
+
+        results = gmail_api.send_bulk(messages('a', 'b', 'c', 'd', 'e', 'f'), batch_size=1)
+
+        self.assertEqual(self.pauses(), [1, 2, 3, 1.5])
+        # doubled to the 3s cap over three throttled batches, halved after a clean one, then
+        # dropped once it fell below GMAIL_BATCH_BACKOFF — the retries go out without a pause
+        self.assertEqual(len(self.google.batches), 9)
+        self.assertEqual({result['status'] for result in results}, {200})
+
+    def test_whole_batch_retry_after_sets_the_pause(self):
+        self.google.batch_failures = [(429, 10)]
+
+        results = gmail_api.send_bulk(messages('a', 'b'), batch_size=1)
+
+        self.assertEqual(self.pauses(), [10, 5])
+        # Retry-After beats the 3s cap; b's clean batch halves it before the retry of a
+        self.assertEqual(self.google.batches, [recipients('a'), recipients('b'), recipients('a')])
+        self.assertEqual([result['status'] for result in results], [200, 200])
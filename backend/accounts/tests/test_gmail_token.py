@@ -0,0 +1,100 @@
+import threading
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+
+from accounts import gmail_api
+
+from .fake_google import BATCH_PATH, SEND_PATH, TOKEN_PATH, FakeGoogle
+
+
+class GmailTestCase(SimpleTestCase):
+    """Points gmail_api at a FakeGoogle and starts every test with no cached token or session."""
+
+    def setUp(self):
+        self.google = FakeGoogle().start()
+        self.addCleanup(self.google.stop)
+        for name, value in [
+            ('TOKEN_URL', self.google.url + TOKEN_PATH),
+            ('SEND_URL', self.google.url + SEND_PATH),
+            ('BATCH_URL', self.google.url + BATCH_PATH),
+        ]:
+            patcher = mock.patch.object(gmail_api, name, value)
+            # the module reads the GMAIL_*_URL settings once, at import
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.reset_client()
+        self.addCleanup(self.reset_client)
+
+    def reset_client(self):
+        if gmail_api._session is not None:
+            gmail_api._session.close()
+        gmail_api._token = None
+        gmail_api._session = None
+
+    def send(self, to='student@example.com'):
+        return gmail_api.send_email(to, 'Subject', 'Body')
+
+
+class AccessTokenTests(GmailTestCase):
+    def test_token_is_reused_until_the_refresh_margin(self):
+        self.google.expires_in = gmail_api.TOKEN_REFRESH_MARGIN + 60
+        for _ in range(3):
+            self.send()
+        self.assertEqual(self.google.token_requests, 1)
+        self.assertEqual(len({token for token, _ in self.google.sends}), 1)
+
+    def test_token_inside_the_refresh_margin_is_replaced(self):
+        self.google.expires_in = gmail_api.TOKEN_REFRESH_MARGIN
+        # already "about to expire" the moment it arrives
+        for _ in range(3):
+            self.send()
+        self.assertEqual(self.google.token_requests, 3)
+
+    def test_concurrent_threads_share_one_refresh(self):
+        self.google.token_delay = 0.2
+        start = threading.Barrier(10)
+        tokens = []
+
+        def get_token():
+            start.wait()
+            tokens.append(gmail_api._get_access_token())
+
+        threads = [threading.Thread(target=get_token) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.google.token_requests, 1)
+        self.assertEqual(len(tokens), 10)
+        self.assertEqual(len(set(tokens)), 1)
+
+    def test_401_clears_the_token_and_retries_once(self):
+        self.send()
+        first_token = gmail_api._token[0]
+        self.google.revoke_tokens()
+
+        self.assertTrue(self.send()['id'])
+        self.assertEqual(self.google.token_requests, 2)
+        self.assertEqual([token for token, _ in self.google.sends[1:]], [first_token, gmail_api._token[0]])
+        self.assertNotEqual(gmail_api._token[0], first_token)
+
+    def test_second_401_is_not_retried(self):
+        self.google.reject_all = True
+        with self.assertRaises(requests.HTTPError):
+            self.send()
+        self.assertEqual(len(self.google.sends), 2)
+        self.assertEqual(self.google.token_requests, 2)
+
+
+class SessionTests(GmailTestCase):
+    def test_one_session_and_connection_for_every_request(self):
+        session = gmail_api._get_session()
+        for _ in range(5):
+            self.send()
+        self.assertIs(gmail_api._get_session(), session)
+        self.assertEqual(self.google.token_requests, 1)
+        self.assertEqual(len(self.google.connections), 1)
+        # the token request and all five sends went over one kept-alive connection
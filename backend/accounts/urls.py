@@ -26,7 +26,7 @@ urlpatterns = [
 
     # --- Room Management ---
     path('rooms/', views.room_list_create, name='room_list_create'),
-    # GET /api/rooms/ — list all rooms (with search/filter support)
+    # GET /api/rooms/ — list active rooms, filtered and sorted by query params (see accounts/filters.py)
     # POST /api/rooms/ — create a new room listing
 
     path('rooms/<int:room_id>/', views.room_detail, name='room_detail'),
@@ -51,6 +51,18 @@ urlpatterns = [
     path('messages/<int:message_id>/read/', views.mark_message_read, name='mark_message_read'),
     # POST /api/messages/7/read/ — mark message 7 as read
 
+    path('messages/read/', views.mark_messages_read, name='mark_messages_read'),
+    # POST /api/messages/read/ — mark a list of messages, or a whole conversation, as read in one go
+
+    path('messages/unread-count/', views.unread_count, name='unread_count'),
+    # GET /api/messages/unread-count/ — total unread messages, for the inbox badge
+
+    path('messages/changes/', views.message_changes, name='message_changes'),
+    # GET /api/messages/changes/?since=... — only messages created or read since the cursor (?wait=N to long-poll)
+
+    path('events/', views.live_events, name='live_events'),
+    # GET /api/events/ — Server-Sent Events stream of new/read messages (ASGI server only)
+
     path('conversations/', views.get_conversations, name='get_conversations'),
     # GET /api/conversations/ — get a list of unique conversations (grouped by the other person)
 
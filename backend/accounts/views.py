@@ -9,6 +9,9 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 # Response is DRF's version of HttpResponse — automatically converts dicts to JSON
 
+from .renderers import FastJSONRenderer
+# the async views below are not @api_view views, so they pick the API's JSON renderer themselves
+
 from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
 # @csrf_exempt disables CSRF protection on a view
 # we use this because our API uses session auth from a separate frontend (not Django templates)
@@ -22,15 +25,60 @@ from django.utils import timezone
 from django.conf import settings as django_settings
 # gives access to everything in settings.py — aliased to avoid name clash with local variables
 
-from .models import Student, Room, Message, Favorite, Report, PasswordResetToken
+from django.db import transaction
+# transaction.atomic() makes several writes succeed or fail together
+
+from django.core.exceptions import ValidationError
+# raised when a password reset token is not a well-formed UUID
+
+from .models import Student, Room, Message, Conversation, Favorite, Report, PasswordResetToken
 # import all our database models
 
-from .gmail_api import send_email as gmail_send
-# our custom Gmail REST API email sender — aliased as gmail_send for clarity
+from . import outbox
+# outgoing emails are queued here and sent by the run_email_worker command
+
+from .filters import RoomFilterError, filter_rooms, room_ordering
+# query-string filtering and sorting for GET /api/rooms/
+
+from .pagination import PaginationError, after_cursor, cursor_for, decode_cursor, encode_cursor, get_page_size, paginate, rows_after
+# keyset (cursor) pagination — every list endpoint returns one page plus next/prev cursors
+
+from .conditional import add_validators, not_modified, room_list_validators, room_validators
+# ETag / Last-Modified — unchanged room data is answered with an empty 304
+
+from . import hashing
+# PBKDF2 for signup, login and password reset runs in a bounded pool, off the request threads
+
+from . import presence
+# heartbeats for "who is online" — kept in the cache, written to the database in bulk
+
+from . import ratelimit
+# token buckets per IP and per email for login and password reset
 
-from .serializers import StudentSignupSerializer, StudentLoginSerializer, StudentSerializer, RoomSerializer, RoomCreateSerializer, MessageSerializer, MessageCreateSerializer
+from .realtime import get_broker, notify_students, student_channel
+# pushes "new message" / "messages read" events to the students' open tabs
+
+from .room_cache import serialize_room, serialize_rooms
+# cached RoomSerializer output — rooms are read far more often than they are edited
+
+from .serializers import StudentSignupSerializer, StudentLoginSerializer, StudentSerializer, RoomSerializer, RoomCardSerializer, RoomCreateSerializer, MessageSerializer, MessageCreateSerializer
 # serializers validate incoming data and convert model instances to JSON
 
+import asyncio
+import json
+# asyncio and json are used by the live-updates stream at the bottom of this file
+
+from datetime import timedelta
+from django.utils.dateparse import parse_datetime
+# the changes feed re-reads a short window behind its cursor
+
+from asgiref.sync import sync_to_async
+# runs blocking code (like loading the session) from an async view
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+# the live-updates stream is Django's own streaming response — its error answers use _api_response
+
 import logging
 logger = logging.getLogger(__name__)
 # creates a logger named after this file ('accounts.views')
@@ -41,54 +89,110 @@ logger = logging.getLogger(__name__)
 # AUTHENTICATION VIEWS
 # ============================================================
 
-@api_view(['POST'])
-# this view only accepts POST requests — GET will return 405 Method Not Allowed
-@csrf_exempt
-def signup(request):
-    """Handle student signup — creates a new account and logs them in"""
-    serializer = StudentSignupSerializer(data=request.data)
-    # request.data contains the JSON body sent by the frontend
-    # the serializer validates every field (name length, email uniqueness, password match, etc.)
+def _json_body(request):
+    """The request's JSON object body as a dict, or None when it isn't one.
+    The async views below are plain Django views, so there is no DRF request.data."""
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
 
-    if serializer.is_valid():
-        student = serializer.save()
-        # calls StudentSignupSerializer.create() which hashes the password and saves to DB
 
-        # Set session — this is how we track who is logged in
-        request.session['student_id'] = student.id
-        request.session['student_email'] = student.email
-        # Django stores this in the database (django_session table) and sends a session cookie to the browser
+def _api_response(data, status=status.HTTP_200_OK, headers=None):
+    """A DRF Response for the async views below, rendered the same way as every other
+    endpoint's. @api_view would pick the renderer; a plain Django view has to set it —
+    Django renders the response on its way out."""
+    response = Response(data, status=status, headers=headers)
+    response.accepted_renderer = FastJSONRenderer()
+    response.accepted_media_type = FastJSONRenderer.media_type
+    response.renderer_context = {}
+    return response
 
-        student.is_online = True
-        student.last_login = timezone.now()
-        student.last_activity = timezone.now()
-        student.save(update_fields=['is_online', 'last_login', 'last_activity'])
-        # mark this student as online immediately after signup
 
-        return Response({
-            'message': 'Account created successfully!',
-            'student': StudentSerializer(student).data
-            # .data converts the Student instance to a dict like {id: 1, name: "...", email: "..."}
-        }, status=status.HTTP_201_CREATED)
-        # 201 means "Created" — the standard response when a new resource is made
+def _hashing_busy():
+    return _api_response({
+        'message': 'The server is busy — please try again in a moment.'
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+    # the password-hashing pool is full (see hashing.py) — better a quick retry than a
+    # burst of logins holding every server thread
 
-    return Response({
-        'message': 'Validation failed',
-        'errors': serializer.errors
-        # errors looks like {"email": ["An account with this email already exists."]}
-    }, status=status.HTTP_400_BAD_REQUEST)
-    # 400 means the client sent bad data
 
+def _too_many_attempts(retry_after):
+    return _api_response({
+        'message': 'Too many attempts — please wait a moment and try again.'
+    }, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': ratelimit.retry_after_header(retry_after)})
+    # see ratelimit.py — answered before any hashing, email or database work
 
-@api_view(['POST'])
-@csrf_exempt
-def login(request):
+
+def _start_session(request, student):
+    """Log the student in on this request's session and mark them online."""
+    request.session['student_id'] = student.id
+    request.session['student_email'] = student.email
+    # Django stores this in the session store (settings.SESSION_STORE) and sends a session cookie to the browser
+
+    student.is_online = True
+    student.last_login = timezone.now()
+    student.last_activity = student.last_login
+    student.save(update_fields=['is_online', 'last_login', 'last_activity'])
+    presence.heartbeat(student.id, student.last_activity)
+    # one write per login is fine — it's the per-page-load heartbeat that stays in the cache
+    return StudentSerializer(student).data
+    # .data converts the Student instance to a dict like {id: 1, name: "...", email: "..."}
+
+
+# signup, login and reset_password are async views: the PBKDF2 hash runs in the bounded
+# pool from hashing.py, and the database work, serializer validation and rate-limit check
+# run through sync_to_async; they answer with the same DRF Response JSON as the other views
+# (no @csrf_exempt — on Django 4.x it would wrap them in a sync function; CSRF middleware is off anyway)
+
+async def signup(request):
+    """Handle student signup — creates a new account and logs them in"""
+    if request.method != 'POST':
+        return _api_response({
+            'message': 'Method not allowed.'
+        }, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    serializer = StudentSignupSerializer(data=_json_body(request) or {})
+    # the serializer validates every field (name length, email uniqueness, password match, etc.)
+
+    if not await sync_to_async(serializer.is_valid)():
+        return _api_response({
+            'message': 'Validation failed',
+            'errors': serializer.errors
+            # errors looks like {"email": ["An account with this email already exists."]}
+        }, status=status.HTTP_400_BAD_REQUEST)
+        # 400 means the client sent bad data
+
+    try:
+        password_hash = await hashing.amake_password(serializer.validated_data['password'])
+    except hashing.PasswordHashingBusy:
+        return _hashing_busy()
+
+    def create_account():
+        student = serializer.save(password_hash=password_hash)
+        # calls StudentSignupSerializer.create() which saves the new row to the DB
+        return _start_session(request, student)
+
+    return _api_response({
+        'message': 'Account created successfully!',
+        'student': await sync_to_async(create_account)()
+    }, status=status.HTTP_201_CREATED)
+    # 201 means "Created" — the standard response when a new resource is made
+
+
+async def login(request):
     """Handle student login — validates credentials and starts a session"""
-    serializer = StudentLoginSerializer(data=request.data)
+    if request.method != 'POST':
+        return _api_response({
+            'message': 'Method not allowed.'
+        }, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    serializer = StudentLoginSerializer(data=_json_body(request) or {})
     # just checks that email and password are present and in the right format
 
-    if not serializer.is_valid():
-        return Response({
+    if not await sync_to_async(serializer.is_valid)():
+        return _api_response({
             'message': 'Invalid input',
             'errors': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
@@ -96,33 +200,34 @@ def login(request):
     email = serializer.validated_data['email'].lower()
     password = serializer.validated_data['password']
 
-    try:
-        student = Student.objects.get(email=email)
-        # look up the student by email — raises DoesNotExist if no match
-    except Student.DoesNotExist:
-        return Response({
+    retry_after = await sync_to_async(ratelimit.check)('login', ip=ratelimit.client_ip(request), email=email)
+    # in a worker thread like the rest of the blocking work — the buckets live in the cache
+    if retry_after:
+        return _too_many_attempts(retry_after)
+
+    student = await Student.objects.filter(email=email).afirst()
+    # look up the student by email — None if no match
+    if student is None:
+        return _api_response({
             'message': 'No account found with this email.'
         }, status=status.HTTP_404_NOT_FOUND)
 
-    if not student.check_password(password):
+    try:
+        password_ok = await student.acheck_password(password)
         # hash the submitted password and compare it to the stored hash
-        return Response({
+    except hashing.PasswordHashingBusy:
+        return _hashing_busy()
+
+    if not password_ok:
+        return _api_response({
             'message': 'Incorrect password.'
         }, status=status.HTTP_401_UNAUTHORIZED)
         # 401 means "Unauthorized" — wrong credentials
 
     # credentials are correct — set session and mark online
-    request.session['student_id'] = student.id
-    request.session['student_email'] = student.email
-
-    student.is_online = True
-    student.last_login = timezone.now()
-    student.last_activity = timezone.now()
-    student.save(update_fields=['is_online', 'last_login', 'last_activity'])
-
-    return Response({
+    return _api_response({
         'message': 'Login successful!',
-        'student': StudentSerializer(student).data
+        'student': await sync_to_async(_start_session)(request, student)
     }, status=status.HTTP_200_OK)
 
 
@@ -130,19 +235,14 @@ def login(request):
 @csrf_exempt
 def logout(request):
     """Handle student logout — marks them offline and destroys the session"""
-    student_id = request.session.get('student_id')
-    # get the student ID from the session — returns None if not logged in
+    student = request.student
+    # the logged-in student — None if not logged in (or if the student was deleted)
 
     # Mark user as offline
-    if student_id:
-        try:
-            student = Student.objects.get(id=student_id)
-            student.is_online = False
-            student.save(update_fields=['is_online'])
-        except Student.DoesNotExist:
-            pass
-            # if the student was deleted, just ignore it
-    
+    if student:
+        student.mark_offline()
+        # drops the cached heartbeat and clears is_online
+
     request.session.flush()
     # flush() deletes the session from the database and clears the cookie
     # the browser will no longer be recognized as logged in
@@ -156,74 +256,97 @@ def logout(request):
 @csrf_exempt
 def check_session(request):
     """Check if the user is still logged in — called by the frontend on every page load"""
-    student_id = request.session.get('student_id')
-    # try to get the student ID from the session cookie
+    student = request.student
+    # resolved from the session cookie by StudentMiddleware — usually straight from its cache
 
-    if not student_id:
-        # no session = not logged in
+    if not student:
+        if request.session.get('student_id'):
+            request.session.flush()
+            # the student was deleted from the database but the session still exists
         return Response({
             'authenticated': False
         }, status=status.HTTP_200_OK)
 
-    try:
-        student = Student.objects.get(id=student_id)
-
-        # Update their activity timestamp — so the "online users" feature stays accurate
-        student.last_activity = timezone.now()
-        if not student.is_online:
-            student.is_online = True
-        student.save(update_fields=['last_activity', 'is_online'])
+    presence.heartbeat(student.id)
+    # record their activity so the "online users" feature stays accurate — in the cache,
+    # not the students table (presence.py copies it over in bulk every minute)
 
-        return Response({
-            'authenticated': True,
-            'student': StudentSerializer(student).data
-        }, status=status.HTTP_200_OK)
-    except Student.DoesNotExist:
-        # the student was deleted from the database but the session still exists
-        request.session.flush()
-        return Response({
-            'authenticated': False
-        }, status=status.HTTP_200_OK)
+    return Response({
+        'authenticated': True,
+        'student': StudentSerializer(student).data
+    }, status=status.HTTP_200_OK)
 
 
 # ============================================================
 # ROOM MANAGEMENT VIEWS
 # ============================================================
 
+ROOM_VIEWS = ['full', 'card']
+# ?view=card returns the compact RoomCardSerializer shape — the default is the full room
+
+
 @api_view(['GET', 'POST'])
 @csrf_exempt
 def room_list_create(request):
-    """GET: list all active rooms | POST: create a new room listing"""
+    """GET: list active rooms (filtered and sorted by the query string) | POST: create a new room listing"""
 
     if request.method == 'GET':
-        # return all active room listings
-        rooms = Room.objects.filter(is_active=True)
+        # return the active room listings that match the search filters
+        view = request.GET.get('view', 'full')
+        if view not in ROOM_VIEWS:
+            return Response({
+                'message': f'Invalid view. Must be one of: {", ".join(ROOM_VIEWS)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        rooms = Room.objects.filter(is_active=True).select_related('owner')
         # filter(is_active=True) excludes rooms that were "deleted" (soft delete)
+        # select_related('owner') joins the students table so owner_name/owner_email
+        # do not cost one extra query per room
 
-        serializer = RoomSerializer(rooms, many=True, context={'request': request})
-        # many=True tells DRF to serialize a queryset (list) instead of a single object
-        # context={'request': request} is needed so the serializer can build absolute image URLs
+        try:
+            rooms = filter_rooms(rooms, request.GET)
+            # e.g. ?max_price=700&room_type=single,double&amenities=wifi,parking&sort=price_asc
+            if view == 'card':
+                rooms = rooms.only(*RoomCardSerializer.COLUMNS).prefetch_related(RoomCardSerializer.cover_prefetch())
+                # SELECT just the columns a card needs (plus the owner's name through the join),
+                # and then only the cover photo of each room on the page in one more query
+            rooms, page_info = paginate(rooms, request.GET, room_ordering(request.GET))
+            # one page of rooms in the requested order, plus cursors for the next/previous page
+        except (RoomFilterError, PaginationError) as e:
+            return Response({
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({
-            'rooms': serializer.data,
-            'count': rooms.count()
+        etag, last_modified = room_list_validators(rooms, page_info, request)
+        # worked out from the rows just fetched — no extra query
+        unchanged = not_modified(request, etag, last_modified)
+        if unchanged:
+            return unchanged
+            # 304 — the browser already has this exact page, nothing is serialized or sent
+
+        if view == 'card':
+            data = RoomCardSerializer(rooms, many=True, context={'request': request}).data
+        else:
+            data = serialize_rooms(rooms, request)
+            # full rooms come from the payload cache — only rooms edited since they were
+            # last shown go through RoomSerializer again
+
+        response = Response({
+            'rooms': data,
+            'count': len(rooms),
+            # number of rooms in this page — ask for ?include_total=true to get the overall total
+            **page_info
         }, status=status.HTTP_200_OK)
+        return add_validators(response, etag, last_modified)
 
     elif request.method == 'POST':
         # create a new room listing — requires login
-        student_id = request.session.get('student_id')
-        if not student_id:
+        student = request.student
+        if not student:
             return Response({
                 'message': 'You must be logged in to post a room.'
             }, status=status.HTTP_401_UNAUTHORIZED)
 
-        try:
-            student = Student.objects.get(id=student_id)
-        except Student.DoesNotExist:
-            return Response({
-                'message': 'Invalid session. Please log in again.'
-            }, status=status.HTTP_401_UNAUTHORIZED)
-
         # validate the room data
         serializer = RoomCreateSerializer(data=request.data)
         if serializer.is_valid():
@@ -246,8 +369,8 @@ def room_detail(request, room_id):
     """GET: view a room | PUT: update it (owner only) | DELETE: soft-delete it (owner only)"""
 
     try:
-        room = Room.objects.get(id=room_id)
-        # look up the room by its primary key
+        room = Room.objects.select_related('owner').get(id=room_id)
+        # look up the room by its primary key (the owner is joined in for owner_name/owner_email)
     except Room.DoesNotExist:
         return Response({
             'message': 'Room not found.'
@@ -255,13 +378,18 @@ def room_detail(request, room_id):
 
     if request.method == 'GET':
         # anyone can view a room
-        serializer = RoomSerializer(room, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        etag, last_modified = room_validators(room, request)
+        unchanged = not_modified(request, etag, last_modified)
+        if unchanged:
+            return unchanged
+            # 304 — the room has not changed since the browser last fetched it
+        response = Response(serialize_room(room, request), status=status.HTTP_200_OK)
+        return add_validators(response, etag, last_modified)
 
     elif request.method in ['PUT', 'DELETE']:
         # only the owner can update or delete their room
-        student_id = request.session.get('student_id')
-        if not student_id or room.owner.id != student_id:
+        student = request.student
+        if not student or room.owner_id != student.id:
             return Response({
                 'message': 'You do not have permission to modify this room.'
             }, status=status.HTTP_403_FORBIDDEN)
@@ -295,20 +423,40 @@ def room_detail(request, room_id):
 @csrf_exempt
 def my_rooms(request):
     """Get all rooms posted by the currently logged-in student"""
-    student_id = request.session.get('student_id')
-
-    if not student_id:
+    student = request.student
+    # the logged-in student, looked up once per request by StudentMiddleware (None if logged out)
+    if not student:
         return Response({
             'message': 'You must be logged in.'
         }, status=status.HTTP_401_UNAUTHORIZED)
 
-    rooms = Room.objects.filter(owner_id=student_id, is_active=True)
-    # filter by both owner and active status
-    serializer = RoomSerializer(rooms, many=True, context={'request': request})
+    view = request.GET.get('view', 'full')
+    if view not in ROOM_VIEWS:
+        return Response({
+            'message': f'Invalid view. Must be one of: {", ".join(ROOM_VIEWS)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    rooms = Room.objects.filter(owner_id=student.id, is_active=True).select_related('owner')
+    # filter by both owner and active status — the owner is joined in for owner_name/owner_email
+    if view == 'card':
+        rooms = rooms.only(*RoomCardSerializer.COLUMNS).prefetch_related(RoomCardSerializer.cover_prefetch())
+
+    try:
+        rooms, page_info = paginate(rooms, request.GET)
+    except PaginationError as e:
+        return Response({
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if view == 'card':
+        data = RoomCardSerializer(rooms, many=True, context={'request': request}).data
+    else:
+        data = serialize_rooms(rooms, request)
 
     return Response({
-        'rooms': serializer.data,
-        'count': rooms.count()
+        'rooms': data,
+        'count': len(rooms),
+        **page_info
     }, status=status.HTTP_200_OK)
 
 
@@ -316,23 +464,19 @@ def my_rooms(request):
 @csrf_exempt
 def online_users(request):
     """Get all students who have been active in the last 10 minutes"""
-    from datetime import timedelta
-    # timedelta lets us do time math — "10 minutes ago"
+    last_seen = presence.online_students(within_seconds=10 * 60)
+    # {student id: last heartbeat} straight from the presence cache — up to date to the second
 
-    cutoff_time = timezone.now() - timedelta(minutes=10)
-    # any activity before this time means the student is considered offline
-
-    online_students = Student.objects.filter(
-        is_online=True,
-        last_activity__gte=cutoff_time
-        # __gte means "greater than or equal" — only students active since the cutoff
-    ).values('id', 'name', 'email', 'last_activity', 'last_login')
+    online_students = list(Student.objects.filter(id__in=last_seen).values('id', 'name', 'email', 'last_login'))
     # .values() returns dicts instead of model instances — lighter and faster
+    for row in online_students:
+        row['last_activity'] = last_seen[row['id']]
+    online_students.sort(key=lambda row: row['last_activity'], reverse=True)
+    # most recently active first
 
     return Response({
-        'online_users': list(online_students),
-        # list() converts the QuerySet to a plain list for JSON serialization
-        'count': online_students.count()
+        'online_users': online_students,
+        'count': len(online_students)
     }, status=status.HTTP_200_OK)
 
 
@@ -345,19 +489,12 @@ def online_users(request):
 def send_message(request):
     """Send a message — either to a room owner (new inquiry) or as a reply to an existing conversation"""
     # check login
-    student_id = request.session.get('student_id')
-    if not student_id:
+    sender = request.student
+    if not sender:
         return Response({
             'message': 'You must be logged in to send a message.'
         }, status=status.HTTP_401_UNAUTHORIZED)
 
-    try:
-        sender = Student.objects.get(id=student_id)
-    except Student.DoesNotExist:
-        return Response({
-            'message': 'Invalid session. Please log in again.'
-        }, status=status.HTTP_401_UNAUTHORIZED)
-
     serializer = MessageCreateSerializer(data=request.data)
 
     if not serializer.is_valid():
@@ -406,13 +543,25 @@ def send_message(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
     # create the message in the database
-    message = Message.objects.create(
-        sender=sender,
-        recipient=recipient,
-        room=room,
-        subject=serializer.validated_data['subject'],
-        content=serializer.validated_data['content']
-    )
+    with transaction.atomic():
+        message = Message.objects.create(
+            sender=sender,
+            recipient=recipient,
+            room=room,
+            subject=serializer.validated_data['subject'],
+            content=serializer.validated_data['content']
+        )
+        Conversation.record_message(message)
+        # update the chat list preview and the recipient's unread counter in the same
+        # transaction, so the counter can never disagree with the messages table
+        notify_students([recipient.id, sender.id], {
+            'type': 'message',
+            'message_id': message.id,
+            'sender_id': sender.id,
+            'recipient_id': recipient.id,
+            'room_id': room.id if room else None,
+        })
+        # the recipient's tabs show the new message, the sender's other tabs update their chat list
 
     return Response({
         'message': 'Message sent successfully!',
@@ -424,29 +573,32 @@ def send_message(request):
 @csrf_exempt
 def get_messages(request):
     """Get all messages received by the logged-in student (inbox)"""
-    student_id = request.session.get('student_id')
-    if not student_id:
+    student = request.student
+    if not student:
         return Response({
             'message': 'You must be logged in.'
         }, status=status.HTTP_401_UNAUTHORIZED)
 
-    try:
-        student = Student.objects.get(id=student_id)
-    except Student.DoesNotExist:
-        return Response({
-            'message': 'Invalid session.'
-        }, status=status.HTTP_401_UNAUTHORIZED)
-
     # get all messages where this student is the recipient
-    messages = Message.objects.filter(recipient=student).select_related('sender', 'room')
+    messages = Message.objects.filter(recipient=student).select_related('sender', 'recipient', 'room')
     # select_related does a SQL JOIN — fetches sender and room data in the same query
     # without it, each message would cause a separate query to get sender.name etc.
 
+    unread_count = Conversation.objects.unread_total(student.id)
+    # how many are still unread — read from the conversation counters instead of counting messages
+
+    try:
+        page, page_info = paginate(messages, request.GET)
+    except PaginationError as e:
+        return Response({
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
     return Response({
-        'messages': MessageSerializer(messages, many=True).data,
-        'count': messages.count(),
-        'unread_count': messages.filter(is_read=False).count()
-        # count how many are still unread — used for notification badges
+        'messages': MessageSerializer(page, many=True).data,
+        'count': len(page),
+        'unread_count': unread_count,
+        **page_info
     }, status=status.HTTP_200_OK)
 
 
@@ -454,25 +606,26 @@ def get_messages(request):
 @csrf_exempt
 def get_sent_messages(request):
     """Get all messages sent by the logged-in student (outbox)"""
-    student_id = request.session.get('student_id')
-    if not student_id:
+    student = request.student
+    if not student:
         return Response({
             'message': 'You must be logged in.'
         }, status=status.HTTP_401_UNAUTHORIZED)
 
+    # get all messages where this student is the sender
+    messages = Message.objects.filter(sender=student).select_related('sender', 'recipient', 'room')
+
     try:
-        student = Student.objects.get(id=student_id)
-    except Student.DoesNotExist:
+        page, page_info = paginate(messages, request.GET)
+    except PaginationError as e:
         return Response({
-            'message': 'Invalid session.'
-        }, status=status.HTTP_401_UNAUTHORIZED)
-
-    # get all messages where this student is the sender
-    messages = Message.objects.filter(sender=student).select_related('recipient', 'room')
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
 
     return Response({
-        'messages': MessageSerializer(messages, many=True).data,
-        'count': messages.count()
+        'messages': MessageSerializer(page, many=True).data,
+        'count': len(page),
+        **page_info
     }, status=status.HTTP_200_OK)
 
 
@@ -480,17 +633,23 @@ def get_sent_messages(request):
 @csrf_exempt
 def mark_message_read(request, message_id):
     """Mark a specific message as read — only the recipient can do this"""
-    student_id = request.session.get('student_id')
-    if not student_id:
+    student = request.student
+    if not student:
         return Response({
             'message': 'You must be logged in.'
         }, status=status.HTTP_401_UNAUTHORIZED)
 
     try:
-        message = Message.objects.get(id=message_id, recipient_id=student_id)
+        message = Message.objects.get(id=message_id, recipient_id=student.id)
         # only find the message if the logged-in student is the recipient
-        message.mark_as_read()
-        # calls the model method that sets is_read=True and read_at=now
+        if message.mark_as_read():
+            # calls the model method that sets is_read=True and read_at=now
+            notify_students([message.sender_id, message.recipient_id], {
+                'type': 'read',
+                'reader_id': message.recipient_id,
+                'other_user_id': message.sender_id,
+                'room_id': message.room_id,
+            })
 
         return Response({
             'message': 'Message marked as read',
@@ -502,78 +661,124 @@ def mark_message_read(request, message_id):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
-@api_view(['GET'])
-@csrf_exempt
-def get_conversations(request):
-    """Get all conversations grouped by (other_user, room) — like WhatsApp's chat list"""
-    from django.db.models import Q, Max, Count
-    # Q objects allow complex OR queries — Q(a=1) | Q(b=2) means "a=1 OR b=2"
+MAX_READ_IDS = 500
+# most message ids one /api/messages/read/ request may list
 
-    student_id = request.session.get('student_id')
-    if not student_id:
+
+@api_view(['POST'])
+@csrf_exempt
+def mark_messages_read(request):
+    """Mark many messages as read at once — only the logged-in student's own received messages.
+
+    Send either {"message_ids": [1, 2, 3]} or a whole conversation,
+    {"other_user_id": 3, "room_id": 5} (room_id null for messages not about a room).
+    Returns the ids that were actually unread, plus the new inbox total.
+    """
+    student = request.student
+    if not student:
         return Response({
             'message': 'You must be logged in.'
         }, status=status.HTTP_401_UNAUTHORIZED)
 
-    try:
-        student = Student.objects.get(id=student_id)
-    except Student.DoesNotExist:
+    message_ids = request.data.get('message_ids')
+    other_user_id = request.data.get('other_user_id')
+
+    if message_ids is not None:
+        if (
+            not isinstance(message_ids, list)
+            or not all(isinstance(message_id, int) and not isinstance(message_id, bool) for message_id in message_ids)
+        ):
+            return Response({
+                'message': 'message_ids must be a list of message ids.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(message_ids) > MAX_READ_IDS:
+            return Response({
+                'message': f'At most {MAX_READ_IDS} message ids can be marked at once.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        messages = Message.objects.filter(id__in=message_ids)
+    elif other_user_id is not None:
+        room_id = request.data.get('room_id')
+        if room_id in ('', 'null'):
+            room_id = None
+        try:
+            messages = Message.objects.filter(
+                sender_id=int(other_user_id),
+                room_id=int(room_id) if room_id is not None else None,
+            )
+            # the whole thread the other student sent me about this room
+        except (TypeError, ValueError):
+            return Response({
+                'message': 'other_user_id and room_id must be ids.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        return Response({
+            'message': 'Send message_ids or other_user_id (and room_id).'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    changed = messages.mark_read(student.id)
+    # one locked SELECT + one UPDATE for the messages, and the conversation counters in the
+    # same transaction — instead of a load and a save per message
+
+    for sender_id, room_id in {(sender_id, room_id) for _, sender_id, room_id in changed}:
+        notify_students([sender_id, student.id], {
+            'type': 'read',
+            'reader_id': student.id,
+            'other_user_id': sender_id,
+            'room_id': room_id,
+        })
+        # one read receipt per conversation, same as when a thread is opened
+
+    read_ids = sorted(message_id for message_id, _, _ in changed)
+    return Response({
+        'message': f'{len(read_ids)} message(s) marked as read',
+        'read_ids': read_ids,
+        'count': len(read_ids),
+        'unread_count': Conversation.objects.unread_total(student.id),
+        # the new inbox badge number
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@csrf_exempt
+def get_conversations(request):
+    """Get all conversations grouped by (other_user, room) — like WhatsApp's chat list"""
+    student = request.student
+    if not student:
         return Response({
-            'message': 'Invalid session.'
+            'message': 'You must be logged in.'
         }, status=status.HTTP_401_UNAUTHORIZED)
 
-    # get every message where this student is either the sender or the recipient
-    all_messages = Message.objects.filter(
-        Q(sender=student) | Q(recipient=student)
-    ).select_related('sender', 'recipient', 'room').order_by('-created_at')
-    # ordered newest first so the first message we see for each conversation is the latest
-
-    # group messages into conversations — keyed by (other_user_id, room_id)
-    conversations = {}
-
-    for message in all_messages:
-        # figure out who the other person is in this message
-        other_user = message.recipient if message.sender.id == student_id else message.sender
-
-        # create a unique key for this conversation
-        room_id = message.room.id if message.room else None
-        conv_key = f"{other_user.id}_{room_id}"
-
-        if conv_key not in conversations:
-            # first time seeing this conversation — this message is the latest one
-            # count how many unread messages from the other user
-            unread_count = Message.objects.filter(
-                sender=other_user,
-                recipient=student,
-                room=message.room,
-                is_read=False
-            ).count()
-
-            conversations[conv_key] = {
-                'other_user': {
-                    'id': other_user.id,
-                    'name': other_user.name,
-                    'email': other_user.email
-                },
-                'room': {
-                    'id': message.room.id,
-                    'title': message.room.title
-                } if message.room else None,
-                'last_message': {
-                    'content': message.content,
-                    'created_at': message.created_at,
-                    'is_from_me': message.sender.id == student_id
-                    # helps the frontend show "You: ..." prefix
-                },
-                'unread_count': unread_count
-            }
-
-    # sort conversations by most recent message first
-    conversations_list = sorted(
-        conversations.values(),
-        key=lambda x: x['last_message']['created_at'],
-        reverse=True
-    )
+    # one query on the conversation summaries — the latest message and unread counters are
+    # kept up to date by send_message and the read views, so no message history is scanned
+    conversations = Conversation.objects.involving(student.id).filter(
+        last_message__isnull=False
+    ).select_related(
+        'student_a', 'student_b', 'room', 'last_message'
+    ).order_by('-last_message_at')
+    # ordered newest first, like a chat app
+
+    conversations_list = []
+    for conversation in conversations:
+        other_user = conversation.other_student(student.id)
+        message = conversation.last_message
+        conversations_list.append({
+            'other_user': {
+                'id': other_user.id,
+                'name': other_user.name,
+                'email': other_user.email
+            },
+            'room': {
+                'id': conversation.room.id,
+                'title': conversation.room.title
+            } if conversation.room else None,
+            'last_message': {
+                'content': message.content,
+                'created_at': message.created_at,
+                'is_from_me': message.sender_id == student.id
+                # helps the frontend show "You: ..." prefix
+            },
+            'unread_count': conversation.unread_for(student.id)
+        })
 
     return Response({
         'conversations': conversations_list,
@@ -581,14 +786,42 @@ def get_conversations(request):
     }, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@csrf_exempt
+def unread_count(request):
+    """Total unread messages for the logged-in student — for the inbox badge"""
+    student = request.student
+    if not student:
+        return Response({
+            'message': 'You must be logged in.'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+
+    return Response({
+        'unread_count': Conversation.objects.unread_total(student.id)
+        # one SUM over the student's conversation counters
+    }, status=status.HTTP_200_OK)
+
+
+THREAD_PAGE_SIZE = 50
+# messages per page of a chat thread — ?limit= can change it, up to pagination.MAX_PAGE_SIZE
+
+THREAD_ORDERING = ('-created_at', '-id')
+# threads are read newest first, then flipped to oldest-first for display
+
+
 @api_view(['GET'])
 @csrf_exempt
 def get_conversation_messages(request):
-    """Get all messages in a specific conversation thread between two students about a room"""
+    """Get the latest messages in a conversation thread between two students about a room.
+
+    Returns the newest THREAD_PAGE_SIZE messages (oldest first, for the chat window). If
+    there are older ones, `before` holds a message id — ask again with ?before=<that id>
+    to load the page of messages just before it when the student scrolls up.
+    """
     from django.db.models import Q
 
-    student_id = request.session.get('student_id')
-    if not student_id:
+    student = request.student
+    if not student:
         return Response({
             'message': 'You must be logged in.'
         }, status=status.HTTP_401_UNAUTHORIZED)
@@ -603,9 +836,8 @@ def get_conversation_messages(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        student = Student.objects.get(id=student_id)
         other_user = Student.objects.get(id=other_user_id)
-    except Student.DoesNotExist:
+    except (Student.DoesNotExist, ValueError):
         return Response({
             'message': 'User not found.'
         }, status=status.HTTP_404_NOT_FOUND)
@@ -628,21 +860,70 @@ def get_conversation_messages(request):
         query &= Q(room__isnull=True)
         # if no room specified, get messages that are not about any room
 
-    # get all messages in chronological order (oldest first for chat display)
-    messages = Message.objects.filter(query).select_related('sender', 'recipient', 'room').order_by('created_at')
+    try:
+        limit = get_page_size(request.GET, default=THREAD_PAGE_SIZE)
+    except PaginationError as e:
+        return Response({
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    before = request.GET.get('before', '').strip()
+    boundary = None
+    if before:
+        if before.isdigit():
+            boundary = Message.objects.filter(query, id=before).values_list('created_at', 'id').first()
+            # where the previous page stopped — it must be a message in this same thread
+        if boundary is None:
+            return Response({
+                'message': 'before must be the id of a message in this conversation.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = []
+    for sender, recipient in ((student, other_user), (other_user, student)):
+        direction = Message.objects.filter(query, sender=sender, recipient=recipient)
+        if boundary:
+            direction = rows_after(direction, boundary, THREAD_ORDERING)
+        rows += direction.select_related('sender', 'recipient', 'room').order_by(*THREAD_ORDERING)[:limit + 1]
+        # one query per direction, so each reads only the newest rows of its own
+        # (sender, recipient, room, created_at) index range instead of the whole thread
+    rows.sort(key=lambda message: (message.created_at, message.id), reverse=True)
+    has_more = len(rows) > limit
+    messages = rows[:limit][::-1]
+    # newest `limit` of the two directions combined, back in chronological order for display
 
     # automatically mark all unread messages from the other user as read
-    Message.objects.filter(
-        sender=other_user,
-        recipient=student,
-        room_id=room_id if room_id and room_id != 'null' else None,
-        is_read=False
-    ).update(is_read=True, read_at=timezone.now())
-    # bulk update — much faster than looping and calling .save() on each one
+    room_id = room.id if room_id and room_id != 'null' else None
+    # the looked-up room's integer id, not the raw query string
+    with transaction.atomic():
+        now = timezone.now()
+        marked = Message.objects.filter(
+            sender=other_user,
+            recipient=student,
+            room_id=room_id,
+            is_read=False
+        ).update(is_read=True, read_at=now, updated_at=now)
+        # bulk update — much faster than looping and calling .save() on each one
+        if marked:
+            notify_students([other_user.id, student.id], {
+                'type': 'read',
+                'reader_id': student.id,
+                'other_user_id': other_user.id,
+                'room_id': room_id,
+            })
+            # read receipts for the sender, badge update for my other tabs
+
+        student_a, student_b = Conversation.pair(student.id, other_user.id)
+        Conversation.objects.filter(
+            student_a_id=student_a, student_b_id=student_b, room_id=room_id
+        ).mark_read(student.id)
+        # everything from the other user in this thread is read now — reset my counter to 0
 
     return Response({
         'messages': MessageSerializer(messages, many=True).data,
-        'count': messages.count(),
+        'count': len(messages),
+        'has_more': has_more,
+        'before': messages[0].id if has_more else None,
+        # pass as ?before= to load the older messages
         'other_user': {
             'id': other_user.id,
             'name': other_user.name,
@@ -659,8 +940,8 @@ def get_conversation_messages(request):
 @csrf_exempt
 def add_favorite(request):
     """Save a room to the logged-in student's favorites list"""
-    student_id = request.session.get('student_id')
-    if not student_id:
+    student = request.student
+    if not student:
         return Response({
             'message': 'You must be logged in.'
         }, status=status.HTTP_401_UNAUTHORIZED)
@@ -672,12 +953,7 @@ def add_favorite(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        student = Student.objects.get(id=student_id)
         room = Room.objects.get(id=room_id, is_active=True)
-    except Student.DoesNotExist:
-        return Response({
-            'message': 'Invalid session.'
-        }, status=status.HTTP_401_UNAUTHORIZED)
     except Room.DoesNotExist:
         return Response({
             'message': 'Room not found.'
@@ -706,14 +982,13 @@ def add_favorite(request):
 @csrf_exempt
 def remove_favorite(request, room_id):
     """Remove a room from the student's favorites"""
-    student_id = request.session.get('student_id')
-    if not student_id:
+    student = request.student
+    if not student:
         return Response({
             'message': 'You must be logged in.'
         }, status=status.HTTP_401_UNAUTHORIZED)
 
     try:
-        student = Student.objects.get(id=student_id)
         favorite = Favorite.objects.get(student=student, room_id=room_id)
         favorite.delete()
         # actually remove the row from the favorites table
@@ -722,10 +997,6 @@ def remove_favorite(request, room_id):
             'message': 'Room removed from favorites.',
             'is_favorited': False
         }, status=status.HTTP_200_OK)
-    except Student.DoesNotExist:
-        return Response({
-            'message': 'Invalid session.'
-        }, status=status.HTTP_401_UNAUTHORIZED)
     except Favorite.DoesNotExist:
         return Response({
             'message': 'Room is not in favorites.',
@@ -737,29 +1008,33 @@ def remove_favorite(request, room_id):
 @csrf_exempt
 def get_favorites(request):
     """Get all rooms the logged-in student has saved as favorites"""
-    student_id = request.session.get('student_id')
-    if not student_id:
+    student = request.student
+    if not student:
         return Response({
             'message': 'You must be logged in.'
         }, status=status.HTTP_401_UNAUTHORIZED)
 
-    try:
-        student = Student.objects.get(id=student_id)
-    except Student.DoesNotExist:
-        return Response({
-            'message': 'Invalid session.'
-        }, status=status.HTTP_401_UNAUTHORIZED)
-
     # get all favorites for this student, with the room and owner data pre-loaded
-    favorites = Favorite.objects.filter(student=student).select_related('room', 'room__owner')
+    favorites = Favorite.objects.filter(
+        student=student, room__is_active=True
+        # filter out rooms that have been soft-deleted in SQL, so every page is full
+    ).select_related('room', 'room__owner')
     # select_related joins the room and room.owner tables to avoid N+1 queries
 
-    rooms = [fav.room for fav in favorites if fav.room.is_active]
-    # filter out rooms that have been soft-deleted
+    try:
+        favorites, page_info = paginate(favorites, request.GET)
+        # paged by when the room was saved, newest first
+    except PaginationError as e:
+        return Response({
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    rooms = [fav.room for fav in favorites]
 
     return Response({
-        'rooms': RoomSerializer(rooms, many=True, context={'request': request}).data,
-        'count': len(rooms)
+        'rooms': serialize_rooms(rooms, request),
+        'count': len(rooms),
+        **page_info
     }, status=status.HTTP_200_OK)
 
 
@@ -771,8 +1046,8 @@ def get_favorites(request):
 @csrf_exempt
 def create_report(request):
     """Submit a report about a room listing — flags it for admin review"""
-    student_id = request.session.get('student_id')
-    if not student_id:
+    student = request.student
+    if not student:
         return Response({
             'message': 'You must be logged in to report a room.'
         }, status=status.HTTP_401_UNAUTHORIZED)
@@ -808,12 +1083,7 @@ def create_report(request):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        student = Student.objects.get(id=student_id)
         room = Room.objects.get(id=room_id)
-    except Student.DoesNotExist:
-        return Response({
-            'message': 'Invalid session.'
-        }, status=status.HTTP_401_UNAUTHORIZED)
     except Room.DoesNotExist:
         return Response({
             'message': 'Room not found.'
@@ -838,21 +1108,22 @@ def create_report(request):
 @csrf_exempt
 def get_my_reports(request):
     """Get all reports submitted by the logged-in student — so they can track their status"""
-    student_id = request.session.get('student_id')
-    if not student_id:
+    student = request.student
+    if not student:
         return Response({
             'message': 'You must be logged in.'
         }, status=status.HTTP_401_UNAUTHORIZED)
 
+    reports = Report.objects.filter(reporter=student).select_related('room')
+    # get all reports by this student with room data pre-loaded
+
     try:
-        student = Student.objects.get(id=student_id)
-    except Student.DoesNotExist:
+        reports, page_info = paginate(reports, request.GET)
+        # newest first, one page at a time
+    except PaginationError as e:
         return Response({
-            'message': 'Invalid session.'
-        }, status=status.HTTP_401_UNAUTHORIZED)
-
-    reports = Report.objects.filter(reporter=student).select_related('room').order_by('-created_at')
-    # get all reports by this student, newest first, with room data pre-loaded
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
 
     # manually build the response data (we did not create a ReportSerializer)
     reports_data = []
@@ -877,15 +1148,19 @@ def get_my_reports(request):
             } if report.room else None
         })
 
-    return Response(reports_data, status=status.HTTP_200_OK)
+    return Response({
+        'reports': reports_data,
+        'count': len(reports_data),
+        **page_info
+    }, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
 @csrf_exempt
 def check_favorite(request, room_id):
     """Check if a specific room is in the logged-in student's favorites — used by the heart icon"""
-    student_id = request.session.get('student_id')
-    if not student_id:
+    student = request.student
+    if not student:
         return Response({
             'is_favorited': False
         }, status=status.HTTP_200_OK)
@@ -893,7 +1168,7 @@ def check_favorite(request, room_id):
 
     try:
         is_favorited = Favorite.objects.filter(
-            student_id=student_id,
+            student_id=student.id,
             room_id=room_id
         ).exists()
         # .exists() returns True/False and is faster than .count() > 0
@@ -914,7 +1189,7 @@ def check_favorite(request, room_id):
 @api_view(['POST'])
 @csrf_exempt
 def request_password_reset(request):
-    """Handle 'Forgot Password' — generates a token and emails a reset link to the student"""
+    """Handle 'Forgot Password' — generates a token and queues an email with the reset link"""
     email = request.data.get('email', '').strip().lower()
 
     if not email:
@@ -922,6 +1197,10 @@ def request_password_reset(request):
             'message': 'Please provide your email address.'
         }, status=status.HTTP_400_BAD_REQUEST)
 
+    retry_after = ratelimit.check('password-reset', ip=ratelimit.client_ip(request), email=email)
+    if retry_after:
+        return _too_many_attempts(retry_after)
+
     # always return the same success message whether the email exists or not
     # this prevents attackers from finding out which emails are registered (email enumeration)
     success_msg = 'If an account exists with that email, a reset link has been sent.'
@@ -932,90 +1211,277 @@ def request_password_reset(request):
         # email not found — but we still return success to avoid leaking information
         return Response({'message': success_msg}, status=status.HTTP_200_OK)
 
-    try:
-        # invalidate any old unused tokens for this student
-        PasswordResetToken.objects.filter(student=student, used=False).update(used=True)
-        # marks all previous tokens as used so only the new one works
-
-        # create a fresh token with a random UUID
-        token = PasswordResetToken.objects.create(student=student)
-    except Exception as e:
-        logger.error(f"[Password Reset] DB error creating token: {type(e).__name__}: {e}")
-        return Response({
-            'message': 'Something went wrong. Please try again later.'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
     # build the reset link — the student clicks this in their email
     domain = django_settings.SITE_DOMAIN
     # SITE_DOMAIN is set in settings.py, e.g. "arwin001.pythonanywhere.com"
-    reset_url = f"https://{domain}/reset-password.html?token={token.token}"
-    # the URL includes the UUID token as a query parameter
 
-    # send the email via Gmail REST API (HTTPS, not SMTP — because PythonAnywhere blocks SMTP)
     try:
-        gmail_send(
-            to=student.email,
-            subject='StudentNest \u2014 Reset Your Password',
-            body=(
-                f"Hi {student.name},\n\n"
-                f"We received a request to reset your password.\n\n"
-                f"Click the link below to create a new password:\n"
-                f"{reset_url}\n\n"
-                f"This link expires in 1 hour.\n\n"
-                f"If you didn't request this, you can safely ignore this email.\n\n"
-                f"\u2014 The StudentNest Team"
-            ),
-        )
+        with transaction.atomic():
+            # invalidate any old unused tokens for this student
+            PasswordResetToken.objects.filter(student=student, used=False).update(used=True)
+            # marks all previous tokens as used so only the new one works
+
+            # create a fresh token with a random UUID
+            token = PasswordResetToken.objects.create(student=student)
+
+            reset_url = f"https://{domain}/reset-password.html?token={token.token}"
+            # the URL includes the UUID token as a query parameter
+
+            outbox.enqueue(
+                to=student.email,
+                subject='StudentNest \u2014 Reset Your Password',
+                body=(
+                    f"Hi {student.name},\n\n"
+                    f"We received a request to reset your password.\n\n"
+                    f"Click the link below to create a new password:\n"
+                    f"{reset_url}\n\n"
+                    f"This link expires in 1 hour.\n\n"
+                    f"If you didn't request this, you can safely ignore this email.\n\n"
+                    f"\u2014 The StudentNest Team"
+                ),
+            )
+            # queued in the same transaction as the token — run_email_worker sends it, so
+            # this request never waits on the Gmail API (see outbox.py)
     except Exception as e:
-        logger.error(f"[Password Reset] Email send failed: {type(e).__name__}: {e}")
+        logger.error(f"[Password Reset] DB error creating token: {type(e).__name__}: {e}")
         return Response({
-            'message': f'Email could not be sent ({type(e).__name__}). This may be a server restriction.'
+            'message': 'Something went wrong. Please try again later.'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     return Response({'message': success_msg}, status=status.HTTP_200_OK)
 
 
-@api_view(['POST'])
-@csrf_exempt
-def reset_password(request):
+async def reset_password(request):
     """Set a new password using a valid reset token — called from the reset password page"""
-    token_str = request.data.get('token', '').strip()
-    new_password = request.data.get('password', '')
+    if request.method != 'POST':
+        return _api_response({
+            'message': 'Method not allowed.'
+        }, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    data = _json_body(request) or {}
+    token_str = str(data.get('token', '')).strip()
+    new_password = str(data.get('password', ''))
 
     if not token_str or not new_password:
-        return Response({
+        return _api_response({
             'message': 'Token and new password are required.'
         }, status=status.HTTP_400_BAD_REQUEST)
 
     if len(new_password) < 8:
-        return Response({
+        return _api_response({
             'message': 'Password must be at least 8 characters.'
         }, status=status.HTTP_400_BAD_REQUEST)
 
     try:
-        token = PasswordResetToken.objects.get(token=token_str, used=False)
+        token = await PasswordResetToken.objects.select_related('student').aget(token=token_str, used=False)
         # look up the token — must exist and must not have been used already
-    except PasswordResetToken.DoesNotExist:
-        return Response({
+    except (PasswordResetToken.DoesNotExist, ValidationError):
+        # ValidationError: the token isn't even a well-formed UUID
+        return _api_response({
             'message': 'This reset link is invalid or has already been used.'
         }, status=status.HTTP_400_BAD_REQUEST)
 
     if token.is_expired():
         # check if more than 1 hour has passed since the token was created
-        return Response({
+        return _api_response({
             'message': 'This reset link has expired. Please request a new one.'
         }, status=status.HTTP_400_BAD_REQUEST)
 
     # everything is valid — update the password
     student = token.student
-    student.set_password(new_password)
-    # hash the new password using PBKDF2
-    student.save(update_fields=['password_hash'])
-
-    # mark the token as used so it cannot be reused
-    token.used = True
-    token.save(update_fields=['used'])
+    try:
+        await student.aset_password(new_password)
+        # hash the new password using PBKDF2, in the hashing pool
+    except hashing.PasswordHashingBusy:
+        return _hashing_busy()
+
+    def save_password():
+        with transaction.atomic():
+            if not PasswordResetToken.objects.filter(pk=token.pk, used=False).update(used=True):
+                return False
+            # mark the token as used so it cannot be reused — and check nobody used it
+            # while we were hashing
+            student.save(update_fields=['password_hash'])
+        return True
+
+    if not await sync_to_async(save_password)():
+        return _api_response({
+            'message': 'This reset link is invalid or has already been used.'
+        }, status=status.HTTP_400_BAD_REQUEST)
 
-    return Response({
+    return _api_response({
         'message': 'Your password has been reset successfully! You can now log in.'
     }, status=status.HTTP_200_OK)
+
+
+# ============================================================
+# LIVE UPDATES (Server-Sent Events)
+# ============================================================
+
+CHANGES_ORDERING = ('updated_at', 'id')
+# the changes feed walks messages in the order they were last touched — id breaks ties
+
+
+def _changed_messages(student_id, since, limit):
+    """Messages to or from this student touched after the `since` cursor, oldest change first.
+    Returns (messages, cursor, has_more, fresh) — fresh counts the messages past the cursor.
+
+    updated_at is stamped before the write commits, so a write that commits just after a
+    poll can carry an earlier time than that poll's cursor. Each poll therefore also
+    re-sends the messages from the MESSAGE_CHANGES_OVERLAP_SECONDS before the cursor (the
+    browser keeps messages by id, so a repeat just replaces itself), and the cursor only
+    moves past a moment once every write stamped before it must have committed."""
+    overlap = timedelta(seconds=django_settings.MESSAGE_CHANGES_OVERLAP_SECONDS)
+    now = timezone.now()
+    cursor_key = None
+    if since:
+        values, _ = decode_cursor(since, CHANGES_ORDERING)
+        cursor_key = (parse_datetime(values[0]), values[1])
+
+    fresh, late = {}, {}
+    for side in ('recipient_id', 'sender_id'):
+        changed = Message.objects.filter(**{side: student_id}).select_related('sender', 'recipient', 'room')
+        if since:
+            for message in changed.filter(updated_at__gt=cursor_key[0] - overlap, updated_at__lte=cursor_key[0]):
+                late[message.id] = message
+            # already-sent messages in the window come back too — that is the price of not missing any
+            changed = after_cursor(changed, since, CHANGES_ORDERING)
+        for message in changed.order_by(*CHANGES_ORDERING)[:limit + 1]:
+            fresh[message.id] = message
+        # one query per side instead of "recipient OR sender", so each one is a range scan
+        # on its own (side, updated_at) index
+    ordered = sorted(fresh.values(), key=lambda message: (message.updated_at, message.id))
+    has_more = len(ordered) > limit
+    ordered = ordered[:limit]
+
+    for message in ordered:
+        late.pop(message.id, None)
+    messages = sorted([*late.values(), *ordered], key=lambda message: (message.updated_at, message.id))
+
+    key = (ordered[-1].updated_at, ordered[-1].id) if ordered else cursor_key
+    if not has_more:
+        settled = now - overlap
+        if key is None or key[0] < settled:
+            key = (settled, 0)
+        # every write stamped before `settled` has committed and, having found nothing newer,
+        # we have seen them all — start the next window from there so an idle feed stops repeating
+    cursor = encode_cursor(key, 'n', CHANGES_ORDERING)
+    return messages, cursor, has_more, len(ordered)
+
+
+def _message_changes_data(student_id, since, limit):
+    """The JSON body of /api/messages/changes/, and how many of its messages are new."""
+    messages, cursor, has_more, fresh = _changed_messages(student_id, since, limit)
+    return {
+        'messages': MessageSerializer(messages, many=True).data,
+        'count': len(messages),
+        'cursor': cursor,
+        # pass this back as ?since= next time
+        'has_more': has_more,
+        # True when more changes are waiting — ask again straight away
+    }, fresh
+
+
+async def message_changes(request):
+    """GET /api/messages/changes/?since=<cursor>&wait=<seconds>
+
+    Only the messages sent or received by the logged-in student that were created or
+    changed (e.g. marked as read) since the cursor, plus a new cursor — so refreshing the
+    inbox or an open thread downloads what changed instead of the whole history. Without
+    ?since= the feed starts from the beginning, ?limit= pages through it like the other lists.
+
+    ?wait=N turns it into a long poll: when there is nothing new the request is held open
+    for up to N seconds (max MESSAGE_CHANGES_MAX_WAIT_SECONDS) and answers as soon as a
+    message event arrives. Waiting only happens under the ASGI server — under WSGI it would
+    tie up a whole worker, so the answer comes back straight away.
+    """
+    if request.method != 'GET':
+        return _api_response({
+            'message': 'Method not allowed.'
+        }, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    if not await sync_to_async(bool)(request.student):
+        return _api_response({
+            'message': 'You must be logged in.'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    # resolving request.student may read the session and the students table, so the first
+    # look at it happens in a worker thread — after that it is a plain attribute
+    student_id = request.student.id
+
+    since = request.GET.get('since', '').strip()
+    try:
+        limit = get_page_size(request.GET)
+        if since:
+            after_cursor(Message.objects.none(), since, CHANGES_ORDERING)
+            # checks the cursor now, so a bad one is a 400 rather than an error mid-wait
+        wait = int(request.GET.get('wait', '0').strip() or 0)
+    except PaginationError as e:
+        return _api_response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except ValueError:
+        return _api_response({
+            'message': 'wait must be a whole number of seconds.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    wait = max(0, min(wait, django_settings.MESSAGE_CHANGES_MAX_WAIT_SECONDS))
+    if not isinstance(request, ASGIRequest):
+        wait = 0
+
+    subscription = get_broker().subscribe(student_channel(student_id)) if wait else None
+    # subscribe before reading, so an event published in between is not missed
+    try:
+        data, fresh = await sync_to_async(_message_changes_data)(student_id, since, limit)
+        if subscription and not fresh:
+            # nothing past the cursor — repeats from the overlap window don't count as news
+            if await subscription.get(timeout=wait) is not None:
+                data, fresh = await sync_to_async(_message_changes_data)(student_id, since, limit)
+                # something happened — read again and answer straight away
+    finally:
+        if subscription:
+            subscription.close()
+
+    return _api_response(data)
+
+
+async def live_events(request):
+    """GET /api/events/ — a never-ending text/event-stream of the logged-in student's
+    message events (see realtime.py). The portal opens it with `new EventSource(...)`.
+
+    A plain async Django view rather than a DRF one: it has to keep the connection open
+    while waiting, which only works under the ASGI server (studentnest.asgi).
+    """
+    if not isinstance(request, ASGIRequest):
+        return _api_response({
+            'message': 'Live updates need the ASGI server — keep polling instead.'
+        }, status=status.HTTP_501_NOT_IMPLEMENTED)
+        # under WSGI each open stream would tie up a whole worker
+
+    if not await sync_to_async(bool)(request.student):
+        return _api_response({
+            'message': 'You must be logged in.'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    # resolving request.student reads the session and maybe the database, so it runs in a worker thread
+    student_id = request.student.id
+
+    subscription = get_broker().subscribe(student_channel(student_id))
+
+    async def event_stream():
+        loop = asyncio.get_running_loop()
+        closes_at = loop.time() + django_settings.REALTIME_MAX_STREAM_SECONDS
+        try:
+            yield 'retry: 3000\n\n'
+            # tells EventSource to reconnect 3 seconds after the stream ends
+            while loop.time() < closes_at:
+                event = await subscription.get(timeout=django_settings.REALTIME_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ': keep-alive\n\n'
+                    # lines starting with ':' are comments — the browser ignores them
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    # stops nginx-style proxies from buffering the stream
+    return response
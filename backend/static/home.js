@@ -6,6 +6,26 @@
 
   const API_BASE_URL = '/api'; // base path for all API requests â€” relative so it works on any domain
 
+  // list endpoints return one page at a time plus a `next` cursor
+  // this keeps following the cursor until the last page and returns every item under `key`
+  async function fetchAllPages(url, key) {
+    const items = [];
+    let cursor = null;
+    do {
+      const pageUrl = url + (url.includes('?') ? '&' : '?') + 'limit=100' + (cursor ? `&cursor=${encodeURIComponent(cursor)}` : '');
+      const response = await fetch(pageUrl, {
+        credentials: 'include' // send session cookie to prove who we are
+      });
+      if (!response.ok) {
+        return { ok: false, status: response.status, items: items };
+      }
+      const data = await response.json();
+      items.push(...(data[key] || []));
+      cursor = data.next; // null on the last page
+    } while (cursor);
+    return { ok: true, status: 200, items: items };
+  }
+
   // checks whether the current visitor is logged in by asking the Django API
   async function checkAuthentication() {
     console.log('Checking authentication...');
@@ -71,14 +91,12 @@
   async function loadUserFavorites() {
     console.log('Loading user favorites...');
     try {
-      const response = await fetch(`${API_BASE_URL}/favorites/`, {
-        credentials: 'include' // send session cookie to prove who we are
-      });
+      const response = await fetchAllPages(`${API_BASE_URL}/favorites/`, 'rooms');
       
       console.log('Favorites response status:', response.status);
       
       if (response.ok) {
-        const data = await response.json();
+        const data = { rooms: response.items };
         console.log('Favorites response data:', data);
         // the API returns { rooms: [...] } â€” extract just the IDs for quick lookup
         userFavorites = data.rooms ? data.rooms.map(room => room.id) : [];
@@ -96,13 +114,9 @@
   async function fetchRooms() {
     console.log('Fetching rooms from API...');
     try {
-      const response = await fetch(`${API_BASE_URL}/rooms/`, {
-        method: 'GET',
-        credentials: 'include',
-        headers: {
-          'Content-Type': 'application/json'
-        }
-      });
+      const response = await fetchAllPages(`${API_BASE_URL}/rooms/?view=card`, 'rooms');
+      // the rooms API is paginated — collect every page so the client-side search sees all rooms
+      // view=card asks for the compact card fields only (title, price, first image, badges...)
 
       console.log('API Response status:', response.status);
 
@@ -111,11 +125,7 @@
         return;
       }
 
-      const data = await response.json();
-      console.log('API response received:', data);
-
-      // the API might return an array directly, or wrap it in rooms/results
-      const rooms = Array.isArray(data) ? data : (data.rooms || data.results || []);
+      const rooms = response.items;
       console.log(`Processing ${rooms.length} rooms`);
 
       // transform each room from the API shape into what the UI needs
@@ -126,11 +136,8 @@
         else if (room.furnished === 'part') features.push('Part Furnished');
         
         if (room.bills === 'included') features.push('Bills Included');
-        if (room.wifi) features.push('WiFi');
-        if (room.parking) features.push('Parking');
-        if (room.washing_machine) features.push('Washing Machine');
-        if (room.gym) features.push('Gym');
-        if (room.garden) features.push('Garden');
+        (room.features || []).forEach(feature => features.push(feature.name));
+        // the API sends the ticked amenities as [{icon, name}, ...]
 
         // decide what badge to show on the card corner
         let badge = null;
@@ -158,12 +165,13 @@
           price: parseFloat(room.price), // ensure it's a number for comparisons
           location: room.location,
           distance: room.distance_to_transport || 'Near university', // fallback text
-          image: room.images && room.images.length > 0 ? room.images[0] : 'https://images.unsplash.com/photo-1522708323590-d24dbb6b0267?w=600&h=400&fit=crop',
+          image: room.image || 'https://images.unsplash.com/photo-1522708323590-d24dbb6b0267?w=600&h=400&fit=crop',
           // use the first image from the API, or fall back to a stock photo
+          imageSet: room.image_set, // resized WebP/AVIF/JPEG copies of that photo, once the server has made them
           badge: badge,
           badgeType: badgeType,
           features: features,
-          description: room.description || '',
+          description: '', // not part of the card payload — the room page loads the full details
           available: new Date(room.available_from), // convert string to Date for comparisons
           type: room.room_type,
           owner: room.owner
@@ -277,6 +285,21 @@
     }
   }
 
+  // <picture> with the resized copies when there are some — the browser picks the
+  // smallest format it supports at the width the card is shown, instead of the original upload
+  function cardImageHtml(room) {
+    const set = room.imageSet;
+    if (!set || !set.srcset) {
+      return `<img src="${room.image}" alt="${room.title}" loading="lazy" />`;
+    }
+    const sizes = '(max-width: 600px) 100vw, 360px'; // cards are about 360px wide on desktop
+    const sources = set.sources.map(source =>
+      `<source type="${source.type}" srcset="${source.srcset}" sizes="${sizes}" />`
+    ).join('');
+    const dimensions = set.width ? `width="${set.width}" height="${set.height}"` : '';
+    return `<picture>${sources}<img src="${set.src}" srcset="${set.srcset}" sizes="${sizes}" ${dimensions} alt="${room.title}" loading="lazy" /></picture>`;
+  }
+
   // renders the room cards grid â€” called after fetch and after every filter/search
   function renderRooms() {
     const roomsGrid = document.querySelector('.home-rooms-grid');
@@ -302,7 +325,7 @@
     roomsGrid.innerHTML = filteredRooms.map(room => `
       <div class="home-room-card" data-room-id="${room.id}">
         <div class="home-room-image">
-          <img src="${room.image}" alt="${room.title}" />
+          ${cardImageHtml(room)}
           <span class="home-room-badge ${room.badgeType}">${room.badge}</span>
           <!-- the heart/save button â€” filled if the room is already in the user's favorites -->
           <button class="home-room-save ${userFavorites.includes(room.id) ? 'saved' : ''}" data-room-id="${room.id}" title="${userFavorites.includes(room.id) ? 'Remove from favorites' : 'Add to favorites'}">
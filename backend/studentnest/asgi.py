@@ -1,7 +1,10 @@
 """
 ASGI config for studentnest project.
 ASGI is the async version of WSGI — used for real-time features like websockets.
-Not actively used in this project, but Django generates it by default.
+Serves everything the WSGI app does, plus the live message updates at /api/events/
+(Server-Sent Events — see accounts/realtime.py), which need a server that can hold many
+connections open at once, e.g.:
+    gunicorn studentnest.asgi:application -k uvicorn.workers.UvicornWorker
 """
 
 import os
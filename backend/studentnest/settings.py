@@ -53,8 +53,11 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     # middleware runs on every single request and response, in this order
     'django.middleware.security.SecurityMiddleware',        # enforces HTTPS, sets security headers
+    'accounts.middleware.CompressionMiddleware',            # brotli/gzip for large JSON API responses — near the top so it sees the final body
     'whitenoise.middleware.WhiteNoiseMiddleware',           # serves static files efficiently in production
     'django.contrib.sessions.middleware.SessionMiddleware', # loads the session from the cookie on each request
+    'accounts.middleware.SlidingSessionMiddleware',         # renews the login only when it is close to expiring — see SESSION_REFRESH_WINDOW
+    'accounts.middleware.StudentMiddleware',                # request.student — the logged-in student, looked up once per request
     'corsheaders.middleware.CorsMiddleware',                # adds CORS headers so the frontend can talk to the API
     'django.middleware.common.CommonMiddleware',            # handles URL normalisation like trailing slashes
     # 'django.middleware.csrf.CsrfViewMiddleware',         # CSRF protection — disabled because our API uses @csrf_exempt
@@ -108,6 +111,125 @@ DATABASES = {
     )
 }
 
+# Caches — two of them, so the bulky room data can't push sessions out:
+#   'default'  cached_db sessions, presence heartbeats, rate-limit buckets (CacheBuckets)
+#   'rooms'    per-room JSON payloads (accounts/room_cache.py) and compressed room responses
+# both default to in-process memory caches; point CACHE_BACKEND/CACHE_LOCATION at another
+# backend to share them between workers, e.g.
+#   CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache CACHE_LOCATION=/tmp/studentnest-cache
+#   CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://127.0.0.1:6379
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+CACHE_LOCATION = os.environ.get('CACHE_LOCATION', 'studentnest')
+
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+# entries the 'default' cache holds before culling — Django's own default of 300 is a few
+# hundred logged-in sessions, and every entry past it threw out a third of them
+
+ROOM_CACHE_MAX_ENTRIES = int(os.environ.get('ROOM_CACHE_MAX_ENTRIES', 5000))
+# entries the 'rooms' cache holds — room payloads plus compressed list pages; a few times
+# the number of active listings, so the whole catalogue stays cached
+
+
+def _cache(alias, max_entries):
+    """One CACHES entry. In-process and file caches get their own store per alias and
+    a size limit; shared servers (Redis, Memcached) keep the aliases apart by key prefix."""
+    config = {'BACKEND': CACHE_BACKEND, 'LOCATION': CACHE_LOCATION}
+    if alias != 'default':
+        config['KEY_PREFIX'] = alias
+    if CACHE_BACKEND.endswith(('LocMemCache', 'FileBasedCache')):
+        if alias != 'default':
+            config['LOCATION'] = os.path.join(CACHE_LOCATION, alias) if CACHE_BACKEND.endswith('FileBasedCache') else f'{CACHE_LOCATION}-{alias}'
+            # a separate memory store / folder, so culling one never empties the other
+        config['OPTIONS'] = {'MAX_ENTRIES': max_entries, 'CULL_FREQUENCY': 4}
+        # when full, drop a quarter of the entries (Django's default drops a third)
+    return config
+
+
+CACHES = {
+    'default': _cache('default', CACHE_MAX_ENTRIES),
+    'rooms': _cache('rooms', ROOM_CACHE_MAX_ENTRIES),
+}
+
+ROOM_PAYLOAD_CACHE_TIMEOUT = int(os.environ.get('ROOM_PAYLOAD_CACHE_TIMEOUT', 60 * 60 * 24))
+# how long (seconds) a serialized room stays cached — edits never serve stale data because
+# the key includes updated_at, so this only bounds how long unused entries linger
+
+# request.student (accounts/identity.py) — student rows cached in each server process
+STUDENT_CACHE_TTL = 30
+# seconds a cached student row is trusted — saves in this process clear it straight away,
+# other processes pick the change up within this time
+
+STUDENT_CACHE_SIZE = 1000
+# most students kept per process
+
+# Presence (accounts/presence.py) — heartbeats live in the cache, the students table is updated in bulk
+PRESENCE_TIMEOUT = 600
+# a student counts as online for 10 minutes after their last page load
+
+PRESENCE_FLUSH_INTERVAL = int(os.environ.get('PRESENCE_FLUSH_INTERVAL', 60))
+# last_activity/is_online are written to the database at most this often (seconds)
+
+# Live updates (accounts/realtime.py) — served by the ASGI app at /api/events/
+REALTIME_BROKER = os.environ.get('REALTIME_BROKER', 'accounts.realtime.InProcessBroker')
+# in-process pub/sub works for one server process; several ASGI workers need a shared broker
+
+REALTIME_HEARTBEAT_SECONDS = 15
+# a comment line is sent this often so proxies do not close an idle connection
+
+REALTIME_MAX_STREAM_SECONDS = 300
+# each connection is closed after 5 minutes and the browser reconnects by itself —
+# this also cleans up connections whose tab was closed without the server noticing
+
+MESSAGE_CHANGES_MAX_WAIT_SECONDS = 25
+# longest ?wait= a /api/messages/changes/ long-poll may ask for — kept under the usual
+# 30-second proxy timeout
+
+MESSAGE_CHANGES_OVERLAP_SECONDS = 5
+# the changes feed re-sends messages touched this long before its cursor, so a write that
+# committed after a poll but was stamped earlier still arrives — longer than any message write takes
+
+# Password hashing (accounts/hashing.py) — PBKDF2 for signup, login and password reset runs
+# in a small pool of its own instead of on the request threads
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', os.cpu_count() or 2))
+# hashes computed at the same time — each one keeps a CPU core busy for a few hundred ms
+
+PASSWORD_HASHING_MAX_QUEUE = int(os.environ.get('PASSWORD_HASHING_MAX_QUEUE', 32))
+# hashes allowed to wait for a free worker — past this, login/signup answer 503 straight away
+
+PASSWORD_HASHING_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_HASHING_QUEUE_TIMEOUT', 5))
+# seconds a request waits for its hash (queue plus hashing) before it answers 503
+
+# Rate limiting (accounts/ratelimit.py) — token buckets per client IP and per email address
+RATE_LIMITS = {
+    'login': {
+        'ip': (30, 60),
+        # a burst of 30 attempts from one address, then one every 2 seconds
+        'email': (10, 300),
+        # 10 attempts at one account, then one every 30 seconds
+    },
+    'password-reset': {
+        'ip': (10, 600),
+        'email': (3, 900),
+        # each one sends an email — 3 in a row, then one every 5 minutes
+    },
+}
+# (capacity, per_seconds): a bucket holds `capacity` attempts and refills completely in `per_seconds`
+
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'accounts.ratelimit.InProcessBuckets')
+# each server process counts on its own — use accounts.ratelimit.CacheBuckets (with a shared
+# CACHE_BACKEND) to count across several worker processes
+
+RATE_LIMIT_MAX_KEYS = 100000
+# most buckets InProcessBuckets keeps — the least recently used are forgotten first
+
+RATE_LIMIT_IP_META = os.environ.get('RATE_LIMIT_IP_META', 'REMOTE_ADDR')
+# where the client address is read from — behind a proxy that sets it, e.g. HTTP_X_REAL_IP
+# or HTTP_X_FORWARDED_FOR (never a header the client can send straight to the server)
+
+RATE_LIMIT_TRUSTED_PROXIES = int(os.environ.get('RATE_LIMIT_TRUSTED_PROXIES', 1))
+# proxies in front of the app that append to X-Forwarded-For — the client is read this many
+# entries from the right, since the client can put anything it likes on the left
+
 # Password validation
 # these validators run when Django's built-in auth system checks passwords (e.g. createsuperuser)
 AUTH_PASSWORD_VALIDATORS = [
@@ -210,9 +332,40 @@ GMAIL_CLIENT_SECRET = os.environ.get('GMAIL_CLIENT_SECRET', '')
 GMAIL_REFRESH_TOKEN = os.environ.get('GMAIL_REFRESH_TOKEN', '')
 # long-lived token that lets us get fresh access tokens without re-authenticating
 
+GMAIL_TOKEN_URL = os.environ.get('GMAIL_TOKEN_URL', 'https://oauth2.googleapis.com/token')
+GMAIL_API_URL = os.environ.get('GMAIL_API_URL', 'https://gmail.googleapis.com')
+GMAIL_BATCH_URL = os.environ.get('GMAIL_BATCH_URL', 'https://www.googleapis.com/batch/gmail/v1')
+# Google's OAuth, Gmail and batch endpoints — override them to send to a local fake server while developing
+
+GMAIL_BATCH_SIZE = 100
+# most emails per batch request (Google's limit) — send_bulk splits bigger lists
+
+GMAIL_BATCH_BACKOFF = 1
+GMAIL_BATCH_MAX_BACKOFF = 60
+# when Gmail starts answering 429, send_bulk waits 1s between batches, doubling up to a minute
+
 DEFAULT_FROM_EMAIL = 'StudentNest <support.studentnest@gmail.com>'
 # the "From" address shown in password reset emails
 
+# Outbound email (accounts/outbox.py) — views queue emails, `manage.py run_email_worker` sends them
+EMAIL_TRANSPORT = os.environ.get('EMAIL_TRANSPORT', 'accounts.outbox.GmailTransport')
+# how the worker sends — accounts.outbox.ConsoleTransport prints emails and
+# accounts.outbox.FileTransport writes .eml files, for local development
+
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', os.path.join(BASE_DIR, 'sent_emails'))
+# where FileTransport writes
+
+EMAIL_BATCH_SIZE = 20
+# emails the worker claims at a time
+
+EMAIL_CLAIM_SECONDS = 300
+# a claimed email whose worker hasn't recorded an outcome by then is sent again by another
+
+EMAIL_MAX_ATTEMPTS = 8
+EMAIL_RETRY_BACKOFF = 30
+EMAIL_RETRY_MAX_BACKOFF = 3600
+# a failed send is retried after 30s, 1m, 2m, 4m ... (at most an hour apart), 8 tries in all
+
 # Domain for password reset links
 SITE_DOMAIN = os.environ.get('SITE_DOMAIN', 'arwin001.pythonanywhere.com')
 # used to build the full URL in reset emails, e.g. https://arwin001.pythonanywhere.com/reset-password.html
@@ -228,8 +381,27 @@ REST_FRAMEWORK = {
         # all API endpoints are publicly accessible by default
         # individual views check session login status themselves
     ],
+
+    'DEFAULT_RENDERER_CLASSES': [
+        'accounts.renderers.FastJSONRenderer',
+        # same JSON as DRF's JSONRenderer, encoded with orjson (several times faster)
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        # the HTML API browser you get when opening an endpoint in a browser tab
+    ],
 }
 
+# Response compression (accounts/middleware.py)
+API_COMPRESSION_MIN_BYTES = 1024
+# JSON responses smaller than this are sent as-is — compressing them saves almost nothing
+
+API_COMPRESSION_GZIP_LEVEL = 6
+API_COMPRESSION_BROTLI_QUALITY = 5
+# middle-of-the-road settings: most of the size saving for a fraction of the CPU of the maximum
+# (brotli is only used when the optional `brotli` package is installed)
+
+API_COMPRESSION_CACHE_TIMEOUT = 60 * 10
+# compressed bodies of responses with an ETag are kept this long (seconds), keyed by the ETag
+
 # Session settings — how login cookies behave
 SESSION_COOKIE_SAMESITE = 'Lax'
 # Lax means the cookie is sent on same-site requests and top-level navigations
@@ -244,8 +416,29 @@ SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_AGE = 86400
 # session lasts 24 hours (86400 seconds) before the user needs to log in again
 
-SESSION_SAVE_EVERY_REQUEST = True
-# refresh the session expiry on every request so active users stay logged in
+SESSION_SAVE_EVERY_REQUEST = False
+# saving on every request rewrote a django_session row on every API call — instead
+# SlidingSessionMiddleware renews the session only when it is close to expiring
+
+SESSION_REFRESH_WINDOW = 6 * 3600
+# a session used in its last 6 hours is renewed for another SESSION_COOKIE_AGE, so active
+# users stay logged in while most requests don't write the session at all
+
+SESSION_ENGINES = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    # read from the cache, written through to the database — survives restarts, and a
+    # read-only request usually costs no query at all
+    'db': 'django.contrib.sessions.backends.db',
+    # database only — every request reads its django_session row
+    'cache': 'django.contrib.sessions.backends.cache',
+    # cache only — no database at all, but sessions are lost if the cache is cleared
+    # (and need a shared CACHE_BACKEND when several server processes run)
+    'cookie': 'django.contrib.sessions.backends.signed_cookies',
+    # the session (student_id, student_email) lives in a cookie signed with SECRET_KEY —
+    # no server storage, but logging out cannot revoke a copied cookie before it expires
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('SESSION_STORE', 'cached_db')]
+# set SESSION_STORE to one of the keys above to switch how sessions are stored
 
 SESSION_COOKIE_NAME = 'studentnest_sessionid'
 # custom cookie name instead of the default "sessionid" — avoids conflicts
@@ -253,6 +446,19 @@ SESSION_COOKIE_NAME = 'studentnest_sessionid'
 SESSION_COOKIE_PATH = '/'
 # cookie is available on all URL paths
 
+# Room photo variants (accounts/images.py) — smaller WebP/AVIF/JPEG copies made after upload
+ROOM_IMAGE_WIDTHS = [320, 640, 1024, 1600]
+# widths (px) each photo is resized to — cards use the small ones, the room page the large
+
+ROOM_IMAGE_QUALITY = {'jpeg': 82, 'webp': 80, 'avif': 60}
+# encoder quality per format — AVIF looks as good at a much lower number
+
+ROOM_IMAGE_WORKERS = int(os.environ.get('ROOM_IMAGE_WORKERS', 2))
+# photos resized at the same time in each server process, off the request threads
+
+ROOM_MAX_IMAGES = int(os.environ.get('ROOM_MAX_IMAGES', 20))
+# photos a room can have (RoomImage rows) — image_1..image_5 plus any sent as `images`
+
 # Media files (user uploads like room images)
 MEDIA_URL = '/media/'
 # URL prefix for uploaded files — e.g. /media/room_images/photo.jpg
@@ -260,6 +466,24 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # the folder on disk where uploaded files are stored — backend/media/
 
+ROOM_IMAGE_STORAGE = 'accounts.media_store.ContentAddressedStorage'
+# room photos are stored under the SHA-256 of their contents (media_store.py), so the same
+# photo uploaded to several listings is one file
+
+SERVE_MEDIA = os.environ.get('SERVE_MEDIA', str(DEBUG)) == 'True'
+# let Django answer /media/ (with the cache headers below) — on by default in development;
+# in production turn it on if the web server's own /media/ mapping can't set headers
+
+MEDIA_CACHE_SECONDS = int(os.environ.get('MEDIA_CACHE_SECONDS', 3600))
+# Cache-Control max-age for media that isn't content-addressed (older uploads) — the
+# content-addressed photos and variants are sent as immutable for a year
+
+MEDIA_GC_GRACE_HOURS = float(os.environ.get('MEDIA_GC_GRACE_HOURS', 24))
+# collect_media only deletes files nothing has used (or uploaded again) for this long
+
+MEDIA_GC_INACTIVE_ROOM_DAYS = int(os.environ.get('MEDIA_GC_INACTIVE_ROOM_DAYS', 90))
+# collect_media also drops the photos of rooms deactivated this long ago (0 = keep them)
+
 # Production security settings — only active when DEBUG is False
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
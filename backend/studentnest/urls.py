@@ -7,14 +7,15 @@ and gets forwarded to the right app based on the URL pattern.
 from django.contrib import admin
 # gives us access to the built-in admin panel
 
-from django.urls import path, include
+from django.urls import path, include, re_path
 # path defines a URL pattern, include delegates to another app's urls.py
+# re_path matches a URL against a regular expression — used for /media/<any path>
 
 from django.conf import settings
 # lets us read settings like DEBUG and MEDIA_ROOT
 
-from django.conf.urls.static import static
-# helper function to serve media files during development
+from accounts import media_store
+# serves uploaded files with long-lived cache headers (the photos are content-addressed)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -29,8 +30,8 @@ urlpatterns = [
     # this serves the HTML pages
 ]
 
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    # in development mode, Django serves uploaded images from the /media/ URL
-    # in production, PythonAnywhere handles this through its static files configuration
+# Serve media files in development (or wherever SERVE_MEDIA is on)
+if settings.SERVE_MEDIA:
+    urlpatterns += [re_path(rf'^{settings.MEDIA_URL.lstrip("/")}(?P<path>.*)$', media_store.serve)]
+    # Django serves uploaded images from the /media/ URL, with Cache-Control set by media_store
+    # otherwise PythonAnywhere handles this through its static files configuration